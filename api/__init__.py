@@ -4,7 +4,7 @@ ONIET API application package.
 
 # This will make sure the app is always imported when
 # Django starts so that shared_task will use this app.
-# Temporarily commented out for Railway deployment
-# from .celery import app as celery_app
+# Without CELERY_BROKER_URL tasks run eagerly (see config/settings.py).
+from .celery import app as celery_app
 
-# __all__ = ('celery_app',)
+__all__ = ('celery_app',)
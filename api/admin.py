@@ -3,9 +3,16 @@ Django admin customization.
 """
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import Count, DecimalField, F, Sum
 from django.utils.translation import gettext_lazy as _
 
 from . import models
+from .utils.pagination import EstimatedCountPaginator
+
+
+def _importe(value):
+    """Format an aggregated amount for changelist columns."""
+    return f"${(value or 0):,.2f}"
 
 
 class UserAdmin(BaseUserAdmin):
@@ -69,7 +76,10 @@ class PaqueteAdmin(admin.ModelAdmin):
         'categoria', 'destacado', 'disponible', 'is_active'
     )
     list_filter = ('categoria', 'dificultad', 'destacado', 'is_active')
+    list_select_related = ('categoria',)
     search_fields = ('nombre', 'descripcion')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     fieldsets = (
         (None, {
             'fields': ('nombre', 'descripcion', 'precio', 'imagen_principal')
@@ -86,6 +96,20 @@ class PaqueteAdmin(admin.ModelAdmin):
     date_hierarchy = 'created_at'
     readonly_fields = ('created_at', 'updated_at', 'disponible', 'disponibilidad')
     list_display_links = ('nombre',)
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_disponibilidad()
+    
+    def disponible(self, obj):
+        """Return whether the package still has places, from the annotation."""
+        return obj.disponible
+    disponible.short_description = 'Disponible'
+    disponible.boolean = True
+    
+    def disponibilidad(self, obj):
+        """Return the remaining places, from the annotation."""
+        return obj.disponibilidad
+    disponibilidad.short_description = 'Disponibilidad'
 
 
 class CarritoItemInline(admin.TabularInline):
@@ -105,22 +129,33 @@ class CarritoAdmin(admin.ModelAdmin):
     """Admin View for Carrito."""
     list_display = ('usuario', 'updated_at', 'total_items', 'total')
     list_filter = ('usuario',)
+    list_select_related = ('usuario',)
     search_fields = ('usuario__email', 'usuario__nombre', 'usuario__apellido')
     inlines = [CarritoItemInline]
     readonly_fields = ('created_at', 'updated_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     def get_queryset(self, request):
-        return super().get_queryset(request).prefetch_related('items')
+        return super().get_queryset(request).annotate(
+            items_count=Count('items'),
+            total_importe=Sum(
+                F('items__cantidad') * F('items__paquete__precio'),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            ),
+        )
     
     def total_items(self, obj):
         """Return total number of items in the cart."""
-        return obj.items.count()
+        return obj.items_count
     total_items.short_description = 'Items'
+    total_items.admin_order_field = 'items_count'
     
     def total(self, obj):
         """Return total amount of the cart."""
-        return f"${obj.total:,.2f}"
+        return _importe(obj.total_importe)
     total.short_description = 'Total'
+    total.admin_order_field = 'total_importe'
 
 
 class VentaDetalleInline(admin.TabularInline):
@@ -147,14 +182,52 @@ class VentaAdmin(admin.ModelAdmin):
     inlines = [VentaDetalleInline]
     readonly_fields = ('fecha_venta', 'fecha_confirmacion_pago')
     date_hierarchy = 'fecha_venta'
+    list_select_related = ('usuario',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('usuario')
+        return super().get_queryset(request).annotate(
+            total_importe=Sum(
+                F('items__precio_unitario') * F('items__cantidad'),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            ),
+        )
     
     def total_venta(self, obj):
         """Return total amount of the sale."""
-        return f"${obj.total:,.2f}"
+        return _importe(obj.total_importe)
     total_venta.short_description = 'Total'
+    total_venta.admin_order_field = 'total_importe'
+
+
+@admin.register(models.Campana)
+class CampanaAdmin(admin.ModelAdmin):
+    """Admin View for Campana."""
+    list_display = (
+        'nombre', 'segmento', 'categoria', 'estado',
+        'encolados', 'enviados', 'fallidos', 'fecha_inicio', 'fecha_fin'
+    )
+    list_filter = ('estado', 'segmento')
+    search_fields = ('nombre', 'asunto')
+    list_select_related = ('categoria',)
+    readonly_fields = ('estado', 'encolados', 'enviados', 'fallidos', 'fecha_inicio', 'fecha_fin')
+    actions = ['iniciar_campanas', 'pausar_campanas', 'cancelar_campanas']
+    
+    @admin.action(description='Iniciar o reanudar las campañas seleccionadas')
+    def iniciar_campanas(self, request, queryset):
+        iniciadas = sum(campana.iniciar() for campana in queryset)
+        self.message_user(request, f"{iniciadas} campaña(s) en curso.")
+    
+    @admin.action(description='Pausar las campañas seleccionadas')
+    def pausar_campanas(self, request, queryset):
+        pausadas = sum(campana.pausar() for campana in queryset)
+        self.message_user(request, f"{pausadas} campaña(s) pausada(s).")
+    
+    @admin.action(description='Cancelar las campañas seleccionadas')
+    def cancelar_campanas(self, request, queryset):
+        canceladas = sum(campana.cancelar() for campana in queryset)
+        self.message_user(request, f"{canceladas} campaña(s) cancelada(s).")
 
 
 # Register the User model with the custom UserAdmin
@@ -10,3 +10,6 @@ class ApiConfig(AppConfig):
     def ready(self):
         # Import signals to register them
         import api.signals  # noqa
+        
+        from .utils import token_revocation
+        token_revocation.check_shared_cache()
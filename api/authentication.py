@@ -1,19 +1,158 @@
 """
 Custom authentication classes and utilities for the ONIET API.
 """
+import hashlib
 import logging
-from datetime import datetime, timedelta
+import time
 
 from rest_framework import exceptions
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
+from rest_framework_simplejwt.utils import aware_utcnow
 from django.conf import settings
-from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+from .utils import token_revocation, user_cache
+from .utils.cache_utils import LocalLRUCache
 
 logger = logging.getLogger(__name__)
 
+# Seconds before expiry at which a token is reported as about to expire.
+TOKEN_EXPIRY_WARNING_SECONDS = 5 * 60
+
+# Validated token payloads keyed by a hash of the raw token. Each entry
+# lives until the token's ``exp``. Revoked tokens are still rejected through
+# ``token_revocation``; password changes clear the whole cache.
+_validated_tokens = LocalLRUCache(
+    maxsize=getattr(settings, 'TOKEN_CACHE', {}).get('MAXSIZE', 4096)
+)
+
+
+def clear_token_cache():
+    """
+    Forget every cached validated token in this process.
+    
+    Must be called when every token of a user becomes invalid (password
+    change) so those tokens are verified again on their next use.
+    """
+    _validated_tokens.clear()
+
+
+def _token_cache_key(raw_token):
+    if isinstance(raw_token, str):
+        raw_token = raw_token.encode('utf-8')
+    return hashlib.sha256(raw_token).digest()
+
+
+def _token_from_payload(token_class, raw_token, payload):
+    """Rebuild a validated token from a cached payload without decoding it."""
+    token = token_class.__new__(token_class)
+    token.token = raw_token
+    token.current_time = aware_utcnow()
+    token.payload = dict(payload)
+    return token
+
+
+# User fields copied into every token as top-level claims.
+USER_CLAIM_FIELDS = ('email', 'nombre', 'apellido', 'tipo_usuario', 'is_staff', 'is_superuser', 'is_active')
+
+
+def set_user_claims(token, user):
+    """Copy the user's identity and role flags into the token's claims."""
+    for field in USER_CLAIM_FIELDS:
+        token[field] = getattr(user, field)
+    return token
+
+
+class UserClaimsRefreshToken(RefreshToken):
+    """
+    Refresh token that carries the user's role flags as claims.
+    
+    Access tokens derived from it inherit the claims, which lets
+    ``CustomJWTAuthentication`` build a ``ClaimsUser`` without a query.
+    """
+    
+    @classmethod
+    def for_user(cls, user):
+        return set_user_claims(super().for_user(user), user)
+
+
+class ClaimsUser:
+    """
+    Lazy user built from the claims of a validated access token.
+    
+    Attributes carried by the token are answered from its claims. Reading
+    any other attribute loads the real user (through ``user_cache``) once and
+    delegates to it. Claims reflect the user as of the last token refresh,
+    so they can be up to ``ACCESS_TOKEN_LIFETIME`` old. Deactivating a user
+    revokes its tokens (``token_revocation.revoke_user``), so stale claims
+    never outlive the account.
+    """
+    is_authenticated = True
+    is_anonymous = False
+    
+    def __init__(self, token):
+        self.token = token
+        self._user = None
+    
+    def __str__(self):
+        return f"{self.get_full_name()} <{self.email}>"
+    
+    def __eq__(self, other):
+        other_pk = getattr(other, 'pk', None)
+        return other_pk is not None and str(other_pk) == str(self.pk)
+    
+    def __hash__(self):
+        return hash(str(self.pk))
+    
+    @property
+    def id(self):
+        return self.token[jwt_settings.USER_ID_CLAIM]
+    
+    @property
+    def pk(self):
+        return self.id
+    
+    @property
+    def is_admin(self):
+        return self.tipo_usuario == 'admin' or self.is_superuser
+    
+    @property
+    def is_cliente(self):
+        return self.tipo_usuario == 'cliente'
+    
+    @property
+    def is_vendedor(self):
+        return self.tipo_usuario == 'vendedor'
+    
+    def get_full_name(self):
+        return f"{self.nombre} {self.apellido}"
+    
+    def get_short_name(self):
+        return self.nombre
+    
+    def get_user(self):
+        """Return the database-backed user, loading it on first use."""
+        if self._user is None:
+            try:
+                self._user = user_cache.get_user(self.id, lookup_field=jwt_settings.USER_ID_FIELD)
+            except get_user_model().DoesNotExist:
+                raise exceptions.AuthenticationFailed('User not found', code='user_not_found')
+            logger.debug("ClaimsUser %s loaded from the database", self.id)
+        return self._user
+    
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        payload = self.__dict__['token'].payload
+        if name in USER_CLAIM_FIELDS and name in payload:
+            return payload[name]
+        return getattr(self.get_user(), name)
+
+
 def get_tokens_for_user(user):
     """
     Generate access and refresh tokens for the given user.
@@ -32,21 +171,10 @@ def get_tokens_for_user(user):
         raise TypeError("User must be provided to generate tokens")
     
     try:
-        # Get the refresh token for the user
-        refresh = RefreshToken.for_user(user)
+        # Get the refresh token for the user, with the user claims
+        refresh = UserClaimsRefreshToken.for_user(user)
         access_token = refresh.access_token
         
-        # Add custom claims to the access token
-        access_token['user'] = {
-            'id': user.id,
-            'email': user.email,
-            'nombre': user.nombre,
-            'apellido': user.apellido,
-            'tipo_usuario': user.tipo_usuario,
-            'is_staff': user.is_staff,
-            'is_superuser': user.is_superuser,
-        }
-        
         # Get the token as a string
         access_token_str = str(access_token)
         refresh_token_str = str(refresh)
@@ -80,6 +208,10 @@ class CustomJWTAuthentication(JWTAuthentication):
     
     This class extends the default JWT authentication to include additional
     user information in the validated token and provides better error handling.
+    
+    Views that set ``claims_only_auth = True`` get a ``ClaimsUser`` built from
+    the token claims on safe-method requests, so reading the catalog needs no
+    user query unless a field outside the claims is accessed.
     """
     
     def get_user(self, validated_token):
@@ -100,8 +232,7 @@ class CustomJWTAuthentication(JWTAuthentication):
             raise InvalidToken('No validated token provided')
             
         try:
-            # Get the user using the parent class method
-            user = super().get_user(validated_token)
+            user = self._get_cached_user(validated_token)
             
             if not user:
                 logger.error("No user found for the given token")
@@ -128,10 +259,29 @@ class CustomJWTAuthentication(JWTAuthentication):
             logger.debug("Authenticated user: %s", user.email)
             return user
             
+        except (InvalidToken, exceptions.AuthenticationFailed):
+            raise
         except Exception as e:
             logger.exception("Error authenticating user: %s", str(e))
             raise InvalidToken('Error authenticating user')
     
+    def _get_cached_user(self, validated_token):
+        """
+        Resolve the token's user through ``api.utils.user_cache``.
+        
+        Mirrors ``JWTAuthentication.get_user`` but avoids a database query
+        when the user is already cached.
+        """
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+        
+        try:
+            return user_cache.get_user(user_id, lookup_field=jwt_settings.USER_ID_FIELD)
+        except get_user_model().DoesNotExist:
+            raise exceptions.AuthenticationFailed('User not found', code='user_not_found')
+    
     def get_validated_token(self, raw_token):
         """
         Validate the token and return a validated token wrapper.
@@ -145,6 +295,12 @@ class CustomJWTAuthentication(JWTAuthentication):
         Raises:
             InvalidToken: If the token is invalid or expired
         """
+        key = _token_cache_key(raw_token)
+        cached = _validated_tokens.get(key)
+        if cached is not None:
+            token_class, payload = cached
+            return self._check_revoked(_token_from_payload(token_class, raw_token, payload))
+        
         try:
             # Use the parent class to validate the token
             validated_token = super().get_validated_token(raw_token)
@@ -152,8 +308,16 @@ class CustomJWTAuthentication(JWTAuthentication):
             # Additional custom validation can be added here
             self._validate_token_type(validated_token)
             
-            return validated_token
+            ttl = validated_token.get('exp', 0) - time.time()
+            if ttl > 0:
+                _validated_tokens.set(
+                    key, (type(validated_token), dict(validated_token.payload)), timeout=ttl
+                )
+            
+            return self._check_revoked(validated_token)
             
+        except InvalidToken:
+            raise
         except TokenError as e:
             logger.warning("Token validation failed: %s", str(e))
             raise InvalidToken(str(e))
@@ -161,6 +325,12 @@ class CustomJWTAuthentication(JWTAuthentication):
             logger.exception("Unexpected error during token validation: %s", str(e))
             raise InvalidToken('Invalid token')
     
+    def _check_revoked(self, token):
+        """Reject tokens revoked through ``api.utils.token_revocation``."""
+        if token_revocation.is_token_revoked(token):
+            raise InvalidToken('Token has been revoked')
+        return token
+    
     def _validate_token_type(self, token):
         """
         Validate the token type.
@@ -186,7 +356,12 @@ class CustomJWTAuthentication(JWTAuthentication):
             request: The HTTP request
             
         Returns:
-            tuple: (user, token) if authentication is successful, None otherwise
+            tuple: (user, token) if authentication is successful, None if
+            the request carries no token
+            
+        Raises:
+            InvalidToken: If the token is invalid, expired or revoked
+            AuthenticationFailed: If the user is missing or inactive
         """
         header = self.get_header(request)
         if header is None:
@@ -196,18 +371,30 @@ class CustomJWTAuthentication(JWTAuthentication):
         if raw_token is None:
             return None
 
-        try:
-            validated_token = self.get_validated_token(raw_token)
+        validated_token = self.get_validated_token(raw_token)
+        if self._use_claims_only(request):
+            user = ClaimsUser(validated_token)
+        else:
             user = self.get_user(validated_token)
-            
-            # Check if the token is about to expire soon (within 5 minutes)
-            self._check_token_expiration(validated_token)
-            
-            return user, validated_token
-            
-        except Exception as e:
-            logger.warning("Authentication failed: %s", str(e))
-            return None
+        
+        # Check if the token is about to expire soon (within 5 minutes)
+        self._check_token_expiration(validated_token)
+        
+        return user, validated_token
+    
+    def _use_claims_only(self, request):
+        """
+        Whether the request can be served with a ``ClaimsUser``.
+        
+        Only safe methods on views that opt in with ``claims_only_auth``.
+        """
+        if not getattr(settings, 'JWT_CLAIMS_ONLY_AUTH', True):
+            return False
+        if request.method not in SAFE_METHODS:
+            return False
+        
+        parser_context = getattr(request, 'parser_context', None) or {}
+        return getattr(parser_context.get('view'), 'claims_only_auth', False)
     
     def _check_token_expiration(self, token):
         """
@@ -221,14 +408,10 @@ class CustomJWTAuthentication(JWTAuthentication):
         """
         if not token or 'exp' not in token:
             return False
-            
-        exp_timestamp = token['exp']
-        exp_datetime = datetime.fromtimestamp(exp_timestamp, tz=timezone.utc)
-        now = timezone.now()
         
         # Check if token expires in less than 5 minutes
-        if (exp_datetime - now) < timedelta(minutes=5):
-            logger.debug("Token for user %s is about to expire soon", token.get('user', {}).get('email', 'unknown'))
+        if token['exp'] - time.time() < TOKEN_EXPIRY_WARNING_SECONDS:
+            logger.debug("Token for user %s is about to expire soon", token.get('email', 'unknown'))
             return True
             
         return False
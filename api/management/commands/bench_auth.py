@@ -0,0 +1,84 @@
+"""
+Micro-benchmark of the per-request authentication overhead.
+
+Usage:
+    python manage.py bench_auth --iterations 5000
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import authentication
+from api.utils import user_cache
+
+BENCH_EMAIL = 'bench-auth@oniet.local'
+
+
+class Command(BaseCommand):
+    help = 'Mide el costo de autenticar una petición con y sin las cachés de tokens y usuarios.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+
+    def _time(self, label, iterations, authenticate, before_each=None):
+        # Warm up imports, connections and caches.
+        for _ in range(10):
+            if before_each:
+                before_each()
+            authenticate()
+
+        total = 0.0
+        for _ in range(iterations):
+            if before_each:
+                before_each()
+            started = time.perf_counter()
+            result = authenticate()
+            total += time.perf_counter() - started
+            assert result is not None, 'La autenticación falló durante el benchmark'
+
+        per_request = total / iterations * 1e6
+        self.stdout.write(f"{label:<45} {per_request:>10.1f} µs/petición")
+        return per_request
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        User = get_user_model()
+        user = User.objects.filter(email=BENCH_EMAIL).first()
+        if user is None:
+            user = User.objects.create_user(
+                email=BENCH_EMAIL, password=None, nombre='Bench', apellido='Auth'
+            )
+
+        raw = str(RefreshToken.for_user(user).access_token)
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {raw}')
+
+        simplejwt_auth = JWTAuthentication()
+        custom_auth = authentication.CustomJWTAuthentication()
+
+        def clear_all():
+            authentication.clear_token_cache()
+            user_cache.invalidate(user.pk)
+
+        self.stdout.write(f"Iteraciones: {iterations}")
+        baseline = self._time(
+            'simplejwt JWTAuthentication (sin cachés)', iterations,
+            lambda: simplejwt_auth.authenticate(request),
+        )
+        self._time(
+            'CustomJWTAuthentication, cachés frías', iterations,
+            lambda: custom_auth.authenticate(request), before_each=clear_all,
+        )
+        self._time(
+            'CustomJWTAuthentication, solo caché de usuario', iterations,
+            lambda: custom_auth.authenticate(request), before_each=authentication.clear_token_cache,
+        )
+        cached = self._time(
+            'CustomJWTAuthentication, cachés calientes', iterations,
+            lambda: custom_auth.authenticate(request),
+        )
+
+        self.stdout.write(self.style.SUCCESS(f"Mejora: {baseline / cached:.1f}x"))
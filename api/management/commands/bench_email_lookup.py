@@ -0,0 +1,104 @@
+"""
+Compare case-insensitive and normalized email lookups on a large user table.
+
+Seeds ``--users`` throwaway users (unusable passwords, bulk inserted) and
+times ``email__iexact`` against the exact lookup on the stored lowercase
+email, plus the cached ``check_email`` path. On PostgreSQL the query plans
+are printed as well.
+
+Usage:
+    python manage.py bench_email_lookup --users 1000000
+    python manage.py bench_email_lookup --cleanup
+"""
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.utils import user_cache
+
+BENCH_DOMAIN = 'bench-email.oniet.local'
+
+
+class Command(BaseCommand):
+    help = 'Mide las búsquedas de email (iexact vs. normalizada) con muchos usuarios.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--lookups', type=int, default=500)
+        parser.add_argument('--cleanup', action='store_true', help='Eliminar los usuarios sembrados y salir.')
+
+    def _queryset(self):
+        return get_user_model().objects.filter(email__endswith=f'@{BENCH_DOMAIN}')
+
+    def _seed(self, total, batch_size):
+        User = get_user_model()
+        existing = self._queryset().count()
+        if existing >= total:
+            self.stdout.write(f"Usando {existing} usuarios ya sembrados.")
+            return
+
+        # One unusable hash shared by every row: hashing a million passwords
+        # would dominate the run.
+        password = make_password(None)
+        started = time.perf_counter()
+        for start in range(existing, total, batch_size):
+            User.objects.bulk_create([
+                User(
+                    email=f'user{i}@{BENCH_DOMAIN}', nombre='Bench', apellido=str(i),
+                    password=password,
+                )
+                for i in range(start, min(start + batch_size, total))
+            ], batch_size=batch_size)
+            self.stdout.write(f"  {min(start + batch_size, total)}/{total}", ending='\r')
+        self.stdout.write(f"\nSembrados {total - existing} usuarios en {time.perf_counter() - started:.1f}s")
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {User._meta.db_table}')
+
+    def _time(self, label, emails, lookup):
+        started = time.perf_counter()
+        for email in emails:
+            lookup(email)
+        per_lookup = (time.perf_counter() - started) / len(emails) * 1e3
+        self.stdout.write(f"{label:<40} {per_lookup:>9.3f} ms/búsqueda")
+
+    def _explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            self.stdout.write(queryset.explain())
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['cleanup']:
+            queryset = self._queryset()
+            # Seeded rows have no carts, groups or permissions (bulk_create
+            # skips signals), so a raw DELETE avoids collecting a million rows.
+            deleted = queryset._raw_delete(queryset.db)
+            self.stdout.write(self.style.SUCCESS(f"Eliminados {deleted} usuarios de benchmark."))
+            return
+
+        total = options['users']
+        self._seed(total, options['batch_size'])
+
+        rng = random.Random(0)
+        hits = [f'User{rng.randrange(total)}@{BENCH_DOMAIN.upper()}' for _ in range(options['lookups'])]
+        misses = [f'nobody{i}@{BENCH_DOMAIN}' for i in range(options['lookups'])]
+
+        self._explain(User.objects.filter(email__iexact=hits[0]))
+        self._explain(User.objects.filter(email=User.objects.normalize_email(hits[0])))
+
+        self._time('email__iexact (existente)', hits,
+                   lambda e: User.objects.filter(email__iexact=e).exists())
+        self._time('exacta normalizada (existente)', hits,
+                   lambda e: User.objects.filter(email=User.objects.normalize_email(e)).exists())
+        self._time('get_by_natural_key (login)', hits,
+                   lambda e: User.objects.get_by_natural_key(e))
+        self._time('email__iexact (libre)', misses,
+                   lambda e: User.objects.filter(email__iexact=e).exists())
+        self._time('check_email, caché fría (libre)', misses, user_cache.is_email_registered)
+        self._time('check_email, caché caliente (libre)', misses, user_cache.is_email_registered)
@@ -0,0 +1,345 @@
+"""
+Reproducible benchmark of the main API flows on a seeded dataset.
+
+Seeds a dataset with ``api.services.datagen`` (unless ``--skip-seed``), then
+runs ``--concurrency`` virtual clients for ``--duration`` seconds. Each one
+is logged in as a different generated user and mixes the main flows: browse
+the catalog, search it, add to the cart, check out and read the purchase
+history. It reports requests per second and p50/p95/p99 latency per flow,
+plus the server-side database time and query count taken from the
+``Server-Timing`` header, and saves the result as JSON.
+
+Without ``--url`` the project is served in-process on a free local port, so
+the benchmark runs offline against whatever database ``DATABASE_URL``
+points to (SQLite or a local PostgreSQL). Checkouts write sales, so point
+it at a disposable database. Run the server under test, in-process or
+not, with ``THROTTLING_ENABLED=False``: every client makes far more
+requests than a user's burst rate allows. It also needs
+``SERVER_TIMING=True``, since the clients are not staff.
+
+Usage:
+    python manage.py benchmark_api --usuarios 2000 --paquetes 5000 --ventas 20000 --reset
+    python manage.py benchmark_api --skip-seed --concurrency 16 --duration 60 --compare benchmarks/anterior.json
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+from django.db import connection
+from rest_framework.settings import api_settings
+
+from api.authentication import UserClaimsRefreshToken
+from api.models import Paquete, Usuario
+from api.services import datagen
+from api.utils import instrumentation
+
+from .loadtest_catalog import _percentile
+
+# Flow name, relative weight.
+FLOWS = [
+    ('browse', 40),
+    ('search', 20),
+    ('add_to_cart', 15),
+    ('checkout', 5),
+    ('purchase_history', 20),
+]
+
+SEARCH_TERMS = [destino.split()[0] for destino, _ in datagen.DESTINOS]
+
+_SERVER_TIMING = re.compile(r'(\w+);dur=([\d.]+)(?:;desc="(\d+) queries")?')
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def _start_server():
+    """Serve the project on a free local port in a background thread."""
+    server = ThreadedWSGIServer(('127.0.0.1', 0), _QuietHandler, allow_reuse_address=True)
+    server.daemon_threads = True
+    server.set_app(get_internal_wsgi_application())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def _server_timing(header):
+    """Return (db seconds, query count) from a ``Server-Timing`` header."""
+    db, queries = None, None
+    for name, duration, count in _SERVER_TIMING.findall(header or ''):
+        if name == 'db':
+            db = float(duration) / 1000
+            queries = int(count) if count else None
+    return db, queries
+
+
+class _Client:
+    """One virtual user driving the flows with its own token and random stream."""
+
+    def __init__(self, base_url, token, paquete_ids, rng):
+        self.base_url = base_url
+        self.token = token
+        self.paquete_ids = paquete_ids
+        self.rng = rng
+        self.items_in_cart = 0
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method, headers={
+            'Authorization': f'Bearer {self.token}',
+            'Content-Type': 'application/json',
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                return response.status, response.headers.get('Server-Timing')
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code, exc.headers.get('Server-Timing')
+
+    def next_flow(self):
+        names, weights = zip(*FLOWS)
+        flow = self.rng.choices(names, weights)[0]
+        if flow == 'checkout' and not self.items_in_cart:
+            flow = 'add_to_cart'
+        return flow
+
+    def run(self, flow):
+        if flow == 'browse':
+            return self.request('GET', f'/api/v1/paquetes/?page={self.rng.randint(1, 5)}')
+        if flow == 'search':
+            return self.request('GET', f'/api/v1/paquetes/?search={urllib.parse.quote(self.rng.choice(SEARCH_TERMS))}')
+        if flow == 'add_to_cart':
+            result = self.request('POST', '/api/v1/carrito/agregar-item/', {
+                'paquete_id': str(self.rng.choice(self.paquete_ids)),
+                'cantidad': 1,
+            })
+            if result[0] == 201:
+                self.items_in_cart += 1
+            return result
+        if flow == 'checkout':
+            # The router's ``ventas/<pk>/`` route shadows ``ventas/confirmar-pago/``.
+            result = self.request('POST', '/api/v1/ventas/confirmar_pago/', {
+                'metodo_pago': self.rng.choice(datagen.METODOS_PAGO),
+            })
+            if result[0] == 201:
+                self.items_in_cart = 0
+            return result
+        return self.request('GET', '/api/v1/mis-compras/')
+
+
+def _summary(samples, errors, wall):
+    latencies = sorted(sample[0] for sample in samples)
+    db_times = [sample[1] for sample in samples if sample[1] is not None]
+    queries = [sample[2] for sample in samples if sample[2] is not None]
+    to_ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / wall, 1),
+        'p50_ms': to_ms(_percentile(latencies, 0.50)),
+        'p95_ms': to_ms(_percentile(latencies, 0.95)),
+        'p99_ms': to_ms(_percentile(latencies, 0.99)),
+        'db_avg_ms': to_ms(sum(db_times) / len(db_times)) if db_times else None,
+        'queries_avg': round(sum(queries) / len(queries), 1) if queries else None,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Genera un conjunto de datos y mide throughput y latencia (p50/p95/p99) de los flujos principales de la API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=1000)
+        parser.add_argument('--paquetes', type=int, default=2000)
+        parser.add_argument('--ventas', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=datagen.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--skip-seed', action='store_true', help='Usar los datos generados existentes')
+        parser.add_argument('--reset', action='store_true', help='Borrar los datos generados antes de sembrar')
+        parser.add_argument('--url', help='URL base de un servidor ya levantado; por defecto se levanta uno local')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=30, help='Segundos de carga')
+        parser.add_argument('--warmup', type=float, default=3, help='Segundos de carga descartados al inicio')
+        parser.add_argument('--output', help='Archivo JSON de resultados (por defecto benchmarks/api-<fecha>.json)')
+        parser.add_argument('--compare', help='Resultado JSON anterior contra el que comparar')
+
+    def _seed(self, options):
+        if options['reset']:
+            deleted = datagen.purge()
+            self.stdout.write(f"Datos generados borrados: {deleted}")
+        elif datagen.exists():
+            raise CommandError('Ya hay datos generados. Use --reset para regenerarlos o --skip-seed para reutilizarlos.')
+
+        current = [None]
+
+        def progress(stage, done, total):
+            if current[0] not in (None, stage):
+                self.stdout.write('')
+            current[0] = stage
+            self.stdout.write(f"\r  {stage}: {done}/~{total}", ending='')
+
+        self.stdout.write(f"Generando datos (seed {options['seed']})...")
+        summary = datagen.generate(
+            usuarios=options['usuarios'],
+            paquetes=options['paquetes'],
+            ventas=options['ventas'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            # Clients authenticate with tokens, so one password hash is enough.
+            hashes=1,
+            workers=1,
+            progress=progress,
+        )
+        self.stdout.write('')
+        return summary
+
+    def _clients(self, base_url, options):
+        usuarios = list(
+            Usuario.objects.filter(email__endswith=f'@{datagen.EMAIL_DOMAIN}')
+            .order_by('email')[:options['concurrency']]
+        )
+        if len(usuarios) < options['concurrency']:
+            raise CommandError(
+                f"Hay {len(usuarios)} usuarios generados y se necesita uno por cliente ({options['concurrency']})."
+            )
+        paquete_ids = list(
+            Paquete.objects.filter(nombre__contains=datagen.PAQUETE_TAG, is_active=True)
+            .order_by('id').values_list('id', flat=True)[:10_000]
+        )
+        if not paquete_ids:
+            raise CommandError('No hay paquetes generados.')
+        return [
+            _Client(base_url, str(UserClaimsRefreshToken.for_user(usuario).access_token), paquete_ids,
+                    random.Random(options['seed'] + n))
+            for n, usuario in enumerate(usuarios)
+        ]
+
+    def _load(self, clients, warmup, duration):
+        samples = {name: [] for name, _ in FLOWS}
+        errors = {name: 0 for name, _ in FLOWS}
+        lock = threading.Lock()
+        measure_from = time.perf_counter() + warmup
+        deadline = measure_from + duration
+
+        def worker(client):
+            while True:
+                flow = client.next_flow()
+                started = time.perf_counter()
+                if started >= deadline:
+                    break
+                try:
+                    status, timing = client.run(flow)
+                except (urllib.error.URLError, OSError):
+                    status, timing = None, None
+                elapsed = time.perf_counter() - started
+                if started < measure_from:
+                    continue
+                with lock:
+                    if status is not None and status < 400:
+                        samples[flow].append((elapsed, *_server_timing(timing)))
+                    else:
+                        errors[flow] += 1
+
+        threads = [threading.Thread(target=worker, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return samples, errors
+
+    def handle(self, *args, **options):
+        seed_summary = None if options['skip_seed'] else self._seed(options)
+
+        server = None
+        base_url = options['url']
+        if base_url:
+            base_url = base_url.rstrip('/')
+        else:
+            if api_settings.DEFAULT_THROTTLE_CLASSES:
+                self.stderr.write(self.style.WARNING(
+                    'Los throttles están activos: las respuestas 429 contarán como errores. '
+                    'Ejecute con THROTTLING_ENABLED=False.'
+                ))
+            if instrumentation._get_setting('SERVER_TIMING') is not True:
+                self.stderr.write(self.style.WARNING(
+                    'El header Server-Timing no se envía a todos los usuarios: no habrá tiempos de base de datos. '
+                    'Ejecute con SERVER_TIMING=True.'
+                ))
+            server, base_url = _start_server()
+
+        try:
+            clients = self._clients(base_url, options)
+            self.stdout.write(
+                f"{base_url} · {len(clients)} clientes · {options['duration']} s "
+                f"(+{options['warmup']} s de calentamiento)"
+            )
+            samples, errors = self._load(clients, options['warmup'], options['duration'])
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+        wall = options['duration']
+        all_samples = [sample for values in samples.values() for sample in values]
+        result = {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'url': options['url'] or 'in-process',
+            'database': connection.vendor,
+            'seed': options['seed'],
+            'dataset': {
+                'usuarios': Usuario.objects.filter(email__endswith=f'@{datagen.EMAIL_DOMAIN}').count(),
+                'paquetes': Paquete.objects.filter(nombre__contains=datagen.PAQUETE_TAG).count(),
+                'generation': seed_summary,
+            },
+            'concurrency': options['concurrency'],
+            'duration_s': wall,
+            'total': _summary(all_samples, sum(errors.values()), wall),
+            'flows': {name: _summary(samples[name], errors[name], wall) for name, _ in FLOWS},
+        }
+
+        output = options['output'] or os.path.join(
+            'benchmarks', f"api-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        )
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+        previous = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                previous = json.load(f)
+        self._print(result, previous)
+        self.stdout.write(self.style.SUCCESS(f'Resultados guardados en {output}'))
+
+    def _print(self, result, previous):
+        header = f"{'flujo':<18} {'req':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'db':>7} {'q':>5}"
+        if previous:
+            header += f" {'Δrps':>8} {'Δp95':>8}"
+        self.stdout.write(header)
+
+        rows = list(result['flows'].items()) + [('TOTAL', result['total'])]
+        for name, row in rows:
+            line = (
+                f"{name:<18} {row['requests']:>7} {row['errors']:>5} {row['rps']:>8} "
+                f"{row['p50_ms'] or '-':>8} {row['p95_ms'] or '-':>8} {row['p99_ms'] or '-':>8} "
+                f"{row['db_avg_ms'] or '-':>7} {row['queries_avg'] or '-':>5}"
+            )
+            if previous:
+                before = previous['total'] if name == 'TOTAL' else previous['flows'].get(name)
+                line += f" {self._delta(before, row, 'rps'):>8} {self._delta(before, row, 'p95_ms'):>8}"
+            self.stdout.write(line)
+
+    @staticmethod
+    def _delta(before, after, key):
+        if not before or not before.get(key) or after.get(key) is None:
+            return '-'
+        return f'{(after[key] - before[key]) / before[key] * 100:+.1f}%'
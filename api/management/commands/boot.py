@@ -0,0 +1,84 @@
+"""
+Startup steps that only run when their inputs changed.
+
+Replaces the unconditional ``migrate``, ``collectstatic`` and
+``check --deploy`` in ``start.sh``. See ``api.utils.boot`` for how each
+step decides to skip. A fresh instance started from an image built with
+``boot --steps collectstatic,check`` runs one query and a few file hashes
+before the server starts.
+
+Usage:
+    python manage.py boot
+    python manage.py boot --steps collectstatic,check   # at build time
+    python manage.py boot --force
+"""
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from api.utils import boot
+
+STEPS = ('migrate', 'collectstatic', 'check')
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta migrate, collectstatic y check --deploy solo si cambiaron sus entradas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--steps', default=','.join(STEPS),
+                            help=f"Pasos a ejecutar, separados por coma ({', '.join(STEPS)})")
+        parser.add_argument('--force', action='store_true', help='Ejecutar los pasos aunque nada haya cambiado')
+        parser.add_argument('--lock-timeout', type=float,
+                            help='Segundos de espera por el lock de migraciones')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        steps = [step.strip() for step in options['steps'].split(',') if step.strip()]
+        unknown = set(steps) - set(STEPS)
+        if unknown:
+            raise CommandError(f"Pasos desconocidos: {', '.join(sorted(unknown))}")
+
+        self.force = options['force']
+        started = time.perf_counter()
+        for step in STEPS:
+            if step not in steps:
+                continue
+            step_started = time.perf_counter()
+            ran = getattr(self, f'_{step}')(options)
+            verb = 'ejecutado' if ran else 'omitido, sin cambios'
+            self.stdout.write(f'  {step}: {verb} ({time.perf_counter() - step_started:.2f} s)')
+        self.stdout.write(self.style.SUCCESS(f'Arranque listo en {time.perf_counter() - started:.2f} s'))
+
+    def _migrate(self, options):
+        database = options['database']
+        if not self.force and not boot.pending_migrations(database):
+            return False
+
+        try:
+            with boot.migration_lock(database, timeout=options['lock_timeout']):
+                # Another instance may have migrated while we waited for the lock.
+                pending = boot.pending_migrations(database)
+                if not self.force and not pending:
+                    return False
+                self.stdout.write(f'  migrate: {len(pending)} migraciones pendientes')
+                call_command('migrate', database=database, interactive=False, verbosity=1)
+        except TimeoutError as exc:
+            raise CommandError(f'No se pudo obtener el lock de migraciones: {exc}')
+        return True
+
+    def _collectstatic(self, options):
+        fingerprint = boot.static_fingerprint()
+        if not self.force and boot.read_stamp(boot.static_stamp_path()) == fingerprint:
+            return False
+        call_command('collectstatic', interactive=False, verbosity=0)
+        boot.write_stamp(boot.static_stamp_path(), fingerprint)
+        return True
+
+    def _check(self, options):
+        fingerprint = boot.check_fingerprint()
+        if not self.force and boot.read_stamp(boot.check_stamp_path()) == fingerprint:
+            return False
+        call_command('check', deploy=True)
+        boot.write_stamp(boot.check_stamp_path(), fingerprint)
+        return True
@@ -0,0 +1,55 @@
+"""
+Export sales and their lines to a file or stdout.
+
+Usage:
+    python manage.py exportar_ventas --formato ndjson --desde 2025-01-01 --gzip -o ventas.ndjson.gz
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services import ventas_export
+
+
+class Command(BaseCommand):
+    help = 'Exporta ventas con sus detalles en CSV o NDJSON sin cargarlas en memoria.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=ventas_export.FORMATOS, default='csv')
+        parser.add_argument('--desde', help='Fecha de venta inicial (YYYY-MM-DD).')
+        parser.add_argument('--hasta', help='Fecha de venta final (YYYY-MM-DD).')
+        parser.add_argument('--estado', help='Estados separados por coma.')
+        parser.add_argument('--gzip', action='store_true', help='Comprimir la salida con gzip.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=ventas_export.DEFAULT_CHUNK_SIZE,
+            help='Filas leídas por viaje a la base de datos.'
+        )
+        parser.add_argument('-o', '--output', help='Archivo de salida (por defecto stdout).')
+
+    def handle(self, *args, **options):
+        try:
+            filtros = ventas_export.parse_filtros(
+                desde=options['desde'],
+                hasta=options['hasta'],
+                estado=options['estado'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        chunks = ventas_export.iter_export(
+            formato=options['formato'],
+            comprimir=options['gzip'],
+            chunk_size=options['chunk_size'],
+            **filtros
+        )
+
+        if options['output']:
+            with open(options['output'], 'wb') as destino:
+                for chunk in chunks:
+                    destino.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Exportación escrita en {options['output']}"))
+        else:
+            destino = sys.stdout.buffer
+            for chunk in chunks:
+                destino.write(chunk)
+            destino.flush()
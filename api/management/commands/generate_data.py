@@ -0,0 +1,97 @@
+"""
+Generate a large synthetic dataset for local performance work.
+
+See ``api.services.datagen`` for what is generated and how. The same
+arguments always produce the same rows; pass ``--fecha-base`` to
+reproduce a run from another day (the date used is printed at the end).
+
+Usage:
+    python manage.py generate_data --usuarios 1000000 --paquetes 200000 --ventas 3000000 --workers 8
+    python manage.py generate_data --reset --popular-share 0 --heavy-share 0   # uniform demand
+    python manage.py generate_data --reset --fecha-base 2026-01-01 --dias-ventas 730
+"""
+import json
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services import datagen
+
+
+class Command(BaseCommand):
+    help = 'Genera paquetes, usuarios, carritos y ventas sintéticos en lotes con bulk_create.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=100_000)
+        parser.add_argument('--paquetes', type=int, default=20_000)
+        parser.add_argument('--ventas', type=int, default=300_000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000, help='Filas por bulk_create')
+        parser.add_argument('--carritos-con-items', type=float, default=0.3,
+                            help='Fracción de carritos con ítems')
+        parser.add_argument('--workers', type=int, help='Procesos para calcular hashes de contraseñas (por defecto, uno por CPU)')
+        parser.add_argument('--hashes', type=int, default=datagen.DEFAULT_HASHES,
+                            help='Hashes de contraseña distintos repartidos entre los usuarios; 0 = uno por usuario')
+        parser.add_argument('--popular-fraction', type=float, default=0.05, help='Fracción de paquetes populares')
+        parser.add_argument('--popular-share', type=float, default=0.5,
+                            help='Proporción extra de ventas y carritos que va a los paquetes populares')
+        parser.add_argument('--heavy-fraction', type=float, default=0.05, help='Fracción de usuarios grandes compradores')
+        parser.add_argument('--heavy-share', type=float, default=0.4,
+                            help='Proporción extra de ventas hechas por los grandes compradores')
+        parser.add_argument('--fecha-base', type=date.fromisoformat,
+                            help='Fecha (AAAA-MM-DD) de la que se derivan todas las fechas; por defecto, hoy')
+        parser.add_argument('--dias-ventas', type=int, default=datagen.DEFAULT_DIAS_VENTAS,
+                            help='Días antes de la fecha base en los que se reparten las ventas')
+        parser.add_argument('--reset', action='store_true', help='Borrar los datos generados antes de generar')
+
+    def handle(self, *args, **options):
+        for name in ('popular_fraction', 'popular_share', 'heavy_fraction', 'heavy_share', 'carritos_con_items'):
+            if not 0 <= options[name] <= 1:
+                raise CommandError(f"--{name.replace('_', '-')} debe estar entre 0 y 1.")
+        if options['dias_ventas'] < 1:
+            raise CommandError('--dias-ventas debe ser al menos 1.')
+        fecha_base = options['fecha_base'] or date.today()
+
+        if options['reset']:
+            self.stdout.write('Borrando datos generados...')
+            self.stdout.write(f'  {datagen.purge()}')
+        elif datagen.exists():
+            raise CommandError('Ya hay datos generados. Use --reset para regenerarlos.')
+
+        current = [None]
+
+        def progress(stage, done, total):
+            if current[0] not in (None, stage):
+                self.stdout.write('')
+            current[0] = stage
+            self.stdout.write(f"\r  {stage}: {done}/~{total}", ending='')
+            self.stdout.flush()
+
+        skew = datagen.Skew(
+            popular_fraction=options['popular_fraction'],
+            popular_share=options['popular_share'],
+            heavy_fraction=options['heavy_fraction'],
+            heavy_share=options['heavy_share'],
+        )
+        self.stdout.write(f"Generando datos (seed {options['seed']})...")
+        started = time.perf_counter()
+        summary = datagen.generate(
+            usuarios=options['usuarios'],
+            paquetes=options['paquetes'],
+            ventas=options['ventas'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            carritos_con_items=options['carritos_con_items'],
+            skew=skew,
+            hashes=options['hashes'],
+            workers=options['workers'],
+            progress=progress,
+            fecha_base=fecha_base,
+            dias_ventas=options['dias_ventas'],
+        )
+        self.stdout.write('')
+        self.stdout.write(json.dumps({
+            'fecha_base': fecha_base.isoformat(), 'skew': skew.as_dict(), 'stages': summary,
+        }, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'Datos generados en {time.perf_counter() - started:.1f} s'))
@@ -0,0 +1,131 @@
+"""
+Load test of the catalog read endpoints against a running server.
+
+Run it once against each server profile (``SERVER_PROFILE=wsgi`` and
+``SERVER_PROFILE=asgi`` in ``start.sh``) with the same worker count to
+compare them. Start those servers with ``THROTTLING_ENABLED=False``; a
+single token at this concurrency exceeds the per-user throttles.
+
+Usage:
+    python manage.py loadtest_catalog --url http://localhost:8000 --concurrency 32 --duration 30
+"""
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from api.authentication import UserClaimsRefreshToken
+
+BENCH_EMAIL = 'bench-catalog@oniet.local'
+
+PATHS = [
+    '/api/v1/paquetes/',
+    '/api/v1/paquetes/?page=2',
+    '/api/v1/paquetes/destacados/',
+    '/api/v1/paquetes/categorias/',
+    '/api/v1/categorias-paquetes/',
+    '/api/v1/carrito/mi-carrito/',
+]
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia (p50/p95/p99) y peticiones por segundo de los endpoints del catálogo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000', help='URL base del servidor')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=20, help='Segundos de carga')
+        parser.add_argument('--token', help='Access token a usar; por defecto se genera uno para un usuario de prueba')
+        parser.add_argument('--json', action='store_true', help='Imprimir el resultado como JSON')
+
+    def _token(self):
+        User = get_user_model()
+        user = User.objects.filter(email=BENCH_EMAIL).first()
+        if user is None:
+            user = User.objects.create_user(
+                email=BENCH_EMAIL, password=None, nombre='Bench', apellido='Catalogo'
+            )
+        return str(UserClaimsRefreshToken.for_user(user).access_token)
+
+    def handle(self, *args, **options):
+        base_url = options['url'].rstrip('/')
+        token = options['token'] or self._token()
+        deadline = time.perf_counter() + options['duration']
+
+        latencies = {path: [] for path in PATHS}
+        errors = {path: 0 for path in PATHS}
+        lock = threading.Lock()
+
+        def worker(offset):
+            i = offset
+            while time.perf_counter() < deadline:
+                path = PATHS[i % len(PATHS)]
+                i += 1
+                request = urllib.request.Request(
+                    base_url + path, headers={'Authorization': f'Bearer {token}'}
+                )
+                started = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(request, timeout=30) as response:
+                        response.read()
+                    ok = True
+                except (urllib.error.URLError, OSError):
+                    ok = False
+                elapsed = time.perf_counter() - started
+                with lock:
+                    if ok:
+                        latencies[path].append(elapsed)
+                    else:
+                        errors[path] += 1
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        def summary(values, failed):
+            values = sorted(values)
+            to_ms = lambda v: round(v * 1000, 2) if v is not None else None
+            return {
+                'requests': len(values),
+                'errors': failed,
+                'rps': round(len(values) / wall, 1),
+                'p50_ms': to_ms(_percentile(values, 0.50)),
+                'p95_ms': to_ms(_percentile(values, 0.95)),
+                'p99_ms': to_ms(_percentile(values, 0.99)),
+            }
+
+        result = {
+            'url': base_url,
+            'concurrency': options['concurrency'],
+            'duration_s': round(wall, 2),
+            'total': summary([v for values in latencies.values() for v in values], sum(errors.values())),
+            'endpoints': {path: summary(latencies[path], errors[path]) for path in PATHS},
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+
+        self.stdout.write(f"{base_url} · concurrencia {result['concurrency']} · {result['duration_s']} s")
+        self.stdout.write(f"{'endpoint':<35} {'req':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+        rows = list(result['endpoints'].items()) + [('TOTAL', result['total'])]
+        for path, row in rows:
+            self.stdout.write(
+                f"{path:<35} {row['requests']:>7} {row['errors']:>5} {row['rps']:>8} "
+                f"{row['p50_ms'] or '-':>8} {row['p95_ms'] or '-':>8} {row['p99_ms'] or '-':>8}"
+            )
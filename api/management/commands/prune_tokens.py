@@ -0,0 +1,60 @@
+"""
+Delete expired rows from the simplejwt blacklist tables in batches.
+
+Revocations now live in the cache (see ``api.utils.token_revocation``), so
+these tables only hold leftovers from when the blacklist app was used.
+
+Usage:
+    python manage.py prune_tokens --batch-size 5000
+"""
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+BLACKLIST_APP = 'rest_framework_simplejwt.token_blacklist'
+
+
+class Command(BaseCommand):
+    help = 'Elimina en lotes los OutstandingToken vencidos (y sus BlacklistedToken).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help='Segundos de espera entre lotes para no saturar la base de datos.'
+        )
+
+    def handle(self, *args, **options):
+        if not apps.is_installed(BLACKLIST_APP):
+            self.stdout.write(f"{BLACKLIST_APP} no está instalada; no hay tokens que eliminar.")
+            return
+
+        from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+        batch_size = options['batch_size']
+        now = timezone.now()
+        total = 0
+
+        while True:
+            ids = list(
+                OutstandingToken.objects
+                .filter(expires_at__lt=now)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            with transaction.atomic():
+                # BlacklistedToken rows go with their OutstandingToken (CASCADE).
+                OutstandingToken.objects.filter(id__in=ids).delete()
+
+            total += len(ids)
+            self.stdout.write(f"Eliminados {total} tokens vencidos...")
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f"Listo: {total} tokens vencidos eliminados."))
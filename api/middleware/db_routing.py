@@ -0,0 +1,48 @@
+"""
+Middleware that keeps a user's reads on the primary after their writes.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from rest_framework.permissions import SAFE_METHODS
+
+from ..utils import db_routing
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Mark the user as sticky to the primary after a successful write.
+
+    See ``api.utils.db_routing``. Does nothing when no replica is configured.
+    Works in sync and async mode; in async mode the cache write runs in a
+    thread, and only after a successful write.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self._wrote(request, response):
+            self._mark_sticky(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self._wrote(request, response):
+            await sync_to_async(self._mark_sticky)(request)
+        return response
+
+    def _wrote(self, request, response):
+        return request.method not in SAFE_METHODS and response.status_code < 400 and db_routing.replica_aliases()
+
+    def _mark_sticky(self, request):
+        # DRF sets the authenticated user on the Django request too
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            db_routing.mark_sticky(user.pk)
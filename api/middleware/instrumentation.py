@@ -0,0 +1,63 @@
+"""
+Middleware that measures every request.
+"""
+from contextlib import contextmanager, nullcontext
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from ..utils import instrumentation, metrics, nplusone
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Collect wall, database, cache and serializer metrics for each request.
+
+    See ``api.utils.instrumentation``. The totals also feed the ``/metrics``
+    registry (``api.utils.metrics``). When ``NPLUSONE['ENABLED']`` is set the
+    request also runs under the N+1 detector (``api.utils.nplusone``). Should be the first middleware so the
+    wall time covers the whole stack.
+
+    Works in sync and async mode, so under ASGI the async catalog views run
+    without the handler adapting the chain to a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not instrumentation._get_setting('ENABLED'):
+            return self.get_response(request)
+
+        with self._measure() as (request_metrics, detector):
+            response = self.get_response(request)
+        self._report(request, response, request_metrics, detector)
+        return response
+
+    async def __acall__(self, request):
+        if not instrumentation._get_setting('ENABLED'):
+            return await self.get_response(request)
+
+        with self._measure() as (request_metrics, detector):
+            response = await self.get_response(request)
+        self._report(request, response, request_metrics, detector)
+        return response
+
+    @contextmanager
+    def _measure(self):
+        detecting = nplusone._get_setting('ENABLED')
+        with instrumentation.collect() as request_metrics, \
+                (nplusone.detect() if detecting else nullcontext()) as detector:
+            yield request_metrics, detector
+
+    def _report(self, request, response, request_metrics, detector):
+        metrics.observe_request(request, response, request_metrics)
+        instrumentation.finish(request, response, request_metrics)
+        if detector is not None:
+            nplusone.report(request, response, detector)
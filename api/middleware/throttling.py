@@ -0,0 +1,40 @@
+"""
+Middleware that releases concurrency slots taken by throttles.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from ..utils.throttling import release_all
+
+
+class ConcurrencyReleaseMiddleware:
+    """
+    Give back the slots taken by ``ConcurrentRequestThrottle``.
+
+    Runs in a ``finally`` so slots are released even when the view raises.
+    Streaming responses release their slot once the view returns, before
+    the body has been sent. Works in sync and async mode; in async mode the
+    cache calls run in a thread, and only when the request took a slot.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        try:
+            return self.get_response(request)
+        finally:
+            release_all(request)
+
+    async def __acall__(self, request):
+        try:
+            return await self.get_response(request)
+        finally:
+            if request.__dict__.get('_throttle_releases'):
+                await sync_to_async(release_all)(request)
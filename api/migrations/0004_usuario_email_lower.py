@@ -0,0 +1,48 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:45
+
+import logging
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+logger = logging.getLogger(__name__)
+
+
+def lowercase_emails(apps, schema_editor):
+    """
+    Store every email lowercased, skipping addresses that would collide.
+
+    Skipped rows keep their email; ``UsuarioManager.get_by_natural_key``
+    still finds them through a case-insensitive lookup.
+    """
+    Usuario = apps.get_model('api', 'Usuario')
+    db_alias = schema_editor.connection.alias
+
+    pendientes = (
+        Usuario.objects.using(db_alias)
+        .exclude(email=Lower('email'))
+        .values_list('id', 'email')
+    )
+    for user_id, email in pendientes.iterator():
+        normalized = email.strip().lower()
+        if Usuario.objects.using(db_alias).filter(email=normalized).exists():
+            logger.warning("Email %r no se normalizó: ya existe %r", email, normalized)
+            continue
+        Usuario.objects.using(db_alias).filter(id=user_id).update(email=normalized)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_make_codigo_blank'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(django.db.models.functions.text.Upper('email'), name='usuario_email_upper_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:53
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_usuario_email_lower'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Campana',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='fecha de creación')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='fecha de actualización')),
+                ('is_active', models.BooleanField(default=True, verbose_name='activo')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('nombre', models.CharField(max_length=200, verbose_name='nombre')),
+                ('segmento', models.CharField(choices=[('clientes', 'Todos los clientes'), ('compradores_categoria', 'Compradores de una categoría')], default='clientes', max_length=30, verbose_name='segmento')),
+                ('asunto', models.CharField(max_length=200, verbose_name='asunto')),
+                ('mensaje', models.TextField(verbose_name='mensaje')),
+                ('plantilla', models.CharField(default='campana', max_length=100, verbose_name='plantilla')),
+                ('estado', models.CharField(choices=[('borrador', 'Borrador'), ('en_curso', 'En curso'), ('pausada', 'Pausada'), ('completada', 'Completada'), ('cancelada', 'Cancelada')], default='borrador', max_length=20, verbose_name='estado')),
+                ('cursor', models.UUIDField(blank=True, editable=False, null=True, verbose_name='último destinatario encolado')),
+                ('encolados', models.PositiveIntegerField(default=0, editable=False, verbose_name='encolados')),
+                ('enviados', models.PositiveIntegerField(default=0, editable=False, verbose_name='enviados')),
+                ('fallidos', models.PositiveIntegerField(default=0, editable=False, verbose_name='fallidos')),
+                ('fecha_inicio', models.DateTimeField(blank=True, editable=False, null=True, verbose_name='fecha de inicio')),
+                ('fecha_fin', models.DateTimeField(blank=True, editable=False, null=True, verbose_name='fecha de finalización')),
+            ],
+            options={
+                'verbose_name': 'campaña',
+                'verbose_name_plural': 'campañas',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['tipo_usuario', 'id'], name='usuario_tipo_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='campana',
+            name='categoria',
+            field=models.ForeignKey(blank=True, help_text='Solo para el segmento "Compradores de una categoría".', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='campanas', to='api.categoriapaquete', verbose_name='categoría'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_campana'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campana',
+            name='run_token',
+            field=models.UUIDField(blank=True, editable=False, null=True, verbose_name='ejecución actual'),
+        ),
+        migrations.AddConstraint(
+            model_name='campana',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('segmento', 'compradores_categoria'), _negated=True), ('categoria__isnull', False), _connector='OR'), name='campana_categoria_requerida', violation_error_message='El segmento "Compradores de una categoría" requiere una categoría.'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_campana_run_token'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='categoriapaquete',
+            index=models.Index(fields=['updated_at'], name='categoria_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paquete',
+            index=models.Index(fields=['updated_at'], name='paquete_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['updated_at'], name='venta_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ventadetalle',
+            index=models.Index(fields=['updated_at'], name='ventadetalle_updated_at_idx'),
+        ),
+    ]
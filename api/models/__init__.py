@@ -6,6 +6,7 @@ from .usuario import Usuario, UsuarioManager
 from .paquete import CategoriaPaquete, Paquete
 from .carrito import Carrito, CarritoItem
 from .venta import Venta, VentaDetalle
+from .campana import Campana
 
 # This makes the models available at the package level
 __all__ = [
@@ -14,4 +15,5 @@ __all__ = [
     'CategoriaPaquete', 'Paquete',
     'Carrito', 'CarritoItem',
     'Venta', 'VentaDetalle',
+    'Campana',
 ]
\ No newline at end of file
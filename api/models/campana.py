@@ -0,0 +1,149 @@
+"""
+Email campaign models.
+"""
+import uuid
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import Exists, F, OuterRef, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from .base import BaseModel
+from .usuario import Usuario
+from .paquete import CategoriaPaquete
+
+class Campana(BaseModel):
+    """
+    Bulk email sent to a segment of users.
+
+    Progress is kept as a keyset cursor (the last ``Usuario.id`` queued) plus
+    counters, so a campaign of any size can be paused and resumed without
+    storing one row per recipient.
+
+    Every start or resume draws a new ``run_token``. Only the
+    ``run_campaign`` task carrying the current token may advance the
+    cursor, so a stale or duplicated run stops instead of queueing the same
+    recipients twice.
+    """
+    SEGMENTO_CHOICES = [
+        ('clientes', 'Todos los clientes'),
+        ('compradores_categoria', 'Compradores de una categoría'),
+    ]
+
+    ESTADO_CHOICES = [
+        ('borrador', 'Borrador'),
+        ('en_curso', 'En curso'),
+        ('pausada', 'Pausada'),
+        ('completada', 'Completada'),
+        ('cancelada', 'Cancelada'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    nombre = models.CharField(_('nombre'), max_length=200)
+    segmento = models.CharField(_('segmento'), max_length=30, choices=SEGMENTO_CHOICES, default='clientes')
+    categoria = models.ForeignKey(
+        CategoriaPaquete,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='campanas',
+        verbose_name=_('categoría'),
+        help_text=_('Solo para el segmento "Compradores de una categoría".')
+    )
+    asunto = models.CharField(_('asunto'), max_length=200)
+    mensaje = models.TextField(_('mensaje'))
+    plantilla = models.CharField(_('plantilla'), max_length=100, default='campana')
+    estado = models.CharField(_('estado'), max_length=20, choices=ESTADO_CHOICES, default='borrador')
+
+    # Delivery progress
+    cursor = models.UUIDField(_('último destinatario encolado'), null=True, blank=True, editable=False)
+    encolados = models.PositiveIntegerField(_('encolados'), default=0, editable=False)
+    enviados = models.PositiveIntegerField(_('enviados'), default=0, editable=False)
+    fallidos = models.PositiveIntegerField(_('fallidos'), default=0, editable=False)
+    fecha_inicio = models.DateTimeField(_('fecha de inicio'), null=True, blank=True, editable=False)
+    fecha_fin = models.DateTimeField(_('fecha de finalización'), null=True, blank=True, editable=False)
+    run_token = models.UUIDField(_('ejecución actual'), null=True, blank=True, editable=False)
+
+    class Meta:
+        verbose_name = _('campaña')
+        verbose_name_plural = _('campañas')
+        ordering = ['-created_at']
+        constraints = [
+            models.CheckConstraint(
+                condition=~Q(segmento='compradores_categoria') | Q(categoria__isnull=False),
+                name='campana_categoria_requerida',
+                violation_error_message=_('El segmento "Compradores de una categoría" requiere una categoría.'),
+            ),
+        ]
+
+    def __str__(self):
+        return self.nombre
+
+    def clean(self):
+        super().clean()
+        if self.segmento == 'compradores_categoria' and self.categoria_id is None:
+            raise ValidationError({
+                'categoria': _('El segmento "Compradores de una categoría" requiere una categoría.'),
+            })
+
+    def destinatarios(self):
+        """
+        Return the campaign's pending recipients in ``id`` order.
+
+        Recipients already queued (``id`` up to ``cursor``) are excluded, so
+        the query resumes where the last run stopped.
+        """
+        usuarios = Usuario.objects.filter(is_active=True)
+
+        if self.segmento == 'clientes':
+            usuarios = usuarios.filter(tipo_usuario='cliente')
+        elif self.segmento == 'compradores_categoria':
+            from .venta import VentaDetalle
+            usuarios = usuarios.filter(Exists(
+                VentaDetalle.objects.filter(
+                    venta__usuario=OuterRef('pk'),
+                    paquete__categoria_id=self.categoria_id,
+                )
+            ))
+
+        if self.cursor is not None:
+            usuarios = usuarios.filter(id__gt=self.cursor)
+        return usuarios.order_by('id')
+
+    def iniciar(self):
+        """Start (or restart from the cursor) the delivery in the background."""
+        from ..tasks import run_campaign
+
+        # Conditional update: of two concurrent starts only one matches.
+        run_token = uuid.uuid4()
+        now = timezone.now()
+        iniciada = Campana.objects.filter(pk=self.pk, estado__in=['borrador', 'pausada']).update(
+            estado='en_curso', run_token=run_token,
+            fecha_inicio=Coalesce('fecha_inicio', Value(now)), updated_at=now,
+        ) == 1
+        if not iniciada:
+            return False
+
+        self.refresh_from_db(fields=['estado', 'run_token', 'fecha_inicio', 'updated_at'])
+        run_campaign.delay(str(self.id), str(run_token))
+        return True
+
+    def pausar(self):
+        """Stop queueing new batches; batches already queued are still sent."""
+        return Campana.objects.filter(pk=self.pk, estado='en_curso').update(
+            estado='pausada', updated_at=timezone.now()
+        ) == 1
+
+    def cancelar(self):
+        """Stop the campaign for good."""
+        return Campana.objects.filter(pk=self.pk, estado__in=['borrador', 'en_curso', 'pausada']).update(
+            estado='cancelada', updated_at=timezone.now()
+        ) == 1
+
+    @classmethod
+    def registrar_envio(cls, campana_id, enviados=0, fallidos=0):
+        """Add delivery results from a batch atomically."""
+        cls.objects.filter(pk=campana_id).update(
+            enviados=F('enviados') + enviados,
+            fallidos=F('fallidos') + fallidos,
+        )
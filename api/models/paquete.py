@@ -3,9 +3,13 @@ Package related models.
 """
 import uuid
 from django.db import models
+from django.db.models import Count, Q
 from django.utils.translation import gettext_lazy as _
 from .base import BaseModel
 
+# Sale states that take a place from the package quota.
+ESTADOS_OCUPAN_CUPO = ['confirmada', 'en_proceso']
+
 class CategoriaPaquete(BaseModel):
     """Package category model."""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -17,10 +21,26 @@ class CategoriaPaquete(BaseModel):
         verbose_name = _('categoría de paquete')
         verbose_name_plural = _('categorías de paquetes')
         ordering = ['nombre']
+        indexes = [
+            # Incremental refresh of the analytics snapshot.
+            models.Index(fields=['updated_at'], name='categoria_updated_at_idx'),
+        ]
     
     def __str__(self):
         return self.nombre
 
+class PaqueteQuerySet(models.QuerySet):
+    """QuerySet with helpers for package listings."""
+    
+    def with_disponibilidad(self):
+        """Annotate the sold count so availability needs no extra query per row."""
+        return self.annotate(
+            vendidos_count=Count(
+                'venta_detalles',
+                filter=Q(venta_detalles__venta__estado__in=ESTADOS_OCUPAN_CUPO)
+            )
+        )
+
 class Paquete(BaseModel):
     """Tour package model."""
     DIFICULTAD_CHOICES = [
@@ -60,10 +80,15 @@ class Paquete(BaseModel):
     no_incluye = models.TextField(_('qué no incluye'), blank=True, null=True)
     requisitos = models.TextField(_('requisitos'), blank=True, null=True)
     
+    objects = PaqueteQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _('paquete')
         verbose_name_plural = _('paquetes')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at'], name='paquete_updated_at_idx'),
+        ]
     
     def __str__(self):
         return self.nombre
@@ -71,11 +96,14 @@ class Paquete(BaseModel):
     @property
     def disponibilidad(self):
         """Calculate package availability."""
-        from .venta import VentaDetalle
-        vendido = VentaDetalle.objects.filter(
-            paquete=self,
-            venta__estado__in=['confirmada', 'en_proceso']
-        ).count()
+        # Use the annotation from with_disponibilidad() when available
+        vendido = getattr(self, 'vendidos_count', None)
+        if vendido is None:
+            from .venta import VentaDetalle
+            vendido = VentaDetalle.objects.filter(
+                paquete=self,
+                venta__estado__in=ESTADOS_OCUPAN_CUPO
+            ).count()
         return max(0, self.cupo_maximo - vendido)
     
     @property
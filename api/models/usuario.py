@@ -3,12 +3,38 @@ User model and related models.
 """
 import uuid
 from django.db import models
+from django.db.models.functions import Upper
+from django.contrib.auth.hashers import make_password, verify_password
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils.translation import gettext_lazy as _
+from ..utils import hashing_pool
 from .base import BaseModel
 
 class UsuarioManager(BaseUserManager):
     """Custom user model manager where email is the unique identifier."""
+    @classmethod
+    def normalize_email(cls, email):
+        """
+        Lowercase the whole address.
+        
+        Emails are stored lowercased so login and lookups can use the plain
+        unique index with an exact match instead of a case-insensitive scan.
+        """
+        return (email or '').strip().lower()
+    
+    def get_by_natural_key(self, username):
+        """
+        Resolve a login email through the exact-match unique index.
+        
+        Falls back to a case-insensitive match for rows stored before
+        emails were normalized (see migration 0004), which is served by
+        ``usuario_email_upper_idx``.
+        """
+        try:
+            return self.get(**{self.model.USERNAME_FIELD: self.normalize_email(username)})
+        except self.model.DoesNotExist:
+            return self.get(**{f'{self.model.USERNAME_FIELD}__iexact': (username or '').strip()})
+    
     def create_user(self, email, password=None, **extra_fields):
         """Create and save a user with the given email and password."""
         if not email:
@@ -66,10 +92,63 @@ class Usuario(AbstractBaseUser, PermissionsMixin, BaseModel):
         verbose_name = _('usuario')
         verbose_name_plural = _('usuarios')
         ordering = ['-created_at']
+        indexes = [
+            # Serves legacy ``email__iexact`` lookups, which compile to
+            # UPPER(email) = UPPER(%s) on PostgreSQL.
+            models.Index(Upper('email'), name='usuario_email_upper_idx'),
+            # Keyset pagination of campaign segments (see Campana.destinatarios)
+            models.Index(fields=['tipo_usuario', 'id'], name='usuario_tipo_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_full_name()} <{self.email}>"
     
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'email' in update_fields:
+            normalized = UsuarioManager.normalize_email(self.email)
+            if normalized != self.email and not self._keeps_legacy_email(normalized):
+                self.email = normalized
+        super().save(*args, **kwargs)
+    
+    def _keeps_legacy_email(self, normalized):
+        """
+        Whether an unchanged mixed-case email must keep its case.
+        
+        Migration 0004 skipped the addresses whose lowercase form belonged
+        to another account; lowercasing one on save would break the unique
+        index. New accounts and changed addresses are always normalized.
+        """
+        if self._state.adding:
+            return False
+        manager = type(self)._default_manager
+        return (
+            manager.filter(pk=self.pk, email=self.email).exists()
+            and manager.filter(email=normalized).exclude(pk=self.pk).exists()
+        )
+    
+    def set_password(self, raw_password):
+        """Hash the password on the bounded hashing pool."""
+        if raw_password is None:
+            super().set_password(raw_password)
+            return
+        self.password = hashing_pool.run(make_password, raw_password)
+        self._password = raw_password
+    
+    def check_password(self, raw_password):
+        """
+        Verify the password on the bounded hashing pool.
+        
+        Like Django's implementation, upgrades the stored hash when the
+        hasher settings have changed.
+        """
+        is_correct, must_update = hashing_pool.run(verify_password, raw_password, self.password)
+        if is_correct and must_update:
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+        return is_correct
+    
     def get_full_name(self):
         """Return the full name of the user."""
         return f"{self.nombre} {self.apellido}"
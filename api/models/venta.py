@@ -60,6 +60,10 @@ class Venta(BaseModel):
         verbose_name = _('venta')
         verbose_name_plural = _('ventas')
         ordering = ['-fecha_venta']
+        indexes = [
+            # Incremental refresh of the analytics snapshot.
+            models.Index(fields=['updated_at'], name='venta_updated_at_idx'),
+        ]
     
     def __str__(self):
         return f"Venta {self.codigo} - {self.usuario.get_full_name()}"
@@ -130,6 +134,9 @@ class VentaDetalle(BaseModel):
         verbose_name = _('detalle de venta')
         verbose_name_plural = _('detalles de venta')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at'], name='ventadetalle_updated_at_idx'),
+        ]
     
     def __str__(self):
         return f"{self.cantidad}x {self.paquete.nombre}"
@@ -2,10 +2,15 @@
 Serializers for the user API views.
 """
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth import get_user_model, authenticate
 from django.utils.translation import gettext_lazy as _
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from ..authentication import UserClaimsRefreshToken, set_user_claims
 from ..models import Usuario
+from ..utils import token_revocation, user_cache
 
 class UsuarioSerializer(serializers.ModelSerializer):
     """Serializer for the user object."""
@@ -37,6 +42,16 @@ class UsuarioSerializer(serializers.ModelSerializer):
             'email': {'required': True}
         }
 
+    def validate_email(self, value):
+        """Normalize the email and reject case-only duplicates."""
+        email = Usuario.objects.normalize_email(value)
+        duplicates = Usuario.objects.filter(email=email)
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError('Ya existe un usuario con este correo electrónico.')
+        return email
+
     def validate(self, attrs):
         if attrs['password'] != attrs.pop('password2'):
             raise serializers.ValidationError({"password": "Las contraseñas no coinciden."})
@@ -97,6 +112,7 @@ class AuthTokenSerializer(serializers.Serializer):
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """Custom token serializer to include user data in the response."""
+    token_class = UserClaimsRefreshToken
     username = serializers.CharField(required=False, write_only=True)
     
     def __init__(self, *args, **kwargs):
@@ -129,6 +145,52 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         
         return data
 
+class UserClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh serializer that re-reads the user claims on every refresh.
+    
+    This bounds how stale the claims used by ``ClaimsUser`` can be to the
+    access token lifetime instead of the refresh token lifetime.
+    """
+    token_class = UserClaimsRefreshToken
+    
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if token_revocation.is_token_revoked(refresh):
+            raise InvalidToken('Token has been revoked')
+        
+        user_id = refresh.payload.get(jwt_settings.USER_ID_CLAIM)
+        try:
+            user = user_cache.get_user(user_id, lookup_field=jwt_settings.USER_ID_FIELD)
+        except Usuario.DoesNotExist:
+            user = None
+        
+        if user is None or not jwt_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(
+                self.error_messages['no_active_account'],
+                'no_active_account',
+            )
+        
+        set_user_claims(refresh, user)
+        data = {'access': str(refresh.access_token)}
+        
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            # The rotated-out refresh token must not be usable again.
+            token_revocation.revoke(refresh)
+            
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            try:
+                refresh.outstand()
+            except AttributeError:
+                # The blacklist app is not installed
+                pass
+            
+            data['refresh'] = str(refresh)
+        
+        return data
+
 class UsuarioProfileSerializer(serializers.ModelSerializer):
     """Serializer for the user profile."""
     class Meta:
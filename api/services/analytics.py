@@ -0,0 +1,399 @@
+"""
+In-memory columnar snapshot of sale lines for interactive reporting.
+
+Each ``VentaDetalle`` becomes one row whose categorical attributes (category,
+difficulty, payment method, state) are dictionary-encoded into small integer
+arrays. Filters and group-bys then run as vectorized NumPy operations instead
+of ad-hoc ORM aggregates.
+
+The snapshot is refreshed incrementally: only rows whose line, sale, package
+or category changed since the last watermark are read again, and the rows they
+replace are masked out. Each of the four tables is filtered on its own
+indexed ``updated_at`` in a separate branch of a ``UNION``, rather than one
+``OR`` across the joins that no index can serve. A full rebuild happens when
+too many rows are masked or when ``ANALYTICS_FULL_REBUILD_SECONDS`` have
+elapsed, which also picks up hard-deleted rows.
+
+Only the first build runs in the request that needs it. Later refreshes
+start in a background thread, and requests keep reading the current columns
+meanwhile, so none of them waits for the refresh query or its lock.
+"""
+import logging
+import threading
+import time as time_module
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from ..models import Paquete, Venta, VentaDetalle
+
+logger = logging.getLogger('api.analytics')
+
+DIMENSIONES = ('categoria', 'dificultad', 'metodo_pago', 'estado', 'mes')
+MEDIDAS = ('importe', 'cantidad', 'lineas')
+
+SIN_CATEGORIA = 'Sin categoría'
+
+# Rows read again on every refresh to cover transactions that committed
+# with an ``updated_at`` older than the previous watermark.
+WATERMARK_OVERLAP = timedelta(seconds=5)
+
+# Fraction of masked rows that triggers a compaction.
+MAX_DEAD_RATIO = 0.25
+
+_LOOKUPS = (
+    'id', 'cantidad', 'precio_unitario',
+    'paquete__categoria__nombre', 'paquete__dificultad',
+    'venta__metodo_pago', 'venta__estado', 'venta__fecha_venta',
+)
+
+
+class _Dictionary:
+    """Append-only mapping between category labels and integer codes."""
+
+    def __init__(self, labels=()):
+        self.labels = []
+        self.codes = {}
+        for label in labels:
+            self.encode(label)
+
+    def encode(self, label):
+        code = self.codes.get(label)
+        if code is None:
+            code = len(self.labels)
+            self.codes[label] = code
+            self.labels.append(label)
+        return code
+
+    def copy(self):
+        copia = _Dictionary()
+        copia.labels = list(self.labels)
+        copia.codes = dict(self.codes)
+        return copia
+
+
+class _Columns:
+    """Immutable set of column arrays shared by concurrent readers."""
+
+    def __init__(self, arrays, ids, dictionaries):
+        self.arrays = arrays
+        self.ids = ids
+        self.dictionaries = dictionaries
+
+    @property
+    def size(self):
+        return len(self.arrays['valido'])
+
+
+def _empty_arrays():
+    return {
+        'categoria': np.empty(0, dtype=np.int32),
+        'dificultad': np.empty(0, dtype=np.int32),
+        'metodo_pago': np.empty(0, dtype=np.int32),
+        'estado': np.empty(0, dtype=np.int32),
+        'mes': np.empty(0, dtype=np.int32),
+        'cantidad': np.empty(0, dtype=np.int64),
+        'importe': np.empty(0, dtype=np.float64),
+        'valido': np.empty(0, dtype=bool),
+    }
+
+
+def _new_dictionaries():
+    return {
+        'categoria': _Dictionary(),
+        'dificultad': _Dictionary(codigo for codigo, _ in Paquete.DIFICULTAD_CHOICES),
+        'metodo_pago': _Dictionary(codigo for codigo, _ in Venta.METODO_PAGO_CHOICES),
+        'estado': _Dictionary(codigo for codigo, _ in Venta.ESTADO_CHOICES),
+    }
+
+
+def _mes_label(mes):
+    return f"{mes // 100:04d}-{mes % 100:02d}"
+
+
+def parse_mes(valor):
+    """
+    Parse a ``YYYY-MM`` string into the integer month key used by the snapshot.
+
+    Raises:
+        ValueError: If the value is not a valid month
+    """
+    try:
+        anio, mes = (int(parte) for parte in valor.split('-'))
+    except (AttributeError, ValueError):
+        raise ValueError(f"Mes inválido: {valor}. Use el formato YYYY-MM.")
+    if not 1 <= mes <= 12:
+        raise ValueError(f"Mes inválido: {valor}. Use el formato YYYY-MM.")
+    return anio * 100 + mes
+
+
+class VentasSnapshot:
+    """
+    Columnar snapshot of ``VentaDetalle`` joined with ``Paquete`` and ``Venta``.
+
+    Use :func:`get_snapshot` to obtain the process-wide instance.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._columns = _Columns(_empty_arrays(), {}, _new_dictionaries())
+        self._watermark = None
+        self._last_refresh = 0.0
+        self._last_full_rebuild = 0.0
+        self._refreshing = False
+        self._refreshing_lock = threading.Lock()
+
+    @property
+    def watermark(self):
+        return self._watermark
+
+    def _read_rows(self, since=None):
+        queryset = VentaDetalle.objects.order_by().values_list(*_LOOKUPS)
+        if since is not None:
+            # UNION also drops a line found through more than one table.
+            queryset = queryset.filter(updated_at__gt=since).union(
+                queryset.filter(venta__updated_at__gt=since),
+                queryset.filter(paquete__updated_at__gt=since),
+                queryset.filter(paquete__categoria__updated_at__gt=since),
+            )
+        return queryset.iterator(chunk_size=5000)
+
+    def _encode(self, rows, dictionaries):
+        """Encode database rows into column lists and their detail ids."""
+        ids = []
+        data = {nombre: [] for nombre in _empty_arrays() if nombre != 'valido'}
+        tz = timezone.get_current_timezone()
+
+        for (detalle_id, cantidad, precio, categoria,
+             dificultad, metodo_pago, estado, fecha_venta) in rows:
+            ids.append(detalle_id)
+            data['categoria'].append(dictionaries['categoria'].encode(categoria or SIN_CATEGORIA))
+            data['dificultad'].append(dictionaries['dificultad'].encode(dificultad))
+            data['metodo_pago'].append(dictionaries['metodo_pago'].encode(metodo_pago))
+            data['estado'].append(dictionaries['estado'].encode(estado))
+            fecha_local = timezone.localtime(fecha_venta, tz) if timezone.is_aware(fecha_venta) else fecha_venta
+            data['mes'].append(fecha_local.year * 100 + fecha_local.month)
+            data['cantidad'].append(cantidad)
+            data['importe'].append(float(precio) * cantidad)
+
+        arrays = {
+            nombre: np.asarray(valores, dtype=_empty_arrays()[nombre].dtype)
+            for nombre, valores in data.items()
+        }
+        arrays['valido'] = np.ones(len(ids), dtype=bool)
+        return ids, arrays
+
+    def rebuild(self):
+        """Rebuild the whole snapshot from the database."""
+        with self._lock:
+            self._rebuild_locked()
+
+    def _rebuild_locked(self):
+        started = timezone.now()
+        dictionaries = _new_dictionaries()
+        ids, arrays = self._encode(self._read_rows(), dictionaries)
+        self._columns = _Columns(arrays, {detalle_id: i for i, detalle_id in enumerate(ids)}, dictionaries)
+        self._watermark = started - WATERMARK_OVERLAP
+        self._last_full_rebuild = self._last_refresh = time_module.monotonic()
+
+    def refresh(self):
+        """
+        Apply the rows changed since the last watermark.
+
+        Returns:
+            int: Number of rows read from the database
+        """
+        with self._lock:
+            full_interval = getattr(settings, 'ANALYTICS_FULL_REBUILD_SECONDS', 60 * 60)
+            if self._watermark is None or time_module.monotonic() - self._last_full_rebuild > full_interval:
+                self._rebuild_locked()
+                return self._columns.size
+
+            started = timezone.now()
+            current = self._columns
+            dictionaries = {nombre: d.copy() for nombre, d in current.dictionaries.items()}
+            nuevos_ids, nuevos = self._encode(self._read_rows(self._watermark), dictionaries)
+
+            if nuevos_ids:
+                valido = current.arrays['valido'].copy()
+                reemplazados = [current.ids[i] for i in nuevos_ids if i in current.ids]
+                valido[reemplazados] = False
+
+                arrays = {
+                    nombre: np.concatenate([current.arrays[nombre], nuevos[nombre]])
+                    for nombre in current.arrays if nombre != 'valido'
+                }
+                arrays['valido'] = np.concatenate([valido, nuevos['valido']])
+
+                ids = dict(current.ids)
+                for offset, detalle_id in enumerate(nuevos_ids):
+                    ids[detalle_id] = current.size + offset
+
+                self._columns = _Columns(arrays, ids, dictionaries)
+
+                muertos = self._columns.size - int(arrays['valido'].sum())
+                if muertos > MAX_DEAD_RATIO * max(self._columns.size, 1):
+                    self._compact_locked()
+
+            self._watermark = started - WATERMARK_OVERLAP
+            self._last_refresh = time_module.monotonic()
+            return len(nuevos_ids)
+
+    def _compact_locked(self):
+        current = self._columns
+        keep = current.arrays['valido']
+        posiciones = np.cumsum(keep) - 1
+        arrays = {nombre: valores[keep] for nombre, valores in current.arrays.items()}
+        ids = {detalle_id: int(posiciones[i]) for detalle_id, i in current.ids.items() if keep[i]}
+        self._columns = _Columns(arrays, ids, current.dictionaries)
+
+    def refresh_if_stale(self):
+        """
+        Refresh the snapshot if it is older than ``ANALYTICS_REFRESH_SECONDS``.
+
+        The first build runs in the caller; later refreshes run in the
+        background (see :meth:`refresh_in_background`).
+        """
+        max_age = getattr(settings, 'ANALYTICS_REFRESH_SECONDS', 30)
+        if self._watermark is None:
+            self.refresh()
+        elif time_module.monotonic() - self._last_refresh > max_age:
+            self.refresh_in_background()
+
+    def refresh_in_background(self):
+        """
+        Start a refresh in a daemon thread unless one is already running.
+
+        Returns:
+            bool: Whether a refresh was started
+        """
+        # Not self._lock: that is held for the whole refresh.
+        with self._refreshing_lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, name='analytics-refresh', daemon=True).start()
+        return True
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception('Analytics snapshot refresh failed')
+        finally:
+            self._refreshing = False
+            # This thread's own connections; it will not serve requests.
+            connections.close_all()
+
+    def _mask(self, columns, filtros):
+        arrays = columns.arrays
+        mask = arrays['valido'].copy()
+
+        for nombre in ('categoria', 'dificultad', 'metodo_pago', 'estado'):
+            valores = filtros.get(nombre)
+            if valores:
+                codigos = [columns.dictionaries[nombre].codes[v]
+                           for v in valores if v in columns.dictionaries[nombre].codes]
+                mask &= np.isin(arrays[nombre], np.asarray(codigos, dtype=np.int32))
+
+        if filtros.get('desde'):
+            mask &= arrays['mes'] >= filtros['desde']
+        if filtros.get('hasta'):
+            mask &= arrays['mes'] <= filtros['hasta']
+
+        return mask
+
+    def _group(self, columns, dimension, mask):
+        """Return (codes, labels) for a dimension restricted to ``mask``."""
+        valores = columns.arrays[dimension][mask]
+        if dimension == 'mes':
+            meses, codigos = np.unique(valores, return_inverse=True)
+            return codigos, [_mes_label(int(m)) for m in meses]
+        return valores, list(columns.dictionaries[dimension].labels)
+
+    def pivot(self, filas, columnas=None, medida='importe', filtros=None):
+        """
+        Aggregate a measure grouped by one or two dimensions.
+
+        Args:
+            filas (str): Dimension used for the rows
+            columnas (str, optional): Dimension used for the columns
+            medida (str): One of ``MEDIDAS``
+            filtros (dict, optional): Allowed values per dimension plus
+                ``desde``/``hasta`` month keys (see :func:`parse_mes`)
+
+        Returns:
+            dict: Row and column labels, the value matrix and totals
+        """
+        if filas not in DIMENSIONES or (columnas is not None and columnas not in DIMENSIONES):
+            raise ValueError(f"Dimensión inválida. Opciones: {', '.join(DIMENSIONES)}.")
+        if medida not in MEDIDAS:
+            raise ValueError(f"Medida inválida. Opciones: {', '.join(MEDIDAS)}.")
+
+        columns = self._columns
+        mask = self._mask(columns, filtros or {})
+
+        if medida == 'lineas':
+            pesos = None
+        else:
+            pesos = columns.arrays[medida][mask].astype(np.float64)
+
+        codigos_filas, etiquetas_filas = self._group(columns, filas, mask)
+        if columnas:
+            codigos_columnas, etiquetas_columnas = self._group(columns, columnas, mask)
+        else:
+            codigos_columnas, etiquetas_columnas = np.zeros(len(codigos_filas), dtype=np.int64), ['total']
+
+        n_filas, n_columnas = len(etiquetas_filas), len(etiquetas_columnas)
+        claves = codigos_filas.astype(np.int64) * n_columnas + codigos_columnas
+        matriz = np.bincount(claves, weights=pesos, minlength=n_filas * n_columnas)
+        matriz = matriz.reshape(n_filas, n_columnas)
+
+        # Drop labels without any matching row.
+        presentes_filas = np.bincount(codigos_filas, minlength=n_filas) > 0
+        presentes_columnas = np.bincount(codigos_columnas, minlength=n_columnas) > 0
+        matriz = matriz[presentes_filas][:, presentes_columnas]
+
+        if medida != 'importe':
+            matriz = matriz.astype(np.int64)
+        else:
+            matriz = np.round(matriz, 2)
+
+        return {
+            'filas': [e for e, p in zip(etiquetas_filas, presentes_filas) if p],
+            'columnas': [e for e, p in zip(etiquetas_columnas, presentes_columnas) if p],
+            'medida': medida,
+            'valores': matriz.tolist(),
+            'total_filas': matriz.sum(axis=1).tolist(),
+            'total_columnas': matriz.sum(axis=0).tolist(),
+            'total': matriz.sum().item(),
+            'lineas': int(mask.sum()),
+        }
+
+    def stats(self):
+        """Return size information about the snapshot."""
+        columns = self._columns
+        return {
+            'filas': columns.size,
+            'filas_validas': int(columns.arrays['valido'].sum()),
+            'bytes': int(sum(a.nbytes for a in columns.arrays.values())),
+            'watermark': self._watermark.isoformat() if self._watermark else None,
+        }
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    """Return the process-wide snapshot, refreshing it if stale."""
+    global _snapshot
+    if _snapshot is None:
+        with _snapshot_lock:
+            if _snapshot is None:
+                _snapshot = VentasSnapshot()
+    _snapshot.refresh_if_stale()
+    return _snapshot
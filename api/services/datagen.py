@@ -0,0 +1,452 @@
+"""
+Deterministic synthetic data for benchmarks and local performance work.
+
+``generate`` creates categories, packages, client users with their carts,
+cart items and sales with their lines. Every value comes from a
+``random.Random`` seeded with ``seed``, and primary keys are derived from
+the seed and the row number. Dates are offsets from ``fecha_base`` (today
+unless given), so the same arguments and base date always produce the
+same rows. Rows are written with ``bulk_create`` in batches of
+``batch_size``. ``bulk_create`` runs neither ``save()`` nor signals, so
+what they would fill in (the user's cart, the sale code) is set
+explicitly.
+
+Sales are spread over the ``dias_ventas`` days before ``fecha_base``, and
+each trip is 15 to 180 days after its sale (cart trips after the base
+date). ``fecha_venta``, ``created_at`` and ``updated_at`` are filled in by
+``auto_now_add``/``auto_now`` on insert, so each batch of sales is
+rewritten with ``bulk_update`` right after its ``bulk_create``.
+
+Demand is skewed like real traffic: a ``Skew.popular_fraction`` of the
+packages receives ``Skew.popular_share`` of the sale lines and cart items,
+and a ``Skew.heavy_fraction`` of the users places ``Skew.heavy_share`` of
+the sales. A share of 0 gives uniform choices.
+
+Every user logs in with ``PASSWORD``. Hashing it is deliberately slow
+(PBKDF2), so ``hashes`` distinct salted hashes are computed on a process
+pool of ``workers`` and handed out round-robin; ``hashes=0`` gives every
+user its own hash, which at production hasher settings takes about half a
+CPU-second per user.
+
+Generated users have emails under ``EMAIL_DOMAIN`` and generated package
+names end with ``[gen-<n>]``. ``exists`` and ``purge`` find them that way.
+"""
+import hashlib
+import multiprocessing
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections, transaction
+from django.utils import timezone
+
+from ..models import (
+    Carrito, CarritoItem, CategoriaPaquete, Paquete, Usuario, Venta, VentaDetalle,
+)
+
+EMAIL_DOMAIN = 'datagen.local'
+PASSWORD = 'Datagen123!'
+PAQUETE_TAG = '[gen-'
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_HASHES = 256
+DEFAULT_DIAS_VENTAS = 365
+
+CATEGORIAS = [
+    ('Aventura', 'Experiencias de aventura'),
+    ('Playa', 'Vacaciones de playa'),
+    ('Cultura', 'Viajes culturales'),
+    ('Gastronomia', 'Rutas gastronómicas'),
+    ('Naturaleza', 'Escapadas a la naturaleza'),
+    ('City_tour', 'Tours de ciudad'),
+    ('Crucero', 'Cruceros y travesías'),
+    ('Nieve', 'Destinos de nieve'),
+    ('Safari', 'Safaris y fauna'),
+    ('Relax', 'Bienestar y relax'),
+]
+
+DESTINOS = [
+    ('Bariloche', 'Aventura en la Patagonia'),
+    ('Mendoza', 'Rutas del vino'),
+    ('Iguazú', 'Cataratas imponentes'),
+    ('Salta', 'Paisajes del norte'),
+    ('Buenos Aires', 'City tour capitalino'),
+    ('Ushuaia', 'Fin del mundo'),
+    ('El Calafate', 'Glaciares majestuosos'),
+    ('Córdoba', 'Sierras y tradición'),
+    ('Río de Janeiro', 'Playas y carnaval'),
+    ('Cartagena', 'Ciudad amurallada'),
+    ('Machu Picchu', 'Misterios incas'),
+    ('Cancún', 'Caribe mexicano'),
+    ('Nueva York', 'La Gran Manzana'),
+    ('París', 'Ciudad del amor'),
+    ('Roma', 'Historia eterna'),
+    ('Tokio', 'Tradición y tecnología'),
+    ('Madrid', 'Capital vibrante'),
+    ('Sídney', 'Iconos australianos'),
+]
+
+ESTILOS = ['Experience', 'Clásico', 'Premium', 'Express', 'Full', 'Escapada', 'Aventura', 'Familiar']
+
+NOMBRES = ['Ana', 'Juan', 'Lucía', 'Martín', 'Sofía', 'Diego', 'Valentina', 'Mateo', 'Camila', 'Tomás']
+APELLIDOS = ['García', 'Fernández', 'López', 'Martínez', 'Pérez', 'Gómez', 'Díaz', 'Romero', 'Sosa', 'Álvarez']
+
+# Sale states with their relative frequency.
+ESTADOS_VENTA = [
+    ('completada', 45),
+    ('confirmada', 30),
+    ('pendiente', 15),
+    ('cancelada', 7),
+    ('en_proceso', 3),
+]
+
+METODOS_PAGO = [choice for choice, _ in Venta.METODO_PAGO_CHOICES]
+
+
+def _uuid(seed, kind, n):
+    """Deterministic UUID of the ``n``-th row of ``kind`` for ``seed``."""
+    digest = hashlib.md5(f'{seed}:{kind}:{n}'.encode()).digest()
+    return uuid.UUID(bytes=digest, version=4)
+
+
+def _email(n):
+    return f'usuario{n:07d}@{EMAIL_DOMAIN}'
+
+
+def _salt(seed, n):
+    return hashlib.md5(f'{seed}:salt:{n}'.encode()).hexdigest()[:22]
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _hash_password(args):
+    seed, n = args
+    return make_password(PASSWORD, salt=_salt(seed, n))
+
+
+def _skewed(rng, total, fraction, share):
+    """
+    Index in ``range(total)`` where the first ``fraction`` of the range
+    receives ``share`` of the picks on top of its uniform part.
+    """
+    if share and rng.random() < share:
+        return rng.randrange(max(1, int(total * fraction)))
+    return rng.randrange(total)
+
+
+def _batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _fecha_viaje(rng, desde):
+    return desde + timedelta(days=rng.randint(15, 180))
+
+
+def exists():
+    """Return True if generated users or packages are already in the database."""
+    return (
+        Usuario.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').exists()
+        or Paquete.objects.filter(nombre__contains=PAQUETE_TAG).exists()
+    )
+
+
+def purge():
+    """
+    Delete every generated row, children first.
+
+    Returns:
+        dict: Deleted row counts per model
+    """
+    usuarios = Usuario.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}')
+    paquetes = Paquete.objects.filter(nombre__contains=PAQUETE_TAG)
+    deleted = {}
+    with transaction.atomic():
+        deleted['venta_detalles'] = VentaDetalle.objects.filter(venta__usuario__in=usuarios).delete()[0]
+        deleted['venta_detalles'] += VentaDetalle.objects.filter(paquete__in=paquetes).delete()[0]
+        deleted['ventas'] = Venta.objects.filter(usuario__in=usuarios).delete()[0]
+        deleted['carrito_items'] = CarritoItem.objects.filter(carrito__usuario__in=usuarios).delete()[0]
+        deleted['carrito_items'] += CarritoItem.objects.filter(paquete__in=paquetes).delete()[0]
+        deleted['carritos'] = Carrito.objects.filter(usuario__in=usuarios).delete()[0]
+        deleted['usuarios'] = usuarios.delete()[0]
+        deleted['paquetes'] = paquetes.delete()[0]
+    return deleted
+
+
+class Skew:
+    """
+    How concentrated demand is.
+
+    Args:
+        popular_fraction (float): Fraction of packages that are popular
+        popular_share (float): Extra share of sale lines and cart items
+            that goes to the popular packages
+        heavy_fraction (float): Fraction of users that are heavy buyers
+        heavy_share (float): Extra share of sales placed by heavy buyers
+    """
+
+    def __init__(self, popular_fraction=0.05, popular_share=0.5, heavy_fraction=0.05, heavy_share=0.4):
+        self.popular_fraction = popular_fraction
+        self.popular_share = popular_share
+        self.heavy_fraction = heavy_fraction
+        self.heavy_share = heavy_share
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class Generator:
+    """
+    Builds and inserts one synthetic dataset.
+
+    Args:
+        seed (int): Seed of every random choice and generated primary key
+        batch_size (int): Rows per ``bulk_create`` call
+        skew (Skew): Demand concentration; ``Skew()`` defaults if None
+        hashes (int): Distinct password hashes; 0 for one per user
+        workers (int): Processes hashing passwords
+        progress (callable): Called as ``progress(stage, done, total)``
+            after each batch
+        fecha_base (date): Date every generated date is derived from;
+            today if None
+        dias_ventas (int): Days before ``fecha_base`` that sales are
+            spread over
+    """
+
+    def __init__(self, seed=42, batch_size=DEFAULT_BATCH_SIZE, skew=None, hashes=DEFAULT_HASHES,
+                 workers=None, progress=None, fecha_base=None, dias_ventas=DEFAULT_DIAS_VENTAS):
+        self.seed = seed
+        self.fecha_base = fecha_base or date.today()
+        self.dias_ventas = dias_ventas
+        self.batch_size = batch_size
+        self.skew = skew or Skew()
+        self.hashes = hashes
+        self.workers = workers or multiprocessing.cpu_count()
+        self.progress = progress or (lambda stage, done, total: None)
+        self.rng = random.Random(seed)
+        self.precios = []
+
+    def _insert(self, stage, model, rows, total):
+        done = 0
+        for batch in _batches(rows, self.batch_size):
+            model.objects.bulk_create(batch)
+            done += len(batch)
+            self.progress(stage, done, total)
+        return done
+
+    def _paquete(self):
+        skew = self.skew
+        return _skewed(self.rng, len(self.precios), skew.popular_fraction, skew.popular_share)
+
+    def _password_hashes(self, usuarios, pool):
+        """Yield the password hash of each user in order."""
+        jobs = ((self.seed, n) for n in range(usuarios if self.hashes == 0 else min(self.hashes, usuarios)))
+        if pool is None:
+            hashes = map(_hash_password, jobs)
+        else:
+            hashes = pool.imap(_hash_password, jobs, chunksize=16)
+
+        if self.hashes == 0:
+            yield from hashes
+            return
+        hashes = list(hashes)
+        for n in range(usuarios):
+            yield hashes[n % len(hashes)]
+
+    def categorias(self):
+        """Create the default categories that are missing; return all of them."""
+        existentes = set(CategoriaPaquete.objects.values_list('nombre', flat=True))
+        CategoriaPaquete.objects.bulk_create([
+            CategoriaPaquete(nombre=nombre, descripcion=descripcion)
+            for nombre, descripcion in CATEGORIAS if nombre not in existentes
+        ])
+        return list(CategoriaPaquete.objects.filter(
+            nombre__in=[nombre for nombre, _ in CATEGORIAS]
+        ).order_by('nombre').values_list('id', flat=True))
+
+    def paquetes(self, total):
+        categorias = self.categorias()
+        rng = self.rng
+
+        def rows():
+            for n in range(total):
+                destino, descripcion = rng.choice(DESTINOS)
+                precio = rng.randint(500, 2500) * 100
+                self.precios.append(precio)
+                yield Paquete(
+                    id=_uuid(self.seed, 'paquete', n),
+                    nombre=f'{destino} {rng.choice(ESTILOS)} {PAQUETE_TAG}{n}]',
+                    descripcion=descripcion,
+                    precio=Decimal(precio),
+                    duracion_dias=rng.randint(3, 14),
+                    dificultad=rng.choice(('baja', 'media', 'media', 'alta')),
+                    categoria_id=rng.choice(categorias),
+                    destacado=rng.random() < 0.05,
+                    cupo_maximo=rng.randint(10, 40),
+                )
+
+        return self._insert('paquetes', Paquete, rows(), total)
+
+    def usuarios(self, total):
+        """Create client users, hashing their passwords on a process pool, with their carts."""
+        rng = self.rng
+        pool = None
+        if self.workers > 1:
+            # Forked workers must not share the parent's database connections.
+            connections.close_all()
+            pool = multiprocessing.Pool(self.workers, initializer=_init_worker)
+
+        try:
+            passwords = self._password_hashes(total, pool)
+
+            def rows():
+                for n, password in zip(range(total), passwords):
+                    yield Usuario(
+                        id=_uuid(self.seed, 'usuario', n),
+                        email=_email(n),
+                        password=password,
+                        nombre=rng.choice(NOMBRES),
+                        apellido=rng.choice(APELLIDOS),
+                        tipo_usuario='cliente',
+                    )
+
+            created = self._insert('usuarios', Usuario, rows(), total)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        self._insert('carritos', Carrito, (
+            Carrito(id=_uuid(self.seed, 'carrito', n), usuario_id=_uuid(self.seed, 'usuario', n))
+            for n in range(total)
+        ), total)
+        return created
+
+    def carrito_items(self, usuarios, fraccion):
+        """Put one to three items in the carts of ``fraccion`` of the users."""
+        rng = self.rng
+        total = int(usuarios * fraccion)
+
+        def rows():
+            for n in rng.sample(range(usuarios), total):
+                carrito_id = _uuid(self.seed, 'carrito', n)
+                # (carrito, paquete, fecha_viaje) is unique; skip repeated packages.
+                paquetes = {self._paquete() for _ in range(rng.randint(1, 3))}
+                for k, p in enumerate(sorted(paquetes)):
+                    yield CarritoItem(
+                        id=_uuid(self.seed, 'carrito_item', n * 3 + k),
+                        carrito_id=carrito_id,
+                        paquete_id=_uuid(self.seed, 'paquete', p),
+                        cantidad=rng.randint(1, 3),
+                        fecha_viaje=_fecha_viaje(rng, self.fecha_base),
+                    )
+
+        return self._insert('carrito_items', CarritoItem, rows(), total * 2)  # two items on average
+
+    def ventas(self, total, usuarios):
+        """Create ``total`` sales, each with one to three lines."""
+        rng = self.rng
+        skew = self.skew
+        estados, pesos = zip(*ESTADOS_VENTA)
+        detalles = []
+        fechas = {}
+        inicio = timezone.make_aware(datetime.combine(self.fecha_base, datetime.min.time()))
+        segundos = max(1, self.dias_ventas * 86400)
+
+        def rows():
+            for n in range(total):
+                venta_id = _uuid(self.seed, 'venta', n)
+                estado = rng.choices(estados, pesos)[0]
+                fecha_venta = inicio - timedelta(seconds=rng.randint(1, segundos))
+                fechas[venta_id] = fecha_venta
+                fecha_viaje = _fecha_viaje(rng, timezone.localdate(fecha_venta))
+                for k in range(rng.randint(1, 3)):
+                    p = self._paquete()
+                    detalles.append(VentaDetalle(
+                        id=_uuid(self.seed, 'venta_detalle', n * 3 + k),
+                        venta_id=venta_id,
+                        paquete_id=_uuid(self.seed, 'paquete', p),
+                        cantidad=rng.randint(1, 4),
+                        precio_unitario=Decimal(self.precios[p]),
+                        fecha_viaje=fecha_viaje,
+                    ))
+                usuario = _skewed(rng, usuarios, skew.heavy_fraction, skew.heavy_share)
+                yield Venta(
+                    id=venta_id,
+                    codigo=f'G{n:010d}',
+                    usuario_id=_uuid(self.seed, 'usuario', usuario),
+                    estado=estado,
+                    metodo_pago=rng.choice(METODOS_PAGO),
+                    pago_confirmado=estado in ('confirmada', 'en_proceso', 'completada'),
+                    fecha_viaje=fecha_viaje,
+                )
+
+        done = 0
+        for batch in _batches(rows(), self.batch_size):
+            with transaction.atomic():
+                Venta.objects.bulk_create(batch)
+                # bulk_create stamped them with now; bulk_update skips auto_now.
+                for venta in batch:
+                    venta.fecha_venta = venta.created_at = venta.updated_at = fechas[venta.id]
+                Venta.objects.bulk_update(batch, ['fecha_venta', 'created_at', 'updated_at'])
+                VentaDetalle.objects.bulk_create(detalles, batch_size=self.batch_size)
+            detalles.clear()
+            fechas.clear()
+            done += len(batch)
+            self.progress('ventas', done, total)
+        return done
+
+
+def generate(usuarios, paquetes, ventas, seed=42, batch_size=DEFAULT_BATCH_SIZE,
+             carritos_con_items=0.3, skew=None, hashes=DEFAULT_HASHES, workers=None, progress=None,
+             fecha_base=None, dias_ventas=DEFAULT_DIAS_VENTAS):
+    """
+    Generate a dataset.
+
+    Args:
+        usuarios (int): Client users, each with a cart
+        paquetes (int): Packages, spread over the default categories
+        ventas (int): Sales, each with one to three lines
+        seed (int): Random seed; same arguments and ``fecha_base`` give
+            the same rows
+        batch_size (int): Rows per ``bulk_create`` call
+        carritos_con_items (float): Fraction of carts that get items
+        skew (Skew): Demand concentration; ``Skew()`` defaults if None
+        hashes (int): Distinct password hashes; 0 for one per user
+        workers (int): Processes hashing passwords; CPU count if None
+        progress (callable): ``progress(stage, done, total)`` after each batch
+        fecha_base (date): Date every generated date is derived from;
+            today if None
+        dias_ventas (int): Days before ``fecha_base`` that sales are
+            spread over
+
+    Returns:
+        dict: Rows created and seconds taken per stage
+    """
+    generator = Generator(
+        seed=seed, batch_size=batch_size, skew=skew, hashes=hashes, workers=workers, progress=progress,
+        fecha_base=fecha_base, dias_ventas=dias_ventas,
+    )
+    summary = {}
+    for stage, run in (
+        ('paquetes', lambda: generator.paquetes(paquetes)),
+        ('usuarios', lambda: generator.usuarios(usuarios)),
+        ('carrito_items', lambda: generator.carrito_items(usuarios, carritos_con_items) if paquetes else 0),
+        ('ventas', lambda: generator.ventas(ventas, usuarios) if usuarios and paquetes else 0),
+    ):
+        started = time.perf_counter()
+        rows = run()
+        summary[stage] = {'rows': rows, 'seconds': round(time.perf_counter() - started, 2)}
+    return summary
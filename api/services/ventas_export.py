@@ -0,0 +1,230 @@
+"""
+Streaming export of sales and their lines.
+
+Rows are read with ``QuerySet.iterator(chunk_size=...)`` (a server-side cursor
+on PostgreSQL) and encoded incrementally, so memory use does not depend on the
+number of exported rows.
+"""
+import csv
+import json
+import zlib
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from ..models import Venta, VentaDetalle
+
+FORMATOS = ('csv', 'ndjson')
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Number of rows encoded together before a chunk is yielded to the client.
+ROWS_PER_CHUNK = 500
+
+# (column name, ORM lookup) pairs, one row per VentaDetalle.
+COLUMNAS = (
+    ('venta_id', 'venta_id'),
+    ('venta_codigo', 'venta__codigo'),
+    ('fecha_venta', 'venta__fecha_venta'),
+    ('estado', 'venta__estado'),
+    ('metodo_pago', 'venta__metodo_pago'),
+    ('pago_confirmado', 'venta__pago_confirmado'),
+    ('usuario_id', 'venta__usuario_id'),
+    ('usuario_email', 'venta__usuario__email'),
+    ('usuario_nombre', 'venta__usuario__nombre'),
+    ('usuario_apellido', 'venta__usuario__apellido'),
+    ('detalle_id', 'id'),
+    ('paquete_id', 'paquete_id'),
+    ('paquete_nombre', 'paquete__nombre'),
+    ('categoria', 'paquete__categoria__nombre'),
+    ('dificultad', 'paquete__dificultad'),
+    ('cantidad', 'cantidad'),
+    ('precio_unitario', 'precio_unitario'),
+    ('fecha_viaje', 'fecha_viaje'),
+)
+
+ENCABEZADOS = [nombre for nombre, _ in COLUMNAS]
+
+
+def parse_filtros(desde=None, hasta=None, estado=None):
+    """
+    Parse and validate export filters.
+
+    Args:
+        desde (str, optional): First sale date to include (YYYY-MM-DD)
+        hasta (str, optional): Last sale date to include (YYYY-MM-DD)
+        estado (str, optional): Comma-separated list of sale states
+
+    Returns:
+        dict: Normalized filters with ``desde``, ``hasta`` and ``estados``
+
+    Raises:
+        ValueError: If a date or a state is not valid
+    """
+    filtros = {'desde': None, 'hasta': None, 'estados': []}
+
+    for nombre, valor in (('desde', desde), ('hasta', hasta)):
+        if valor:
+            fecha = parse_date(valor) if isinstance(valor, str) else valor
+            if fecha is None:
+                raise ValueError(f"Fecha inválida para '{nombre}': {valor}")
+            filtros[nombre] = fecha
+
+    if estado:
+        estados = [e.strip() for e in estado.split(',') if e.strip()]
+        validos = {codigo for codigo, _ in Venta.ESTADO_CHOICES}
+        invalidos = [e for e in estados if e not in validos]
+        if invalidos:
+            raise ValueError(f"Estado inválido: {', '.join(invalidos)}")
+        filtros['estados'] = estados
+
+    return filtros
+
+
+def get_export_queryset(desde=None, hasta=None, estados=None):
+    """
+    Build the queryset of exported rows.
+
+    Args:
+        desde (date, optional): First sale date to include
+        hasta (date, optional): Last sale date to include
+        estados (list, optional): Sale states to include
+
+    Returns:
+        QuerySet: ``values_list`` queryset with the columns in ``COLUMNAS``
+    """
+    queryset = VentaDetalle.objects.all()
+    tz = timezone.get_current_timezone()
+
+    if desde:
+        queryset = queryset.filter(
+            venta__fecha_venta__gte=timezone.make_aware(datetime.combine(desde, time.min), tz)
+        )
+    if hasta:
+        queryset = queryset.filter(
+            venta__fecha_venta__lte=timezone.make_aware(datetime.combine(hasta, time.max), tz)
+        )
+    if estados:
+        queryset = queryset.filter(venta__estado__in=estados)
+
+    return queryset.order_by('venta__fecha_venta', 'venta_id', 'id').values_list(
+        *(lookup for _, lookup in COLUMNAS)
+    )
+
+
+def _serializar_valor(valor):
+    """Convert a database value into a JSON/CSV friendly value."""
+    if isinstance(valor, datetime):
+        return timezone.localtime(valor).isoformat() if timezone.is_aware(valor) else valor.isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if valor is None or isinstance(valor, (bool, int, float, str)):
+        return valor
+    return str(valor)
+
+
+class _LineBuffer:
+    """File-like object that keeps the lines written by ``csv.writer``."""
+
+    def __init__(self):
+        self.lines = []
+
+    def write(self, value):
+        self.lines.append(value)
+
+    def drain(self):
+        data = ''.join(self.lines)
+        self.lines = []
+        return data
+
+
+def _iter_csv(rows):
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow(ENCABEZADOS)
+    yield buffer.drain().encode('utf-8')
+
+    pendientes = 0
+    for row in rows:
+        writer.writerow(['' if v is None else _serializar_valor(v) for v in row])
+        pendientes += 1
+        if pendientes >= ROWS_PER_CHUNK:
+            yield buffer.drain().encode('utf-8')
+            pendientes = 0
+
+    if pendientes:
+        yield buffer.drain().encode('utf-8')
+
+
+def _iter_ndjson(rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(
+            dict(zip(ENCABEZADOS, (_serializar_valor(v) for v in row))),
+            ensure_ascii=False
+        ))
+        if len(lines) >= ROWS_PER_CHUNK:
+            lines.append('')
+            yield '\n'.join(lines).encode('utf-8')
+            lines = []
+
+    if lines:
+        lines.append('')
+        yield '\n'.join(lines).encode('utf-8')
+
+
+def _iter_gzip(chunks):
+    # wbits=31 produces a gzip container instead of a raw zlib stream.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_export(formato='csv', desde=None, hasta=None, estados=None,
+                comprimir=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream the export as byte chunks.
+
+    Args:
+        formato (str): Either ``'csv'`` or ``'ndjson'``
+        desde (date, optional): First sale date to include
+        hasta (date, optional): Last sale date to include
+        estados (list, optional): Sale states to include
+        comprimir (bool): Whether to gzip the output
+        chunk_size (int): Rows fetched per database round trip
+
+    Yields:
+        bytes: Encoded (and optionally compressed) export data
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato}")
+
+    rows = get_export_queryset(desde, hasta, estados).iterator(chunk_size=chunk_size)
+    chunks = _iter_csv(rows) if formato == 'csv' else _iter_ndjson(rows)
+
+    if comprimir:
+        chunks = _iter_gzip(chunks)
+
+    return chunks
+
+
+def export_filename(formato, comprimir=False):
+    """Return the download filename for an export."""
+    nombre = f"ventas_{timezone.localdate():%Y%m%d}.{formato}"
+    return f"{nombre}.gz" if comprimir else nombre
+
+
+def export_content_type(formato, comprimir=False):
+    """Return the content type for an export."""
+    if comprimir:
+        return 'application/gzip'
+    if formato == 'csv':
+        return 'text/csv; charset=utf-8'
+    return 'application/x-ndjson; charset=utf-8'
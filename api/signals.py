@@ -1,11 +1,16 @@
 """
 Signal handlers for the API app.
 """
-from django.db.models.signals import post_save, pre_save
+import time
+
+from celery.signals import task_postrun, task_prerun, worker_init
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.conf import settings
 
 from .models import Usuario, Carrito
+from .utils import db_pool, instrumentation, metrics, nplusone, slow_queries, token_revocation, user_cache
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
@@ -17,9 +22,75 @@ def create_user_cart(sender, instance, created, **kwargs):
         Carrito.objects.create(usuario=instance)
 
 
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Drop the user from the authentication cache whenever it changes.
+    """
+    user_cache.invalidate(instance.pk)
+    user_cache.invalidate_email(instance.email)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def revoke_inactive_user_tokens(sender, instance, created, **kwargs):
+    """
+    Revoke the tokens of a deactivated user, including access tokens
+    authenticated from their claims alone.
+    """
+    if not created and not instance.is_active:
+        token_revocation.revoke_user(instance.pk)
+
+
+@receiver(connection_created)
+def count_database_connection(sender, connection, **kwargs):
+    """
+    Count new database connections for the connection reuse metrics and
+    install the slow query log and the per-request query counters on them.
+    """
+    db_pool.record_connection(connection)
+    slow_queries.install(connection)
+    instrumentation.install(connection)
+    nplusone.install(connection)
+
+
 # @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 # def save_user_profile(sender, instance, **kwargs):
 #     """
 #     Save the user profile when the user is saved.
 #     """
 #     instance.save()
+
+
+_task_started = {}
+
+
+@task_prerun.connect
+def start_task_timer(task_id=None, **kwargs):
+    """
+    Remember when a Celery task started, for the task duration metrics.
+    """
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    """
+    Record a finished Celery task's duration and state.
+    """
+    started = _task_started.pop(task_id, None)
+    name = getattr(task, 'name', 'unknown')
+    metrics.celery_tasks.inc(task=name, state=state or 'UNKNOWN')
+    if started is not None:
+        metrics.celery_task_duration.observe(time.perf_counter() - started, task=name, state=state or 'UNKNOWN')
+    # A worker child may then sit idle for long; write its snapshot now
+    # rather than on the next record after FLUSH_SECONDS.
+    metrics.flush()
+
+
+@worker_init.connect
+def start_worker_metrics(**kwargs):
+    """
+    Serve the worker's metrics, which the web ``/metrics`` cannot see.
+    """
+    metrics.start_worker_endpoint()
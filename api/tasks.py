@@ -2,10 +2,69 @@
 Background tasks for the ONIET API.
 """
 from celery import shared_task
-from django.core.mail import send_mail
 from django.conf import settings
+from django.db.models import F, Prefetch
+from django.utils import timezone
 
-from .models import Usuario, Venta
+from .models import Campana, Usuario, Venta, VentaDetalle
+from .utils.email_utils import queue_emails, render_email, render_emails, send_batch, site_context
+
+
+def _welcome_payload(user):
+    return render_email(
+        '¡Bienvenido a ONIET!', user.email,
+        template_name='welcome', context={'user': user, **site_context()},
+    )
+
+
+def _order_confirmation_message(venta):
+    items = list(venta.items.all())
+    context = {
+        'order': venta,
+        'user': venta.usuario,
+        'items': items,
+        'total': sum(item.subtotal for item in items),
+    }
+    return f'ONIET - Confirmación de compra #{venta.codigo}', venta.usuario.email, context
+
+
+def _ventas_for_confirmation():
+    return Venta.objects.select_related('usuario').prefetch_related(
+        Prefetch('items', queryset=VentaDetalle.objects.select_related('paquete'))
+    )
+
+
+@shared_task
+def send_email_batch(payloads, campana_id=None):
+    """
+    Send a batch of rendered emails over one connection.
+    
+    Messages that fail are queued again in a new batch, with exponential
+    backoff, until settings.EMAIL_MAX_RETRIES attempts have been made.
+    When the batch belongs to a campaign, its counters are updated.
+    """
+    failed = send_batch(payloads)
+    
+    max_retries = getattr(settings, 'EMAIL_MAX_RETRIES', 3)
+    backoff = getattr(settings, 'EMAIL_RETRY_BACKOFF', 60)
+    
+    retries = {}
+    dropped = 0
+    for payload in failed:
+        attempt = payload.get('attempt', 0) + 1
+        if attempt > max_retries:
+            dropped += 1
+            continue
+        retries.setdefault(attempt, []).append(dict(payload, attempt=attempt))
+    
+    for attempt, batch in retries.items():
+        send_email_batch.apply_async((batch, campana_id), countdown=backoff * 2 ** (attempt - 1))
+    
+    if campana_id is not None:
+        Campana.registrar_envio(campana_id, enviados=len(payloads) - len(failed), fallidos=dropped)
+    
+    retried = sum(len(batch) for batch in retries.values())
+    return f"Sent {len(payloads) - len(failed)} emails, {retried} queued for retry, {dropped} dropped"
 
 
 @shared_task
@@ -15,34 +74,12 @@ def send_welcome_email(user_id):
     """
     try:
         user = Usuario.objects.get(id=user_id)
-        subject = '¡Bienvenido a ONIET!'
-        message = f"""
-        ¡Hola {user.get_full_name()}!
-
-        Gracias por registrarte en ONIET. Estamos encantados de tenerte con nosotros.
-
-        Con tu cuenta podrás:
-        - Explorar nuestros paquetes turísticos
-        - Hacer reservas de manera sencilla
-        - Gestionar tus compras
-        - Y mucho más...
-
-        ¡Comienza a explorar ahora!
-
-        Saludos,
-        El equipo de ONIET
-        """
-        
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            fail_silently=False,
-        )
-        return f"Welcome email sent to {user.email}"
     except Usuario.DoesNotExist:
         return f"User with id {user_id} does not exist"
+    
+    if send_batch([_welcome_payload(user)]):
+        raise RuntimeError(f"Could not send welcome email to {user.email}")
+    return f"Welcome email sent to {user.email}"
 
 
 @shared_task
@@ -51,44 +88,118 @@ def send_order_confirmation(venta_id):
     Send an order confirmation email to the user.
     """
     try:
-        venta = Venta.objects.select_related('usuario').get(id=venta_id)
-        user = venta.usuario
-        
-        subject = f'ONIET - Confirmación de compra #{venta.codigo}'
-        message = f"""
-        Hola {user.get_full_name()},
+        venta = _ventas_for_confirmation().get(id=venta_id)
+    except Venta.DoesNotExist:
+        return f"Venta with id {venta_id} does not exist"
+    
+    payloads = render_emails('order_confirmation', [_order_confirmation_message(venta)], site_context())
+    if send_batch(payloads):
+        raise RuntimeError(f"Could not send order confirmation for order #{venta.codigo}")
+    return f"Order confirmation sent for order #{venta.codigo} to {venta.usuario.email}"
 
-        Gracias por tu compra en ONIET. Aquí tienes los detalles de tu pedido:
 
-        Número de pedido: {venta.codigo}
-        Fecha: {venta.fecha_venta.strftime('%d/%m/%Y %H:%M')}
-        Total: ${venta.total:,.2f}
-        
-        Detalles de los paquetes:
-        """
-        
-        # Add package details
-        detalles = venta.detalles.select_related('paquete').all()
-        for detalle in detalles:
-            message += f"- {detalle.paquete.nombre}: {detalle.cantidad} x ${detalle.precio_unitario:,.2f}\n"
-        
-        message += """
-        Si tienes alguna pregunta sobre tu pedido, no dudes en contactarnos.
+@shared_task
+def send_order_confirmations(venta_ids):
+    """
+    Send confirmation emails for many orders, e.g. after a sale event.
+    
+    Emails are rendered here against one compiled template, chunk by chunk,
+    and delivered by ``send_email_batch`` tasks of settings.EMAIL_BATCH_SIZE
+    messages each.
+    """
+    ventas = _ventas_for_confirmation().filter(id__in=venta_ids)
+    shared_context = site_context()
+    
+    def payloads():
+        messages = []
+        for venta in ventas.iterator(chunk_size=500):
+            messages.append(_order_confirmation_message(venta))
+            if len(messages) == 500:
+                yield from render_emails('order_confirmation', messages, shared_context)
+                messages = []
+        yield from render_emails('order_confirmation', messages, shared_context)
+    
+    batches = queue_emails(payloads())
+    return f"Queued {batches} email batches for {len(venta_ids)} orders"
 
-        Saludos,
-        El equipo de ONIET
-        """
+
+@shared_task(bind=True)
+def run_campaign(self, campana_id, run_token=None):
+    """
+    Queue the next part of a campaign's recipients as email batches.
+    
+    Recipients are streamed with ``iterator()`` in ``id`` order from the
+    campaign cursor. Each batch is claimed before it is queued by moving the
+    cursor with a compare-and-set on (cursor, ``run_token``, estado): a run
+    whose token was replaced (the campaign was paused and resumed), a
+    duplicated delivery of the same run, or a paused campaign fails the
+    claim and stops, so no batch is queued twice and a pause takes effect
+    within one batch. Every settings.CAMPAIGN_BATCHES_PER_RUN batches the
+    task re-queues itself to keep each run short. Without a broker (eager
+    mode) the run just continues instead, rather than recursing.
+    
+    Delivery is at-most-once per recipient: a worker dying between claiming
+    a batch and handing it to the broker loses that batch.
+    """
+    try:
+        campana = Campana.objects.get(id=campana_id)
+    except Campana.DoesNotExist:
+        return f"Campana with id {campana_id} does not exist"
+    
+    if campana.estado != 'en_curso':
+        return f"Campaign {campana.nombre} is {campana.estado}"
+    if run_token is None or str(campana.run_token) != run_token:
+        return f"Campaign {campana.nombre} is handled by another run"
+    
+    batch_size = getattr(settings, 'EMAIL_BATCH_SIZE', 100)
+    batches_per_run = getattr(settings, 'CAMPAIGN_BATCHES_PER_RUN', 50)
+    shared_context = {**site_context(), 'mensaje': campana.mensaje}
+    
+    destinatarios = campana.destinatarios().values_list('id', 'email', 'nombre', 'apellido')
+    cursor = campana.cursor
+    batches = 0
+    
+    def queue(rows):
+        """Claim ``rows`` by advancing the cursor, then queue them; False if the claim failed."""
+        nonlocal cursor
+        messages = [
+            (campana.asunto, email, {'user': {'nombre': nombre, 'apellido': apellido}})
+            for _, email, nombre, apellido in rows
+        ]
+        payloads = render_emails(campana.plantilla, messages, shared_context)
+        claimed = Campana.objects.filter(
+            pk=campana.pk, estado='en_curso', run_token=run_token, cursor=cursor,
+        ).update(cursor=rows[-1][0], encolados=F('encolados') + len(rows), updated_at=timezone.now())
+        if not claimed:
+            return False
+        cursor = rows[-1][0]
+        send_email_batch.delay(payloads, str(campana.id))
+        return True
+    
+    rows = []
+    for row in destinatarios.iterator(chunk_size=getattr(settings, 'CAMPAIGN_CHUNK_SIZE', 2000)):
+        rows.append(row)
+        if len(rows) < batch_size:
+            continue
         
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            fail_silently=False,
-        )
-        return f"Order confirmation sent for order #{venta.codigo} to {user.email}"
-    except Venta.DoesNotExist:
-        return f"Venta with id {venta_id} does not exist"
+        if not queue(rows):
+            return f"Campaign {campana.nombre} stopped after {batches} batches"
+        rows = []
+        batches += 1
+        
+        if batches >= batches_per_run and not self.request.is_eager:
+            run_campaign.delay(campana_id, run_token)
+            return f"Queued {batches} batches for campaign {campana.nombre}, continuing"
+    
+    if rows:
+        if not queue(rows):
+            return f"Campaign {campana.nombre} stopped after {batches} batches"
+        batches += 1
+    
+    Campana.objects.filter(pk=campana.pk, estado='en_curso', run_token=run_token).update(
+        estado='completada', fecha_fin=timezone.now(), updated_at=timezone.now()
+    )
+    return f"Queued {batches} batches for campaign {campana.nombre}, completed"
 
 
 @shared_task
@@ -0,0 +1,145 @@
+"""
+Tests for the columnar sales snapshot (``api.services.analytics``) and ``/reportes/pivot/``.
+
+Rows are backdated an hour so that each incremental refresh reads only what
+the test changed afterwards.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import CategoriaPaquete, Paquete, Usuario, Venta, VentaDetalle
+from api.services import analytics
+
+MONTANA = 'Analítica Montaña'
+MAR = 'Analítica Mar'
+FILTROS = {'categoria': [MONTANA, MAR]}
+
+
+def _por_fila(data):
+    return {fila: valores for fila, valores in zip(data['filas'], data['valores'])}
+
+
+class VentasSnapshotTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        usuario = Usuario.objects.create_user('analitica@example.com', 'x')
+        cls.montana = CategoriaPaquete.objects.create(nombre=MONTANA, descripcion='-')
+        mar = CategoriaPaquete.objects.create(nombre=MAR, descripcion='-')
+        cls.alta = Paquete.objects.create(nombre='Cumbre', descripcion='-', precio=1000,
+                                          dificultad='alta', categoria=cls.montana)
+        baja = Paquete.objects.create(nombre='Costa', descripcion='-', precio=500,
+                                      dificultad='baja', categoria=mar)
+        cls.completada = Venta.objects.create(codigo='VAN0001', usuario=usuario, estado='completada',
+                                              metodo_pago='tarjeta_credito')
+        pendiente = Venta.objects.create(codigo='VAN0002', usuario=usuario, estado='pendiente')
+        cls.linea = VentaDetalle.objects.create(venta=cls.completada, paquete=cls.alta, cantidad=2,
+                                                precio_unitario=Decimal('1000'))
+        VentaDetalle.objects.create(venta=cls.completada, paquete=baja, cantidad=1, precio_unitario=Decimal('500'))
+        VentaDetalle.objects.create(venta=pendiente, paquete=cls.alta, cantidad=1, precio_unitario=Decimal('1000'))
+
+        hace_una_hora = timezone.now() - timedelta(hours=1)
+        for model in (CategoriaPaquete, Paquete, Venta, VentaDetalle):
+            model.objects.update(updated_at=hace_una_hora)
+
+    def setUp(self):
+        self.snapshot = analytics.VentasSnapshot()
+        self.snapshot.rebuild()
+
+    def test_pivot_by_category_and_state(self):
+        data = self.snapshot.pivot('categoria', 'estado', 'importe', FILTROS)
+
+        self.assertEqual(data['columnas'], ['pendiente', 'completada'])
+        self.assertEqual(_por_fila(data), {MONTANA: [1000.0, 2000.0], MAR: [0.0, 500.0]})
+        self.assertEqual(data['total'], 3500.0)
+        self.assertEqual(data['lineas'], 3)
+
+    def test_pivot_measures_and_filters(self):
+        data = self.snapshot.pivot('dificultad', medida='cantidad', filtros=dict(FILTROS, estado=['completada']))
+        self.assertEqual(_por_fila(data), {'baja': [1], 'alta': [2]})
+        self.assertEqual(data['columnas'], ['total'])
+
+        data = self.snapshot.pivot('metodo_pago', medida='lineas', filtros=FILTROS)
+        self.assertEqual(_por_fila(data), {'efectivo': [1], 'tarjeta_credito': [2]})
+
+        mes = timezone.localdate().strftime('%Y-%m')
+        data = self.snapshot.pivot('mes', medida='lineas', filtros=FILTROS)
+        self.assertEqual(_por_fila(data), {mes: [3]})
+
+    def test_pivot_rejects_unknown_dimensions(self):
+        with self.assertRaises(ValueError):
+            self.snapshot.pivot('destino')
+        with self.assertRaises(ValueError):
+            self.snapshot.pivot('categoria', medida='margen')
+
+    def test_refresh_reads_only_changed_lines(self):
+        self.assertEqual(self.snapshot.refresh(), 0)
+
+        self.linea.cantidad = 3
+        self.linea.save()
+        self.assertEqual(self.snapshot.refresh(), 1)
+        self.assertEqual(_por_fila(self.snapshot.pivot('categoria', medida='cantidad', filtros=FILTROS))[MONTANA], [4])
+
+        stats = self.snapshot.stats()
+        self.assertEqual(stats['filas'] - stats['filas_validas'], 1)
+
+    def test_refresh_follows_sale_and_category_changes(self):
+        self.completada.estado = 'cancelada'
+        self.completada.save()
+        self.assertEqual(self.snapshot.refresh(), 2)
+
+        self.montana.nombre = 'Analítica Cumbres'
+        self.montana.save()
+        # Also re-reads the two lines of the sale, still inside WATERMARK_OVERLAP.
+        self.assertEqual(self.snapshot.refresh(), 3)
+
+        data = self.snapshot.pivot('categoria', 'estado', 'lineas', {'categoria': ['Analítica Cumbres', MAR, MONTANA]})
+        self.assertEqual(_por_fila(data), {'Analítica Cumbres': [1, 1], MAR: [0, 1]})
+        self.assertEqual(data['columnas'], ['pendiente', 'cancelada'])
+
+    @override_settings(ANALYTICS_REFRESH_SECONDS=0)
+    def test_stale_snapshot_is_refreshed_in_the_background(self):
+        with mock.patch.object(analytics.threading, 'Thread') as thread:
+            self.snapshot.refresh_if_stale()
+            self.snapshot.refresh_if_stale()  # the first one is still running
+
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once()
+
+        self.linea.cantidad = 3
+        self.linea.save()
+        with mock.patch.object(analytics, 'connections'):  # would close the test's connection
+            thread.call_args.kwargs['target']()
+        self.assertFalse(self.snapshot._refreshing)
+        self.assertEqual(_por_fila(self.snapshot.pivot('categoria', medida='cantidad', filtros=FILTROS))[MONTANA], [4])
+
+    def test_first_build_runs_in_the_caller(self):
+        snapshot = analytics.VentasSnapshot()
+        with mock.patch.object(analytics.threading, 'Thread') as thread:
+            snapshot.refresh_if_stale()
+        thread.assert_not_called()
+        self.assertEqual(snapshot.pivot('categoria', filtros=FILTROS)['lineas'], 3)
+
+
+class PivotViewTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(Usuario.objects.create_user('staff@example.com', 'x', is_staff=True))
+
+    def test_pivot(self):
+        with mock.patch.object(analytics, '_snapshot', analytics.VentasSnapshot()):
+            response = self.client.get('/api/v1/reportes/pivot/', {'filas': 'estado', 'medida': 'lineas'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {
+            'filas', 'columnas', 'medida', 'valores', 'total_filas', 'total_columnas', 'total', 'lineas', 'snapshot',
+        })
+
+    def test_invalid_month_is_a_bad_request(self):
+        response = self.client.get('/api/v1/reportes/pivot/', {'desde': '2026-13'})
+        self.assertEqual(response.status_code, 400)
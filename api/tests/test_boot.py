@@ -0,0 +1,123 @@
+"""
+Tests for the skipped startup steps of ``manage.py boot`` (``api.utils.boot``).
+"""
+import os
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.recorder import MigrationRecorder
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api.utils import boot
+
+
+def _temp_dir(test):
+    directory = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, directory, True)
+    return directory
+
+
+class PendingMigrationsTests(TestCase):
+
+    def test_nothing_pending_after_migrate(self):
+        self.assertEqual(boot.pending_migrations(), set())
+
+    def test_file_without_a_row_is_pending(self):
+        MigrationRecorder(connection).record_unapplied('api', '0006_campana_run_token')
+        self.assertEqual(boot.pending_migrations(), {('api', '0006_campana_run_token')})
+
+
+class MigrationLockTests(SimpleTestCase):
+
+    def test_second_holder_times_out(self):
+        with override_settings(BOOT={'STATE_DIR': _temp_dir(self)}):
+            with boot.migration_lock(timeout=1):
+                errors = []
+
+                def contend():
+                    try:
+                        with boot.migration_lock(timeout=0.2):
+                            pass
+                    except TimeoutError as exc:
+                        errors.append(exc)
+
+                thread = threading.Thread(target=contend)
+                thread.start()
+                thread.join()
+            self.assertEqual(len(errors), 1)
+
+            # Released on exit: the next holder gets it at once.
+            with boot.migration_lock(timeout=0):
+                pass
+
+
+class FingerprintTests(SimpleTestCase):
+
+    def test_static_fingerprint_follows_file_contents(self):
+        static_dir = _temp_dir(self)
+        path = os.path.join(static_dir, 'app.css')
+        with open(path, 'w') as f:
+            f.write('body {}')
+
+        with override_settings(STATICFILES_DIRS=[static_dir]):
+            before = boot.static_fingerprint()
+            self.assertEqual(boot.static_fingerprint(), before)
+            with open(path, 'w') as f:
+                f.write('body { color: red }')
+            self.assertNotEqual(boot.static_fingerprint(), before)
+
+    def test_check_fingerprint_ignores_credentials(self):
+        before = boot.check_fingerprint()
+        with override_settings(EMAIL_HOST_PASSWORD='otra', SIMPLE_JWT={'SIGNING_KEY': 'otra'}):
+            self.assertEqual(boot.check_fingerprint(), before)
+        with override_settings(DEBUG=not settings.DEBUG):
+            self.assertNotEqual(boot.check_fingerprint(), before)
+
+    def test_check_fingerprint_follows_the_secret_key_shape(self):
+        with override_settings(SECRET_KEY='a1B!' * 15):
+            strong = boot.check_fingerprint()
+        with override_settings(SECRET_KEY='c2D?' * 15):
+            self.assertEqual(boot.check_fingerprint(), strong)
+        with override_settings(SECRET_KEY='corta'):
+            self.assertNotEqual(boot.check_fingerprint(), strong)
+
+
+class BootCommandTests(TestCase):
+
+    def setUp(self):
+        self.static_root = _temp_dir(self)
+        override = override_settings(STATIC_ROOT=self.static_root, BOOT={'STATE_DIR': _temp_dir(self)})
+        override.enable()
+        self.addCleanup(override.disable)
+        patcher = mock.patch('api.management.commands.boot.call_command')
+        self.step_command = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _boot(self, *args):
+        self.step_command.reset_mock()
+        out = StringIO()
+        call_command('boot', *args, stdout=out)
+        return [call.args[0] for call in self.step_command.call_args_list]
+
+    def test_steps_run_once_then_are_skipped(self):
+        self.assertEqual(self._boot('--steps', 'collectstatic,check'), ['collectstatic', 'check'])
+        self.assertEqual(self._boot('--steps', 'collectstatic,check'), [])
+        self.assertEqual(self._boot('--steps', 'collectstatic,check', '--force'), ['collectstatic', 'check'])
+
+    def test_steps_run_again_when_their_inputs_change(self):
+        self._boot('--steps', 'collectstatic,check')
+        with mock.patch.object(boot, 'check_fingerprint', return_value='otro'):
+            self.assertEqual(self._boot('--steps', 'collectstatic,check'), ['check'])
+            with mock.patch.object(boot, 'static_fingerprint', return_value='otro'):
+                self.assertEqual(self._boot('--steps', 'collectstatic,check'), ['collectstatic'])
+
+    def test_migrate_runs_only_with_pending_migrations(self):
+        self.assertEqual(self._boot('--steps', 'migrate'), [])
+        MigrationRecorder(connection).record_unapplied('api', '0006_campana_run_token')
+        self.assertEqual(self._boot('--steps', 'migrate'), ['migrate'])
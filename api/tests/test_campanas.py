@@ -0,0 +1,112 @@
+"""
+Tests for email campaigns (``Campana`` and ``api.tasks.run_campaign``).
+
+Celery runs eagerly, so ``iniciar`` runs the whole campaign and its email
+batches before returning.
+"""
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from api import tasks
+from api.models import Campana, CategoriaPaquete, Paquete, Usuario, Venta, VentaDetalle
+
+from .test_email_batches import EagerCeleryMixin
+
+CLIENTES = 5
+
+
+@override_settings(EMAIL_BATCH_SIZE=2)
+class CampanaTests(EagerCeleryMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.clientes = [Usuario.objects.create_user(f'cliente{i}@example.com', 'x') for i in range(CLIENTES)]
+        Usuario.objects.create_user('vendedor@example.com', 'x', tipo_usuario='vendedor')
+        Usuario.objects.create_user('inactivo@example.com', 'x', is_active=False)
+
+    def _campana(self, **kwargs):
+        return Campana.objects.create(nombre='Verano', asunto='Ofertas', mensaje='Hola', **kwargs)
+
+    def _destinatarios(self):
+        return sorted(message.to[0] for message in mail.outbox)
+
+    def test_sends_to_every_active_client_once(self):
+        campana = self._campana()
+        self.assertTrue(campana.iniciar())
+        campana.refresh_from_db()
+
+        self.assertEqual(self._destinatarios(), sorted(u.email for u in self.clientes))
+        self.assertEqual(campana.estado, 'completada')
+        self.assertEqual((campana.encolados, campana.enviados, campana.fallidos), (CLIENTES, CLIENTES, 0))
+        self.assertEqual(campana.cursor, max(u.id for u in self.clientes))
+        self.assertFalse(campana.iniciar())  # already completed
+
+    def test_category_segment_only_reaches_its_buyers(self):
+        categoria = CategoriaPaquete.objects.create(nombre='Campañas', descripcion='-')
+        paquete = Paquete.objects.create(nombre='Delta', descripcion='-', precio=1000, categoria=categoria)
+        venta = Venta.objects.create(codigo='VCA0001', usuario=self.clientes[2])
+        VentaDetalle.objects.create(venta=venta, paquete=paquete, cantidad=1, precio_unitario=1000)
+
+        self._campana(segmento='compradores_categoria', categoria=categoria).iniciar()
+        self.assertEqual(self._destinatarios(), [self.clientes[2].email])
+
+    def test_pause_stops_within_one_batch_and_resume_continues(self):
+        campana = self._campana()
+        real_delay = tasks.send_email_batch.delay
+
+        def pause_after_first_batch(*args):
+            campana.pausar()
+            return real_delay(*args)
+
+        with mock.patch.object(tasks.send_email_batch, 'delay', side_effect=pause_after_first_batch):
+            campana.iniciar()
+        campana.refresh_from_db()
+        self.assertEqual((campana.estado, campana.encolados), ('pausada', 2))
+
+        first_token = campana.run_token
+        self.assertTrue(campana.iniciar())
+        campana.refresh_from_db()
+        self.assertNotEqual(campana.run_token, first_token)
+        self.assertEqual(campana.estado, 'completada')
+        self.assertEqual(self._destinatarios(), sorted(u.email for u in self.clientes))
+
+    def test_run_with_a_replaced_token_does_nothing(self):
+        campana = self._campana()
+        with mock.patch.object(tasks.run_campaign, 'delay'):
+            campana.iniciar()  # leaves the campaign en_curso without running it
+        stale_token = str(campana.run_token)
+        Campana.objects.filter(pk=campana.pk).update(estado='pausada')
+        with mock.patch.object(tasks.run_campaign, 'delay'):
+            campana.iniciar()
+
+        result = tasks.run_campaign.delay(str(campana.id), stale_token).get()
+        self.assertIn('handled by another run', result)
+        self.assertEqual(mail.outbox, [])
+
+    def test_claim_fails_when_another_run_moved_the_cursor(self):
+        campana = self._campana()
+        real_render = tasks.render_emails
+
+        def render_while_another_run_claims(*args, **kwargs):
+            # Same token, as a duplicated delivery of the task would have.
+            Campana.objects.filter(pk=campana.pk).update(cursor=self.clientes[0].id)
+            return real_render(*args, **kwargs)
+
+        with mock.patch.object(tasks, 'render_emails', side_effect=render_while_another_run_claims):
+            campana.iniciar()
+        campana.refresh_from_db()
+
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual((campana.estado, campana.encolados), ('en_curso', 0))
+
+    @override_settings(EMAIL_MAX_RETRIES=0)
+    def test_dropped_messages_count_as_failed(self):
+        campana = self._campana()
+        with mock.patch.object(tasks, 'send_batch', side_effect=lambda batch: batch[:1]):
+            campana.iniciar()
+        campana.refresh_from_db()
+
+        batches = -(-CLIENTES // 2)
+        self.assertEqual((campana.enviados, campana.fallidos), (CLIENTES - batches, batches))
@@ -0,0 +1,119 @@
+"""
+Tests for the synthetic dataset generator (``api.services.datagen``).
+"""
+from datetime import date, datetime, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api.models import Carrito, CarritoItem, Paquete, Usuario, Venta, VentaDetalle
+from api.services import datagen
+
+FECHA_BASE = date(2026, 1, 1)
+
+
+def _generate(**kwargs):
+    options = dict(usuarios=20, paquetes=10, ventas=60, seed=7, batch_size=25, hashes=1, workers=1,
+                   fecha_base=FECHA_BASE)
+    options.update(kwargs)
+    return datagen.generate(**options)
+
+
+def _rows():
+    return {
+        'paquetes': list(Paquete.objects.filter(nombre__contains=datagen.PAQUETE_TAG)
+                         .order_by('id').values_list('id', 'nombre', 'precio', 'categoria__nombre')),
+        'usuarios': list(Usuario.objects.filter(email__endswith=f'@{datagen.EMAIL_DOMAIN}')
+                         .order_by('id').values_list('id', 'email', 'nombre', 'apellido')),
+        'carrito_items': list(CarritoItem.objects.order_by('id').values_list(
+            'id', 'carrito_id', 'paquete_id', 'cantidad', 'fecha_viaje')),
+        'ventas': list(Venta.objects.filter(codigo__startswith='G').order_by('id').values_list(
+            'id', 'codigo', 'usuario_id', 'estado', 'metodo_pago', 'fecha_venta', 'fecha_viaje')),
+        'venta_detalles': list(VentaDetalle.objects.order_by('id').values_list(
+            'id', 'venta_id', 'paquete_id', 'cantidad', 'precio_unitario')),
+    }
+
+
+class DatagenDatesTests(TestCase):
+
+    def test_sales_are_spread_over_the_window_before_the_base_date(self):
+        _generate(dias_ventas=30)
+        fin = timezone.make_aware(datetime.combine(FECHA_BASE, datetime.min.time()))
+        ventas = list(Venta.objects.filter(codigo__startswith='G'))
+
+        self.assertEqual(len(ventas), 60)
+        for venta in ventas:
+            self.assertTrue(fin - timedelta(days=30) <= venta.fecha_venta < fin, venta.fecha_venta)
+            self.assertEqual(venta.created_at, venta.fecha_venta)
+            self.assertEqual(venta.updated_at, venta.fecha_venta)
+            self.assertGreaterEqual(venta.fecha_viaje, timezone.localdate(venta.fecha_venta) + timedelta(days=15))
+        self.assertGreater(len({timezone.localdate(venta.fecha_venta) for venta in ventas}), 10)
+
+
+class DatagenDeterminismTests(TestCase):
+
+    def test_same_seed_gives_the_same_rows(self):
+        _generate()
+        first = _rows()
+        datagen.purge()
+        _generate()
+
+        self.assertEqual(_rows(), first)
+        self.assertEqual(len(first['ventas']), 60)
+
+    def test_other_seed_gives_other_rows(self):
+        _generate()
+        first = _rows()
+        datagen.purge()
+        _generate(seed=8)
+
+        self.assertNotEqual(_rows()['venta_detalles'], first['venta_detalles'])
+
+
+class DatagenSkewTests(TestCase):
+
+    def _share(self, skew):
+        _generate(usuarios=20, paquetes=20, ventas=200, skew=skew)
+        populares = [datagen._uuid(7, 'paquete', n) for n in range(2)]
+        pesados = [datagen._uuid(7, 'usuario', n) for n in range(2)]
+        lineas = VentaDetalle.objects.filter(venta__codigo__startswith='G')
+        ventas = Venta.objects.filter(codigo__startswith='G')
+        return (
+            lineas.filter(paquete_id__in=populares).count() / lineas.count(),
+            ventas.filter(usuario_id__in=pesados).count() / ventas.count(),
+        )
+
+    def test_demand_concentrates_on_popular_packages_and_heavy_buyers(self):
+        paquetes, usuarios = self._share(datagen.Skew(
+            popular_fraction=0.1, popular_share=0.9, heavy_fraction=0.1, heavy_share=0.8,
+        ))
+        # Expected shares: 0.9 + 0.1 * 0.1 and 0.8 + 0.2 * 0.1.
+        self.assertGreater(paquetes, 0.8)
+        self.assertGreater(usuarios, 0.7)
+
+    def test_zero_share_gives_uniform_demand(self):
+        paquetes, usuarios = self._share(datagen.Skew(popular_share=0, heavy_share=0))
+        # Expected share of the first 10%: 0.1.
+        self.assertLess(paquetes, 0.25)
+        self.assertLess(usuarios, 0.25)
+
+
+class DatagenPurgeTests(TestCase):
+
+    def test_purge_deletes_only_generated_rows(self):
+        usuario = Usuario.objects.create_user('real@example.com', 'x')
+        paquetes = Paquete.objects.exclude(nombre__contains=datagen.PAQUETE_TAG).count()
+        _generate()
+        self.assertTrue(datagen.exists())
+
+        deleted = datagen.purge()
+
+        self.assertFalse(datagen.exists())
+        self.assertEqual(deleted['usuarios'], 20)
+        self.assertEqual(deleted['paquetes'], 10)
+        self.assertEqual(deleted['ventas'], 60)
+        self.assertFalse(Venta.objects.exists())
+        self.assertFalse(VentaDetalle.objects.exists())
+        self.assertFalse(CarritoItem.objects.exists())
+        self.assertEqual(list(Carrito.objects.values_list('usuario', flat=True)), [usuario.pk])
+        self.assertEqual(Paquete.objects.count(), paquetes)
@@ -0,0 +1,113 @@
+"""
+Tests for the read-replica routing in ``api.utils.db_routing``.
+
+``replica_1`` is a separate in-memory SQLite database with the same schema
+as the primary but its own rows, so a response shows which database the
+view read from. ``TransactionTestCase`` is used because ``TestCase`` wraps
+every test in ``transaction.atomic``, which keeps all reads on the primary.
+"""
+import time
+from unittest import mock
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+
+from api.models import CategoriaPaquete, Paquete, Usuario
+from api.utils import db_routing
+
+REPLICA = 'replica_1'
+
+
+def _add_replica():
+    databases = connections.configure_settings({
+        DEFAULT_DB_ALIAS: dict(connections.settings[DEFAULT_DB_ALIAS]),
+        REPLICA: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+    })
+    # connections.settings is settings.DATABASES, so replica_aliases() sees it too.
+    connections.settings[REPLICA] = databases[REPLICA]
+    with connections[REPLICA].schema_editor() as editor:
+        for model in apps.get_models():
+            editor.create_model(model)
+
+
+def _remove_replica():
+    connections[REPLICA].close()
+    del connections[REPLICA]
+    del connections.settings[REPLICA]
+
+
+class ReadReplicaRoutingTests(TransactionTestCase):
+    # The test runner only sets up aliases present in settings, so the
+    # replica is added, and allowed, once the class has been set up.
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.databases = cls.databases | {REPLICA}
+        _add_replica()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.databases = cls.databases - {REPLICA}
+        _remove_replica()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.staff = Usuario.objects.create_user('staff@example.com', 'x', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+        Paquete.objects.all().delete()  # seeded by a data migration
+        # The replica lags behind: it holds a package the primary no longer has.
+        self.primary_paquete = self._paquete(DEFAULT_DB_ALIAS, 'Primario')
+        self.replica_paquete = self._paquete(REPLICA, 'Réplica')
+
+    def tearDown(self):
+        for model in (Paquete, CategoriaPaquete):
+            model.objects.using(REPLICA).all().delete()
+
+    def _paquete(self, using, nombre):
+        categoria = CategoriaPaquete.objects.using(using).create(nombre=nombre, descripcion=nombre)
+        return Paquete.objects.using(using).create(
+            nombre=nombre, descripcion=nombre, precio=1000, categoria=categoria
+        )
+
+    def _listed_names(self):
+        response = self.client.get('/api/v1/paquetes/')
+        self.assertEqual(response.status_code, 200)
+        return [item['nombre'] for item in response.data['results']]
+
+    def test_list_reads_from_the_replica(self):
+        self.assertEqual(self._listed_names(), ['Réplica'])
+
+    def test_retrieve_reads_from_the_replica(self):
+        response = self.client.get(f'/api/v1/paquetes/{self.replica_paquete.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['nombre'], 'Réplica')
+
+        response = self.client.get(f'/api/v1/paquetes/{self.primary_paquete.pk}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_reads_inside_a_transaction_use_the_primary(self):
+        with transaction.atomic():
+            self.assertEqual(self._listed_names(), ['Primario'])
+
+    def test_reads_after_a_write_stick_to_the_primary(self):
+        response = self.client.post(f'/api/v1/paquetes/{self.primary_paquete.pk}/activate/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._listed_names(), ['Primario'])
+
+        with mock.patch('time.time', return_value=time.time() + db_routing._get_setting('STICKY_SECONDS') + 1):
+            self.assertEqual(self._listed_names(), ['Réplica'])
+
+    def test_flag_is_reset_when_the_response_is_finalized(self):
+        self._listed_names()
+        # A 404 goes through handle_exception and finalize_response too.
+        self.client.get(f'/api/v1/paquetes/{self.primary_paquete.pk}/')
+
+        self.assertFalse(db_routing._read_from_replica.get())
+        self.assertEqual(list(Paquete.objects.values_list('nombre', flat=True)), ['Primario'])
@@ -0,0 +1,109 @@
+"""
+Tests for batched email delivery (``api.utils.email_utils``) and its retries
+(``api.tasks.send_email_batch``).
+
+Django's test runner uses the locmem email backend. Celery runs eagerly, so a
+retry's countdown is ignored and it runs right away.
+"""
+import smtplib
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from api import tasks
+from api.celery import app
+from api.utils import email_utils
+
+
+def _payloads(*emails):
+    return [email_utils.render_email('Asunto', email, body='Hola') for email in emails]
+
+
+class EagerCeleryMixin:
+
+    def setUp(self):
+        super().setUp()
+        # Settings does not support patch.object's delattr on exit.
+        self.addCleanup(setattr, app.conf, 'task_always_eager', app.conf.task_always_eager)
+        app.conf.task_always_eager = True
+
+
+class SendBatchTests(TestCase):
+
+    def test_sends_every_message_over_one_connection(self):
+        connection = mail.get_connection()
+        with mock.patch.object(connection, 'open', wraps=connection.open) as opened:
+            failed = email_utils.send_batch(_payloads('a@example.com', 'b@example.com'), connection)
+
+        self.assertEqual(failed, [])
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual([message.to for message in mail.outbox], [['a@example.com'], ['b@example.com']])
+
+    def test_a_bad_recipient_does_not_stop_the_rest(self):
+        connection = mail.get_connection()
+        real_send = connection.send_messages
+
+        def send(messages):
+            if messages[0].to == ['malo@example.com']:
+                raise smtplib.SMTPRecipientsRefused({'malo@example.com': (550, b'no')})
+            return real_send(messages)
+
+        payloads = _payloads('a@example.com', 'malo@example.com', 'b@example.com')
+        with mock.patch.object(connection, 'send_messages', side_effect=send), \
+                self.assertLogs('api.utils.email_utils', 'WARNING'):
+            failed = email_utils.send_batch(payloads, connection)
+
+        self.assertEqual(failed, [payloads[1]])
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_reconnects_once_when_the_server_drops_the_connection(self):
+        connection = mail.get_connection()
+        real_send = connection.send_messages
+        calls = []
+
+        def send(messages):
+            calls.append(messages[0].to)
+            if len(calls) == 1:
+                raise smtplib.SMTPServerDisconnected()
+            return real_send(messages)
+
+        with mock.patch.object(connection, 'send_messages', side_effect=send):
+            failed = email_utils.send_batch(_payloads('a@example.com'), connection)
+
+        self.assertEqual(failed, [])
+        self.assertEqual(calls, [['a@example.com'], ['a@example.com']])
+        self.assertEqual(len(mail.outbox), 1)
+
+
+@override_settings(EMAIL_MAX_RETRIES=2)
+class SendEmailBatchTaskTests(EagerCeleryMixin, TestCase):
+
+    def test_queue_emails_splits_into_batches(self):
+        emails = [f'u{i}@example.com' for i in range(5)]
+        self.assertEqual(email_utils.queue_emails(_payloads(*emails), batch_size=2), 3)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), emails)
+
+    def test_failed_messages_are_retried_in_a_new_batch(self):
+        payloads = _payloads('a@example.com', 'b@example.com')
+        attempts = []
+
+        def send_batch(batch):
+            attempts.append([(payload['to'][0], payload['attempt']) for payload in batch])
+            # b@ fails on the first attempt only.
+            return [payload for payload in batch if payload['to'] == ['b@example.com'] and not payload['attempt']]
+
+        with mock.patch.object(tasks, 'send_batch', side_effect=send_batch):
+            tasks.send_email_batch.delay(payloads)
+
+        self.assertEqual(attempts, [[('a@example.com', 0), ('b@example.com', 0)], [('b@example.com', 1)]])
+
+    def test_messages_are_dropped_after_the_last_retry(self):
+        with mock.patch.object(tasks, 'send_batch', side_effect=lambda batch: batch) as send_batch, \
+                mock.patch.object(tasks.send_email_batch, 'apply_async',
+                                  wraps=tasks.send_email_batch.apply_async) as retry:
+            tasks.send_email_batch.delay(_payloads('a@example.com'))
+
+        self.assertEqual(send_batch.call_count, 3)  # first try and two retries
+        self.assertEqual([call.args[0][0][0]['attempt'] for call in retry.call_args_list[1:]], [1, 2])
+        self.assertEqual([call.kwargs['countdown'] for call in retry.call_args_list[1:]], [60, 120])
@@ -0,0 +1,53 @@
+"""
+Tests for the password hashing pool's metrics (``api.utils.hashing_pool``).
+"""
+import threading
+
+from django.test import SimpleTestCase, override_settings
+
+from api.utils import metrics
+from api.utils.hashing_pool import HashingPoolSaturated, PasswordHashingPool
+
+
+@override_settings(METRICS={})
+class HashingPoolMetricsTests(SimpleTestCase):
+
+    def setUp(self):
+        for metric in (metrics.password_hash_wait, metrics.password_hash_duration, metrics.password_hash_rejections):
+            self.addCleanup(setattr, metric, 'values', metric.values)
+            metric.values = {}
+
+    def test_hashes_and_rejections_reach_the_registry(self):
+        pool = PasswordHashingPool(max_workers=1, max_queue=0, timeout=5)
+        started, release = threading.Event(), threading.Event()
+
+        def slow_hash():
+            started.set()
+            release.wait(5)
+            return 'hash'
+
+        caller = threading.Thread(target=pool.run, args=(slow_hash,))
+        caller.start()
+        started.wait(5)
+        with self.assertRaises(HashingPoolSaturated):
+            pool.run(str)
+        release.set()
+        caller.join()
+
+        self.assertEqual(pool.run(str, 'x'), 'x')
+
+        values = metrics.collect()
+        self.assertEqual(values['password_hash_rejections_total'], {('saturated',): 1})
+        self.assertEqual(sum(values['password_hash_wait_seconds'][()]['counts']), 2)
+        self.assertEqual(sum(values['password_hash_duration_seconds'][()]['counts']), 2)
+        self.assertIn('password_hash_rejections_total{reason="saturated"} 1', metrics.render())
+
+    def test_timeouts_are_counted_apart(self):
+        pool = PasswordHashingPool(max_workers=1, max_queue=0, timeout=0.05)
+        release = threading.Event()
+        with self.assertRaises(HashingPoolSaturated):
+            pool.run(release.wait, 5)
+        release.set()
+        pool._executor.shutdown(wait=True)
+
+        self.assertEqual(metrics.collect()['password_hash_rejections_total'], {('timeout',): 1})
@@ -0,0 +1,59 @@
+"""
+Tests for the Celery worker's scrape endpoint in ``api.utils.metrics``.
+"""
+import json
+import os
+import shutil
+import tempfile
+import urllib.error
+import urllib.request
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from api.utils import metrics
+
+
+class WorkerEndpointTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        override = override_settings(METRICS={'DIRECTORY': self.directory, 'TOKEN': 'secreto', 'WORKER_PORT': 9100})
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _serve(self):
+        server = metrics.start_http_server(0, address='127.0.0.1')
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f'http://127.0.0.1:{server.server_address[1]}/metrics'
+
+    def _get(self, url, token):
+        request = urllib.request.Request(url, headers={'Authorization': f'Bearer {token}'})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.read().decode()
+
+    def test_serves_the_sum_of_the_child_snapshots(self):
+        # Two prefork children that each ran one task.
+        for pid in (101, 102):
+            with open(os.path.join(self.directory, f'{pid}-x.json'), 'w') as f:
+                json.dump({'celery_tasks_total': [[['api.tasks.send_email_batch', 'SUCCESS'], 1]]}, f)
+
+        body = self._get(self._serve(), 'secreto')
+        self.assertIn('celery_tasks_total{task="api.tasks.send_email_batch",state="SUCCESS"} 2', body)
+
+    def test_requires_the_token(self):
+        with self.assertRaises(urllib.error.HTTPError) as error:
+            self._get(self._serve(), 'otro')
+        self.assertEqual(error.exception.code, 401)
+
+    def test_worker_start_clears_old_snapshots(self):
+        stale = os.path.join(self.directory, '1-old.json')
+        with open(stale, 'w') as f:
+            f.write('{}')
+
+        with mock.patch.object(metrics, 'start_http_server') as start:
+            metrics.start_worker_endpoint()
+        start.assert_called_once_with(9100)
+        self.assertFalse(os.path.exists(stale))
@@ -0,0 +1,68 @@
+"""
+N+1 and query-budget tests for the sales and cart endpoints.
+
+Each test seeds enough rows that a relation loaded once per row would
+repeat its query past ``NPLUSONE['THRESHOLD']``, then checks the request
+against the view's ``query_budget``.
+"""
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.authentication import get_tokens_for_user
+from api.models import Carrito, CarritoItem, CategoriaPaquete, Paquete, Usuario, Venta, VentaDetalle
+from api.utils.nplusone import assert_no_n_plus_one
+from api.views.carritos import CarritoViewSet
+from api.views.ventas import VentaViewSet
+
+ROWS = 6
+
+
+class QueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user('cliente@example.com', 'x')
+        categoria = CategoriaPaquete.objects.create(nombre='Pruebas de consultas', descripcion='-')
+        cls.paquetes = Paquete.objects.bulk_create([
+            Paquete(nombre=f'Paquete {i}', descripcion='-', precio=1000 + i, categoria=categoria)
+            for i in range(ROWS * 2)
+        ])
+        cls.ventas = []
+        for i in range(ROWS):
+            venta = Venta.objects.create(codigo=f'VTEST{i:04d}', usuario=cls.usuario)
+            for paquete in cls.paquetes[i * 2:i * 2 + 2]:
+                VentaDetalle.objects.create(venta=venta, paquete=paquete, cantidad=2)
+            cls.ventas.append(venta)
+
+        carrito, _ = Carrito.objects.get_or_create(usuario=cls.usuario)
+        for paquete in cls.paquetes[:ROWS]:
+            CarritoItem.objects.create(carrito=carrito, paquete=paquete)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(self.usuario)['access']}")
+
+    def _get(self, url, budget):
+        with CaptureQueriesContext(connection) as queries, assert_no_n_plus_one():
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), budget, '\n'.join(q['sql'] for q in queries))
+        return response
+
+    def test_venta_list(self):
+        response = self._get('/api/v1/ventas/', VentaViewSet.query_budget['list'])
+        self.assertEqual(response.data['count'], ROWS)
+
+    def test_mis_compras(self):
+        response = self._get('/api/v1/ventas/mis_compras/', VentaViewSet.query_budget['mis_compras'])
+        self.assertEqual(len(response.data['results']), ROWS)
+
+    def test_venta_retrieve(self):
+        response = self._get(f'/api/v1/ventas/{self.ventas[0].pk}/', VentaViewSet.query_budget['retrieve'])
+        self.assertEqual(len(response.data['items']), 2)
+
+    def test_mi_carrito(self):
+        response = self._get('/api/v1/carritos/mi_carrito/', CarritoViewSet.query_budget['mi_carrito'])
+        self.assertEqual(len(response.data['items']), ROWS)
@@ -0,0 +1,98 @@
+"""
+Tests for the cache-backed throttles in ``api.utils.throttling``.
+"""
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.utils import throttling
+
+
+class ConcurrentThrottle(throttling.ConcurrentRequestThrottle):
+    rate = '3/min'
+
+
+class SlidingWindowThrottle(throttling.UserSustainedRateThrottle):
+    rate = '20/min'
+
+
+def _request(user_id):
+    request = Request(APIRequestFactory().get('/api/v1/paquetes/'))
+    request.user = SimpleNamespace(pk=user_id, is_authenticated=True, is_staff=False)
+    return request
+
+
+def _run_concurrently(count, target):
+    """Call ``target`` from ``count`` threads released at the same time."""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(index):
+        barrier.wait()
+        results[index] = target()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class ConcurrentRequestThrottleTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user_id = uuid.uuid4()
+
+    def test_admits_at_most_the_limit_concurrently(self):
+        requests = [_request(self.user_id) for _ in range(12)]
+        lock = threading.Lock()
+        pending = list(requests)
+
+        def take():
+            with lock:
+                request = pending.pop()
+            return ConcurrentThrottle().allow_request(request, None)
+
+        admitted = _run_concurrently(len(requests), take)
+        self.assertEqual(sum(admitted), 3)
+
+    def test_release_frees_the_slot(self):
+        first, second, third, fourth = (_request(self.user_id) for _ in range(4))
+        for request in (first, second, third):
+            self.assertTrue(ConcurrentThrottle().allow_request(request, None))
+        self.assertFalse(ConcurrentThrottle().allow_request(fourth, None))
+
+        throttling.release_all(first._request)
+        self.assertTrue(ConcurrentThrottle().allow_request(fourth, None))
+
+    def test_leaked_slots_expire_after_the_period(self):
+        # Slots taken by a worker that died before releasing them.
+        for _ in range(3):
+            self.assertTrue(ConcurrentThrottle().allow_request(_request(self.user_id), None))
+        self.assertFalse(ConcurrentThrottle().allow_request(_request(self.user_id), None))
+
+        with mock.patch('time.time', return_value=time.time() + 61):
+            admitted = [ConcurrentThrottle().allow_request(_request(self.user_id), None) for _ in range(4)]
+        self.assertEqual(admitted, [True, True, True, False])
+
+
+class SlidingWindowRateThrottleTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user_id = uuid.uuid4()
+
+    def test_admits_exactly_the_limit_concurrently(self):
+        admitted = _run_concurrently(
+            50, lambda: SlidingWindowThrottle().allow_request(_request(self.user_id), None)
+        )
+        self.assertEqual(sum(admitted), 20)
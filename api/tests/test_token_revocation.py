@@ -0,0 +1,90 @@
+"""
+Tests for the revocation log replay in ``api.utils.token_revocation``.
+
+Each test gets a fresh Bloom filter, standing in for another worker that
+only learns about revocations through the shared log.
+"""
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from api.utils import token_revocation
+
+SETTINGS = {'SYNC_SECONDS': 0, 'SYNC_PAGE_SIZE': 3, 'GAP_TIMEOUT': 60}
+
+
+@override_settings(TOKEN_REVOCATION=SETTINGS)
+class RevocationLogReplayTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.exp = time.time() + 600
+        self._new_worker()
+
+    def _new_worker(self):
+        patcher = mock.patch.object(token_revocation, '_filter', token_revocation._RevocationFilter())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _revoke_elsewhere(self, jti):
+        token_revocation.revoke_jti(jti, self.exp)
+        # Drop it from this process's filter: only the log can bring it back.
+        self._new_worker()
+
+    def test_replays_revocations_from_other_workers_in_pages(self):
+        token_revocation._sync()  # nothing logged yet
+        jtis = [f'jti-{i}' for i in range(10)]
+        for jti in jtis:
+            self._revoke_elsewhere(jti)
+
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many:
+            self.assertTrue(all(token_revocation.is_revoked(jti) for jti in jtis))
+        self.assertTrue(all(len(call.args[0]) <= 3 for call in get_many.call_args_list))
+        self.assertEqual(token_revocation.stats()['seen_seq'], 10)
+
+    def test_entry_written_after_a_sync_is_picked_up_later(self):
+        self._revoke_elsewhere('before')
+        # A writer has taken seq 2 but not yet written its log entry.
+        seq = cache.incr(token_revocation._key('seq'))
+        self._revoke_elsewhere('after')
+
+        self.assertTrue(token_revocation.is_revoked('after'))
+        self.assertEqual(token_revocation.stats()['seen_seq'], seq - 1)
+
+        cache.set(token_revocation._key('late'), 1, 600)
+        cache.set(token_revocation._key('log', seq), 'late', 600)
+        self.assertTrue(token_revocation.is_revoked('late'))
+        self.assertEqual(token_revocation.stats()['seen_seq'], 3)
+
+    def test_missing_entry_is_given_up_after_the_timeout(self):
+        cache.add(token_revocation._key('seq'), 0, None)
+        cache.incr(token_revocation._key('seq'))  # never written
+        self._revoke_elsewhere('jti')
+        token_revocation._sync()
+
+        with mock.patch('time.monotonic', return_value=time.monotonic() + 61), \
+                self.assertLogs('api.token_revocation', 'WARNING'):
+            token_revocation._sync()
+        self.assertEqual(token_revocation.stats()['log_gaps'], 0)
+        self.assertEqual(token_revocation.stats()['gaps_dropped'], 1)
+        self.assertEqual(token_revocation.stats()['seen_seq'], 2)
+
+    def test_evicted_counter_is_recreated_and_the_entry_logged(self):
+        real_incr = cache.incr
+        calls = []
+
+        def incr_after_eviction(key, delta=1):
+            calls.append(key)
+            if len(calls) == 1:
+                cache.delete(key)
+                raise ValueError(key)
+            return real_incr(key, delta)
+
+        with mock.patch.object(cache, 'incr', side_effect=incr_after_eviction):
+            self.assertTrue(token_revocation.revoke_jti('jti', self.exp))
+        self.assertEqual(len(calls), 2)
+        self._new_worker()
+
+        self.assertTrue(token_revocation.is_revoked('jti'))
@@ -0,0 +1,50 @@
+"""
+Tests for email normalization in ``Usuario.save``.
+
+Legacy rows are written with ``update()``, which bypasses ``save``, like the
+mixed-case addresses stored before migration 0004.
+"""
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+
+from api.models import Usuario
+
+
+class EmailNormalizationTests(TestCase):
+
+    def _legacy(self, email):
+        usuario = Usuario.objects.create_user('legado@example.com', 'x')
+        Usuario.objects.filter(pk=usuario.pk).update(email=email)
+        return Usuario.objects.get(pk=usuario.pk)
+
+    def test_new_accounts_are_lowercased(self):
+        self.assertEqual(Usuario.objects.create_user(' Ana@Example.COM ', 'x').email, 'ana@example.com')
+
+    def test_legacy_email_is_lowercased_on_save(self):
+        usuario = self._legacy('Luis@Example.com')
+        usuario.save()
+        usuario.refresh_from_db()
+        self.assertEqual(usuario.email, 'luis@example.com')
+
+    def test_colliding_legacy_email_keeps_its_case(self):
+        Usuario.objects.create_user('ana@example.com', 'x')
+        usuario = self._legacy('Ana@Example.com')
+
+        usuario.nombre = 'Ana'
+        usuario.save()
+        usuario.refresh_from_db()
+        self.assertEqual(usuario.email, 'Ana@Example.com')
+        self.assertEqual(usuario.nombre, 'Ana')
+
+    def test_update_fields_without_email_leave_it_alone(self):
+        usuario = self._legacy('Luis@Example.com')
+        usuario.save(update_fields=['nombre'])
+        self.assertEqual(usuario.email, 'Luis@Example.com')
+
+    def test_changing_to_a_taken_address_still_fails(self):
+        Usuario.objects.create_user('ana@example.com', 'x')
+        usuario = self._legacy('Luis@Example.com')
+
+        usuario.email = 'ANA@example.com'
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            usuario.save()
@@ -0,0 +1,102 @@
+"""
+Tests for the streaming sales export (``api.services.ventas_export``) and ``/ventas/exportar/``.
+"""
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import CategoriaPaquete, Paquete, Usuario, Venta, VentaDetalle
+from api.services import ventas_export
+
+URL = '/api/v1/ventas/exportar/'
+
+
+def _fecha(dia):
+    return timezone.make_aware(datetime(2026, 3, dia, 12, 0))
+
+
+class VentasExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = Usuario.objects.create_user('staff@example.com', 'x', is_staff=True)
+        cls.cliente = Usuario.objects.create_user('cliente@example.com', 'x', nombre='Ana', apellido='Díaz')
+        categoria = CategoriaPaquete.objects.create(nombre='Exportación', descripcion='-')
+        paquete = Paquete.objects.create(nombre='Glaciares', descripcion='-', precio=1000, categoria=categoria)
+
+        cls.ventas = []
+        for dia, codigo, estado, lineas in ((10, 'VEX0001', 'completada', 2), (5, 'VEX0002', 'pendiente', 1)):
+            venta = Venta.objects.create(codigo=codigo, usuario=cls.cliente, estado=estado)
+            Venta.objects.filter(pk=venta.pk).update(fecha_venta=_fecha(dia))  # auto_now_add
+            for cantidad in range(1, lineas + 1):
+                VentaDetalle.objects.create(venta=venta, paquete=paquete, cantidad=cantidad,
+                                            precio_unitario=Decimal('1000'))
+            cls.ventas.append(venta)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def _get(self, **params):
+        response = self.client.get(URL, params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_has_one_row_per_line_ordered_by_sale_date(self):
+        response, body = self._get()
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="ventas_', response['Content-Disposition'])
+
+        rows = list(csv.DictReader(io.StringIO(body.decode('utf-8'))))
+        self.assertEqual(list(rows[0]), ventas_export.ENCABEZADOS)
+        self.assertEqual([row['venta_codigo'] for row in rows], ['VEX0002', 'VEX0001', 'VEX0001'])
+        self.assertEqual(rows[0]['usuario_apellido'], 'Díaz')
+        self.assertEqual(rows[0]['precio_unitario'], '1000.00')
+        self.assertEqual(rows[0]['fecha_venta'], _fecha(5).isoformat())
+        self.assertEqual(rows[0]['fecha_viaje'], '')
+
+    def test_ndjson_with_state_filter(self):
+        response, body = self._get(formato='ndjson', estado='completada')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+
+        rows = [json.loads(line) for line in body.decode('utf-8').splitlines()]
+        self.assertEqual([row['cantidad'] for row in rows], [1, 2])
+        self.assertEqual({row['estado'] for row in rows}, {'completada'})
+        self.assertIs(rows[0]['pago_confirmado'], False)
+        self.assertIsNone(rows[0]['fecha_viaje'])
+
+    def test_date_filters_include_whole_days(self):
+        _, body = self._get(formato='ndjson', desde='2026-03-05', hasta='2026-03-05')
+        self.assertEqual([json.loads(line)['venta_codigo'] for line in body.splitlines()], ['VEX0002'])
+
+        _, body = self._get(formato='ndjson', desde='2026-03-06')
+        self.assertEqual(len(body.splitlines()), 2)
+
+    def test_gzip_wraps_the_same_content(self):
+        _, plain = self._get()
+        response, body = self._get(gzip='1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertTrue(response['Content-Disposition'].endswith('.csv.gz"'))
+        self.assertEqual(gzip.decompress(body), plain)
+
+    def test_rows_are_yielded_in_chunks(self):
+        with mock.patch.object(ventas_export, 'ROWS_PER_CHUNK', 1):
+            chunks = list(ventas_export.iter_export('csv'))
+        self.assertEqual(len(chunks), 4)  # header and one per line
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({'formato': 'xlsx'}, {'estado': 'perdida'}, {'desde': '2026-02-30'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(URL, params).status_code, 400)
+
+    def test_only_staff_can_export(self):
+        self.client.force_authenticate(self.cliente)
+        self.assertEqual(self.client.get(URL).status_code, 403)
@@ -0,0 +1,53 @@
+"""
+Tests for the startup warmup (``api.utils.warmup``) as seen by ``/health/ready/``.
+
+``TransactionTestCase`` is used because ``warmup.run`` closes every
+connection when it finishes, which ``TestCase``'s atomic wrapper forbids.
+"""
+from unittest import mock
+
+from django.test import TransactionTestCase
+
+from api.utils import health, warmup
+
+
+class WarmupReadinessTests(TransactionTestCase):
+
+    def setUp(self):
+        self.addCleanup(warmup._state.update, status=None, tasks={}, seconds=None)
+
+    def _ready(self):
+        response = self.client.get('/health/ready/')
+        return response.status_code, response.json()['checks']['warmup']
+
+    def test_not_ready_while_running(self):
+        seen = []
+
+        def probe_during_warmup():
+            seen.append(self._ready())
+
+        with mock.patch.dict(warmup.TASKS, {'probe': probe_during_warmup}), self.assertLogs('api.warmup', 'INFO'):
+            report = warmup.run(['urls', 'probe', 'database'])
+
+        self.assertEqual(seen, [(503, {'status': 'pending', 'latency_ms': None, 'error': None})])
+        self.assertEqual(report['status'], 'ok')
+        self.assertEqual(list(report['tasks']), ['urls', 'probe', 'database'])
+        self.assertEqual(self._ready()[1]['status'], 'ok')
+
+    def test_failed_task_leaves_the_instance_ready_but_degraded(self):
+        def broken():
+            raise RuntimeError('sin datos')
+
+        with mock.patch.dict(warmup.TASKS, {'broken': broken}), self.assertLogs('api.warmup', 'ERROR'):
+            report = warmup.run(['broken', 'urls'])
+
+        self.assertEqual(report['tasks']['broken']['error'], 'RuntimeError: sin datos')
+        self.assertEqual(report['tasks']['urls']['status'], 'ok')
+        status_code, result = self._ready()
+        self.assertEqual(status_code, 200)
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(result['error'], 'tasks failed: broken')
+        self.assertEqual(health.check()['status'], 'degraded')
+
+    def test_skipped_when_never_run(self):
+        self.assertEqual(self._ready()[1]['status'], 'skipped')
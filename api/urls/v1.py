@@ -1,6 +1,7 @@
 """
 API v1 URL Configuration
 """
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from api.views.authentication import CustomTokenObtainPairView
@@ -15,7 +16,10 @@ from ..views import (
     paquetes as paquete_views,
     carritos as carrito_views,
     ventas as venta_views,
+    reportes as reporte_views,
+    diagnostico as diagnostico_views,
 )
+from ..views import async_catalog
 
 # Create a router for our API views
 router = DefaultRouter()
@@ -47,6 +51,16 @@ urlpatterns = [
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('token/verify/', TokenVerifyView.as_view(), name='token_verify'),
     
+    # Async catalog reads (ASGI profile); must come before the router URLs
+    *([
+        path('paquetes/', async_catalog.paquete_list, name='paquete-list-async'),
+        path('paquetes/destacados/', async_catalog.paquete_destacados, name='paquetes-destacados-async'),
+        path('paquetes/categorias/', async_catalog.paquete_categorias, name='paquetes-categorias-async'),
+        path('paquetes/<uuid:pk>/', async_catalog.paquete_detail, name='paquete-detail-async'),
+        path('categorias-paquetes/', async_catalog.categoria_list, name='categoria-paquete-list-async'),
+        path('carrito/mi-carrito/', async_catalog.mi_carrito, name='mi-carrito-async'),
+    ] if settings.ASYNC_CATALOG_VIEWS else []),
+    
     # Include router URLs
     path('', include(router.urls)),
     
@@ -76,4 +90,11 @@ urlpatterns = [
     path('mis-compras/', 
          venta_views.VentaViewSet.as_view({'get': 'mis_compras'}), 
          name='mis-compras'),
+    
+    # Report endpoints
+    path('reportes/pivot/', reporte_views.PivotView.as_view(), name='reportes-pivot'),
+    
+    # Diagnostic endpoints
+    path('diagnostico/cache/', diagnostico_views.CacheStatsView.as_view(), name='diagnostico-cache'),
+    path('diagnostico/consultas-lentas/', diagnostico_views.SlowQueriesView.as_view(), name='diagnostico-consultas-lentas'),
 ]
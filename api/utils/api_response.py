@@ -3,6 +3,16 @@ Utility functions for generating consistent API responses.
 """
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.views import exception_handler as drf_exception_handler
+
+from .hashing_pool import HashingPoolSaturated
+
+
+class ServiceUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Servicio no disponible temporalmente. Intente nuevamente en unos segundos.'
+    default_code = 'service_unavailable'
 
 
 def success_response(data=None, message="Success", status_code=status.HTTP_200_OK):
@@ -99,3 +109,25 @@ def validation_error_response(serializer):
         errors=serializer.errors,
         status_code=status.HTTP_400_BAD_REQUEST
     )
+
+
+def exception_handler(exc, context):
+    """
+    DRF exception handler that also maps service-layer errors to responses.
+    
+    ``HashingPoolSaturated`` (raised by the user model while hashing
+    passwords) becomes a 503 with a ``Retry-After`` header.
+    
+    Args:
+        exc: The raised exception.
+        context: The DRF handler context (view, request, ...).
+    
+    Returns:
+        Response: The error response, or None to let Django handle ``exc``.
+    """
+    if isinstance(exc, HashingPoolSaturated):
+        exc = ServiceUnavailable(str(exc), code='hashing_pool_saturated')
+    response = drf_exception_handler(exc, context)
+    if response is not None and response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE:
+        response['Retry-After'] = '1'
+    return response
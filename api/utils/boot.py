@@ -0,0 +1,262 @@
+"""
+Fingerprints and locking for the startup steps run by ``manage.py boot``.
+
+Each step is skipped when its inputs have not changed:
+
+* ``migrate``: the migration files on disk are compared with the rows of
+  ``django_migrations`` (one query; migration modules are not imported).
+  It only runs when a file has no row. The run happens under a lock,
+  a PostgreSQL advisory lock or a file lock on other databases, so when
+  several instances start together one migrates and the others wait and
+  then find nothing pending.
+* ``collectstatic``: the static sources found by the staticfiles finders
+  (paths and contents) and the storage backend are hashed. The hash is
+  stored next to the collected files in ``STATIC_ROOT``, so an image built
+  with the files already collected skips the step.
+* ``check``: the project's Python sources, the requirements files and the
+  settings in ``CHECK_SETTINGS`` are hashed. The hash is stored in
+  ``BOOT['STATE_DIR']``. The list only names settings the system checks
+  read that hold no credentials. Only the ``ENGINE`` of ``DATABASES`` and the
+  ``BACKEND`` of ``CACHES`` enter the hash, so database URLs, passwords and
+  keys never reach it. ``SECRET_KEY`` and ``SECRET_KEY_FALLBACKS`` enter
+  only through their shape: length, distinct characters, character classes
+  and the ``django-insecure-`` prefix. A rotation that could change the
+  weak-key warnings (security.W009, W025) therefore re-runs the check.
+"""
+import hashlib
+import importlib.util
+import os
+import re
+import time
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
+
+DEFAULTS = {
+    'STATE_DIR': None,
+    'LOCK_TIMEOUT': 600.0,
+}
+
+STATIC_STAMP = '.boot-fingerprint'
+
+# Arbitrary 64-bit key shared by every instance for pg_advisory_lock.
+_ADVISORY_LOCK_KEY = 0x6F6E6965745F6D67
+
+_ADDRESS = re.compile(r' at 0x[0-9a-f]+')
+
+# Settings read by Django's deploy checks and by DRF's and corsheaders'
+# checks. Never add one that can hold a credential (SECRET_KEY, SIMPLE_JWT,
+# EMAIL_HOST_PASSWORD...).
+CHECK_SETTINGS = (
+    'DEBUG', 'ALLOWED_HOSTS', 'INSTALLED_APPS', 'MIDDLEWARE', 'ROOT_URLCONF',
+    'TEMPLATES', 'AUTH_USER_MODEL', 'AUTH_PASSWORD_VALIDATORS', 'DEFAULT_AUTO_FIELD',
+    'DATABASE_ROUTERS', 'STORAGES', 'STATIC_URL', 'STATIC_ROOT', 'MEDIA_URL', 'MEDIA_ROOT',
+    'LANGUAGE_CODE', 'LANGUAGES', 'TIME_ZONE', 'USE_I18N', 'USE_TZ',
+    'CSRF_COOKIE_SECURE', 'CSRF_COOKIE_HTTPONLY', 'CSRF_TRUSTED_ORIGINS', 'CSRF_FAILURE_VIEW',
+    'SESSION_COOKIE_SECURE', 'SESSION_COOKIE_HTTPONLY', 'SESSION_ENGINE',
+    'SECURE_SSL_REDIRECT', 'SECURE_PROXY_SSL_HEADER', 'SECURE_HSTS_SECONDS',
+    'SECURE_HSTS_INCLUDE_SUBDOMAINS', 'SECURE_HSTS_PRELOAD', 'SECURE_CONTENT_TYPE_NOSNIFF',
+    'SECURE_REFERRER_POLICY', 'SECURE_CROSS_ORIGIN_OPENER_POLICY', 'X_FRAME_OPTIONS',
+    'REST_FRAMEWORK', 'CORS_ALLOW_ALL_ORIGINS', 'CORS_ALLOWED_ORIGINS',
+    'CORS_ALLOWED_ORIGIN_REGEXES', 'CORS_ALLOW_CREDENTIALS', 'CORS_ALLOW_METHODS',
+    'CORS_ALLOW_HEADERS', 'CORS_EXPOSE_HEADERS', 'CORS_URLS_REGEX',
+)
+
+
+def _get_setting(name):
+    return getattr(settings, 'BOOT', {}).get(name, DEFAULTS[name])
+
+
+def state_dir():
+    return _get_setting('STATE_DIR') or os.path.join(settings.BASE_DIR, '.boot')
+
+
+def _digest(parts):
+    sha = hashlib.sha256()
+    for part in parts:
+        sha.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        sha.update(b'\0')
+    return sha.hexdigest()
+
+
+def _file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def read_stamp(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def write_stamp(path, fingerprint):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(fingerprint)
+    os.replace(tmp_path, path)
+
+
+# Migrations
+
+def migration_files():
+    """
+    Return ``(app_label, name)`` of every migration file on disk.
+
+    Migration packages are located without importing their modules.
+    """
+    names = set()
+    for app_config in apps.get_app_configs():
+        module_name, _ = MigrationLoader.migrations_module(app_config.label)
+        try:
+            spec = module_name and importlib.util.find_spec(module_name)
+        except ImportError:
+            spec = None
+        if not spec or not spec.submodule_search_locations:
+            continue
+        for filename in os.listdir(spec.submodule_search_locations[0]):
+            if filename.endswith('.py') and filename != '__init__.py' and not filename.startswith(('_', '~')):
+                names.add((app_config.label, filename[:-3]))
+    return names
+
+
+def pending_migrations(using='default'):
+    """
+    Return the migration files with no row in ``django_migrations``.
+
+    Returns:
+        set: ``(app_label, name)`` pairs; every file if the table is missing
+    """
+    recorder = MigrationRecorder(connections[using])
+    applied = set(recorder.applied_migrations()) if recorder.has_table() else set()
+    return migration_files() - applied
+
+
+@contextmanager
+def migration_lock(using='default', timeout=None):
+    """
+    Hold the lock that serializes ``migrate`` across instances.
+
+    Uses a session advisory lock on PostgreSQL, taken on a dedicated
+    connection so that ``migrate`` can use its own, and an exclusive file
+    lock in ``STATE_DIR`` elsewhere.
+
+    Raises:
+        TimeoutError: If the lock is not acquired within ``timeout`` seconds
+    """
+    timeout = _get_setting('LOCK_TIMEOUT') if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+
+    if connections[using].vendor == 'postgresql':
+        connection = connections.create_connection(using)
+        try:
+            with connection.cursor() as cursor:
+                while True:
+                    cursor.execute('SELECT pg_try_advisory_lock(%s)', [_ADVISORY_LOCK_KEY])
+                    if cursor.fetchone()[0]:
+                        break
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(f'migration lock not acquired within {timeout:.0f} s')
+                    time.sleep(0.5)
+            try:
+                yield
+            finally:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_unlock(%s)', [_ADVISORY_LOCK_KEY])
+        finally:
+            connection.close()
+        return
+
+    import fcntl
+
+    os.makedirs(state_dir(), exist_ok=True)
+    with open(os.path.join(state_dir(), 'migrate.lock'), 'w') as f:
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f'migration lock not acquired within {timeout:.0f} s')
+                time.sleep(0.5)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# Static files
+
+def static_fingerprint():
+    """Hash of the storage backend and every file the staticfiles finders collect."""
+    from django.contrib.staticfiles.finders import get_finders
+
+    parts = [settings.STORAGES.get('staticfiles', {}).get('BACKEND', '')]
+    files = {}
+    for finder in get_finders():
+        for path, storage in finder.list(['CVS', '.*', '*~']):
+            # The first finder to list a path wins, as in collectstatic.
+            files.setdefault(path, storage.path(path))
+    for path in sorted(files):
+        parts.append(path)
+        parts.append(_file_digest(files[path]))
+    return _digest(parts)
+
+
+def static_stamp_path():
+    return os.path.join(settings.STATIC_ROOT, STATIC_STAMP)
+
+
+# System checks
+
+def _source_files():
+    base_dir = str(settings.BASE_DIR)
+    for top in ('api', 'config'):
+        for root, dirs, filenames in os.walk(os.path.join(base_dir, top)):
+            dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+            for filename in sorted(filenames):
+                if filename.endswith('.py'):
+                    yield os.path.join(root, filename)
+    for filename in sorted(os.listdir(base_dir)):
+        if filename.startswith('requirements') and filename.endswith('.txt'):
+            yield os.path.join(base_dir, filename)
+
+
+def _key_shape(key):
+    """What the secret key checks look at, without the key itself."""
+    key = str(key)
+    classes = sum(any(test(c) for c in key) for test in (str.islower, str.isupper, str.isdigit))
+    classes += any(not c.isalnum() for c in key)
+    return f'len={len(key)},distinct={len(set(key))},classes={classes},insecure={key.startswith("django-insecure-")}'
+
+
+def check_fingerprint():
+    """Hash of the project sources, requirements and ``CHECK_SETTINGS``."""
+    parts = []
+    for path in _source_files():
+        parts.append(os.path.relpath(path, settings.BASE_DIR))
+        parts.append(_file_digest(path))
+    for name in CHECK_SETTINGS:
+        # Object reprs carry memory addresses that change every run.
+        parts.append(f'{name}={_ADDRESS.sub("", repr(getattr(settings, name, None)))}')
+    parts.append(f'SECRET_KEY={_key_shape(settings.SECRET_KEY)}')
+    parts.append(f"SECRET_KEY_FALLBACKS={[_key_shape(key) for key in getattr(settings, 'SECRET_KEY_FALLBACKS', [])]}")
+    for alias, database in sorted(settings.DATABASES.items()):
+        parts.append(f"DATABASES.{alias}.ENGINE={database.get('ENGINE')}")
+    for alias, cache in sorted(settings.CACHES.items()):
+        parts.append(f"CACHES.{alias}.BACKEND={cache.get('BACKEND')}")
+    return _digest(parts)
+
+
+def check_stamp_path():
+    return os.path.join(state_dir(), 'check')
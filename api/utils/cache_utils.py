@@ -1,11 +1,16 @@
 """
 Utility functions for caching API responses.
 """
+from collections import OrderedDict
 from functools import wraps
 from django.core.cache import cache
 from django.utils.encoding import force_bytes
 from hashlib import md5
 import json
+import threading
+import time
+
+from . import instrumentation
 
 
 def cache_page(timeout):
@@ -219,3 +224,74 @@ def cache_result(timeout=60 * 15, key_func=None):
             return result
         return wrapper
     return decorator
+
+
+class LocalLRUCache:
+    """
+    Bounded, thread-safe, in-process LRU cache with optional per-entry expiry.
+    
+    Used in front of the shared cache for values read on almost every
+    request, where even a cache round trip is noticeable.
+    """
+    
+    def __init__(self, maxsize=1024, timeout=None, instrumented=True):
+        """
+        Args:
+            maxsize (int): Maximum number of entries kept
+            timeout (float, optional): Default lifetime of an entry in seconds
+            instrumented (bool): Count lookups as cache hits and misses in
+                the request metrics (``api.utils.instrumentation``)
+        """
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.instrumented = instrumented
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        """Return the value for ``key`` or ``default`` if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is not None and expires_at <= time.monotonic():
+                    del self._data[key]
+                    entry = None
+                else:
+                    self._data.move_to_end(key)
+        
+        if self.instrumented:
+            instrumentation.record_cache(entry is not None)
+        return value if entry is not None else default
+    
+    def set(self, key, value, timeout=None):
+        """
+        Store ``value`` under ``key``.
+        
+        Args:
+            key: The cache key
+            value: The value to store
+            timeout (float, optional): Lifetime in seconds, defaults to ``self.timeout``
+        """
+        timeout = self.timeout if timeout is None else timeout
+        expires_at = time.monotonic() + timeout if timeout is not None else None
+        
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def delete(self, key):
+        """Remove ``key`` if present."""
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self):
+        return len(self._data)
+
@@ -0,0 +1,73 @@
+"""
+Database connection reuse and its metrics.
+
+Production settings pick one of two modes (see ``DB_POOL`` in
+``config/settings.py``):
+
+* ``pool``: Django's built-in psycopg 3 pool (``OPTIONS['pool']``). Requests
+  borrow an open connection and give it back when they finish. The pool
+  reports its size, waiting requests and wait times.
+* ``persistent``: ``CONN_MAX_AGE`` keeps one connection per thread open
+  across requests, and ``CONN_HEALTH_CHECKS`` replaces it if the server
+  dropped it.
+
+With either mode a worker opens roughly as many connections as it has
+threads, rather than one per request. ``connections_opened`` in ``stats``
+counts new connections per alias, so a value that keeps growing means
+connection setup is still part of request latency.
+
+``connection_created`` is sent each time Django sets up a connection it was
+handed, which with the pool is every borrow. For pooled aliases
+``connections_opened`` is therefore the pool's own ``connections_num``, and
+the signal count is reported as ``connections_borrowed``.
+"""
+import threading
+
+from django.db import connections
+
+_lock = threading.Lock()
+_opened = {}
+
+
+def record_connection(connection):
+    """Count a connection set up by Django (``connection_created`` receiver)."""
+    with _lock:
+        _opened[connection.alias] = _opened.get(connection.alias, 0) + 1
+
+
+def _mode(settings_dict):
+    if settings_dict.get('OPTIONS', {}).get('pool'):
+        return 'pool'
+    if settings_dict.get('CONN_MAX_AGE'):
+        return 'persistent'
+    return 'per_request'
+
+
+def stats():
+    """
+    Return the connection mode, settings and counters of every alias.
+
+    Returns:
+        dict: One entry per database alias. Pooled aliases include the
+        psycopg pool's own counters under ``pool``.
+    """
+    with _lock:
+        opened = dict(_opened)
+
+    data = {}
+    for alias in connections:
+        settings_dict = connections.settings[alias]
+        entry = {
+            'vendor': settings_dict['ENGINE'].rsplit('.', 1)[-1],
+            'mode': _mode(settings_dict),
+            'conn_max_age': settings_dict.get('CONN_MAX_AGE'),
+            'conn_health_checks': settings_dict.get('CONN_HEALTH_CHECKS', False),
+            'connections_opened': opened.get(alias, 0),
+        }
+        if entry['mode'] == 'pool':
+            pool = getattr(connections[alias], 'pool', None)
+            entry['pool'] = pool.get_stats() if pool is not None else None
+            entry['connections_opened'] = (entry['pool'] or {}).get('connections_num', 0)
+            entry['connections_borrowed'] = opened.get(alias, 0)
+        data[alias] = entry
+    return data
@@ -0,0 +1,108 @@
+"""
+Read-replica routing.
+
+Replicas are configured with ``DATABASE_REPLICA_URLS`` and become the
+``replica_1``, ``replica_2``, ... aliases. Queries go to a replica only
+while the request-scoped flag set by ``use_replicas`` is on. ``BaseViewSet``
+turns it on for the actions in ``REPLICA_READ_ACTIONS``. Everything else
+stays on ``default``:
+
+* writes (``db_for_write`` is always ``default``);
+* reads inside ``transaction.atomic``, so a transaction sees its own rows;
+* reads by a user during ``DATABASE_REPLICA_ROUTING['STICKY_SECONDS']``
+  after that user made a write. This hides replication lag from the user
+  who caused it (``ReplicaStickinessMiddleware`` records the writes).
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+DEFAULTS = {
+    'STICKY_SECONDS': 5,
+}
+
+REPLICA_READ_ACTIONS = frozenset({'list', 'retrieve', 'destacados', 'categorias', 'mis_compras'})
+
+_read_from_replica = contextvars.ContextVar('read_from_replica', default=False)
+
+
+def _get_setting(name):
+    return getattr(settings, 'DATABASE_REPLICA_ROUTING', {}).get(name, DEFAULTS[name])
+
+
+def replica_aliases():
+    """Return the configured replica aliases."""
+    return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+
+def _sticky_key(user_id):
+    return f'db:sticky:{user_id}'
+
+
+def mark_sticky(user_id):
+    """Keep ``user_id``'s reads on the primary for ``STICKY_SECONDS``."""
+    cache.set(_sticky_key(user_id), True, _get_setting('STICKY_SECONDS'))
+
+
+def is_sticky(user_id):
+    return user_id is not None and cache.get(_sticky_key(user_id), False)
+
+
+def can_use_replicas(user=None):
+    """
+    Whether reads for ``user`` may go to a replica.
+
+    False when no replica is configured or the user wrote recently.
+    """
+    if not replica_aliases():
+        return False
+    user_id = getattr(user, 'pk', None) if getattr(user, 'is_authenticated', False) else None
+    return not is_sticky(user_id)
+
+
+def enable_replicas():
+    """Turn the replica flag on; returns a token for ``reset_replicas``."""
+    return _read_from_replica.set(True)
+
+
+def reset_replicas(token):
+    _read_from_replica.reset(token)
+
+
+@contextmanager
+def use_replicas(enabled=True):
+    """Route reads in the block to replicas (when ``enabled``)."""
+    token = _read_from_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+class ReadReplicaRouter:
+    """
+    Send flagged reads to a random replica and everything else to ``default``.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _read_from_replica.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        aliases = replica_aliases()
+        return random.choice(aliases) if aliases else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication.
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,153 @@
+"""
+Email template rendering with compiled-template reuse.
+
+Every email has an HTML template ``emails/<name>.html`` and, ideally, a
+plain text one ``emails/<name>.txt``. Compiled templates are kept per
+process, so rendering never goes back to the loaders. When a template has no
+text version, the text is derived from the HTML with ``strip_tags``. That
+result is cached by HTML digest, so identical bodies are only stripped once.
+
+``render_batch`` renders many recipients against one compiled template
+and one ``Context``, pushing each recipient's variables on top of the
+shared ones. Render time and output size are tracked per template (see
+``stats``).
+"""
+import hashlib
+import threading
+import time
+
+from django.template import Context, TemplateDoesNotExist
+from django.template.loader import get_template
+from django.utils.html import strip_tags
+
+from .cache_utils import LocalLRUCache
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+_MISSING = object()
+
+_stripped = LocalLRUCache(maxsize=256)
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def get_compiled(template_name, extension='html'):
+    """
+    Return the compiled ``emails/<template_name>.<extension>`` template.
+
+    Args:
+        template_name (str): Template name without extension
+        extension (str): ``html`` or ``txt``
+
+    Returns:
+        django.template.base.Template: The compiled template, or None when
+        a ``txt`` template does not exist
+
+    Raises:
+        TemplateDoesNotExist: If the HTML template does not exist
+    """
+    key = (template_name, extension)
+    template = _compiled.get(key)
+    if template is None:
+        try:
+            template = get_template(f'emails/{template_name}.{extension}').template
+        except TemplateDoesNotExist:
+            if extension == 'html':
+                raise
+            template = _MISSING
+        with _compiled_lock:
+            _compiled[key] = template
+    return None if template is _MISSING else template
+
+
+def clear():
+    """Drop compiled templates and cached text versions, e.g. after editing templates."""
+    with _compiled_lock:
+        _compiled.clear()
+    _stripped.clear()
+
+
+def _text_from_html(html):
+    key = hashlib.sha1(html.encode('utf-8')).digest()
+    text = _stripped.get(key)
+    if text is None:
+        text = strip_tags(html)
+        _stripped.set(key, text)
+    return text
+
+
+def _record(template_name, seconds, html, text, count=1):
+    with _stats_lock:
+        entry = _stats.setdefault(template_name, {
+            'renders': 0, 'seconds': 0.0, 'html_bytes': 0, 'text_bytes': 0,
+        })
+        entry['renders'] += count
+        entry['seconds'] += seconds
+        entry['html_bytes'] += html
+        entry['text_bytes'] += text
+
+
+def render_batch(template_name, contexts, shared_context=None):
+    """
+    Render HTML and text versions for many recipients.
+
+    Args:
+        template_name (str): Template name under ``emails/`` without extension
+        contexts (iterable): One dict of variables per recipient
+        shared_context (dict, optional): Variables common to every recipient
+
+    Returns:
+        list: ``(html, text)`` tuples in the order of ``contexts``
+    """
+    html_template = get_compiled(template_name, 'html')
+    text_template = get_compiled(template_name, 'txt')
+
+    context = Context(shared_context or {})
+    results = []
+    html_bytes = text_bytes = 0
+
+    started = time.perf_counter()
+    for variables in contexts:
+        with context.push(variables):
+            html = html_template.render(context)
+            text = text_template.render(context) if text_template is not None else _text_from_html(html)
+        html_bytes += len(html)
+        text_bytes += len(text)
+        results.append((html, text))
+
+    if results:
+        _record(template_name, time.perf_counter() - started, html_bytes, text_bytes, len(results))
+    return results
+
+
+def render(template_name, context=None):
+    """
+    Render the HTML and text versions of one email.
+
+    Returns:
+        tuple: ``(html, text)``
+    """
+    return render_batch(template_name, [context or {}])[0]
+
+
+def stats():
+    """
+    Return render counters per template for this process.
+
+    Returns:
+        dict: Renders, average render time and average output sizes per template
+    """
+    with _stats_lock:
+        data = {name: dict(entry) for name, entry in _stats.items()}
+
+    for entry in data.values():
+        renders = entry.pop('renders')
+        seconds = entry.pop('seconds')
+        entry.update({
+            'renders': renders,
+            'avg_ms': round(seconds / renders * 1000, 4),
+            'avg_html_bytes': entry.pop('html_bytes') // renders,
+            'avg_text_bytes': entry.pop('text_bytes') // renders,
+        })
+    return data
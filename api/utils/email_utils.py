@@ -1,11 +1,167 @@
 """
 Utility functions for sending emails.
+
+Single emails go through ``send_email``. For many recipients, build
+serializable payloads with ``render_email`` (or ``render_emails``, which
+renders every recipient against one compiled template) and hand them to
+``send_batch`` (one SMTP connection for the whole batch) or to
+``queue_emails``, which splits them into Celery ``send_email_batch`` tasks
+that retry failed messages individually with backoff.
 """
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+import logging
+import smtplib
+
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.conf import settings
 
+from . import email_templates
+
+logger = logging.getLogger(__name__)
+
+
+def site_context():
+    """Template variables shared by every email."""
+    return {
+        'site_name': getattr(settings, 'SITE_NAME', 'ONIET'),
+        'contact_email': getattr(settings, 'CONTACT_EMAIL', 'contacto@oniet.com'),
+    }
+
+
+def _payload(subject, to_email, from_email, body, html):
+    return {
+        'subject': subject,
+        'to': to_email if isinstance(to_email, list) else [to_email],
+        'from_email': from_email or settings.DEFAULT_FROM_EMAIL,
+        'body': body or '',
+        'html': html,
+        'attempt': 0,
+    }
+
+
+def render_email(subject, to_email, template_name=None, context=None, from_email=None, body=None):
+    """
+    Render an email into a JSON-serializable payload.
+    
+    Args:
+        subject (str): Email subject
+        to_email (str or list): Recipient email(s)
+        template_name (str, optional): Template under ``emails/`` (without extension)
+        context (dict, optional): Context variables for the template
+        from_email (str, optional): Sender email. Defaults to settings.DEFAULT_FROM_EMAIL.
+        body (str, optional): Plain text body, used instead of a template
+    
+    Returns:
+        dict: Payload accepted by ``send_batch`` and ``queue_emails``
+    """
+    html_content = None
+    if template_name is not None:
+        html_content, body = email_templates.render(template_name, context)
+    
+    return _payload(subject, to_email, from_email, body, html_content)
+
+
+def render_emails(template_name, messages, shared_context=None, from_email=None):
+    """
+    Render many emails against one compiled template.
+    
+    Args:
+        template_name (str): Template under ``emails/`` (without extension)
+        messages (iterable): ``(subject, to_email, context)`` tuples
+        shared_context (dict, optional): Variables common to every message
+        from_email (str, optional): Sender email. Defaults to settings.DEFAULT_FROM_EMAIL.
+    
+    Returns:
+        list: Payloads accepted by ``send_batch`` and ``queue_emails``
+    """
+    messages = list(messages)
+    rendered = email_templates.render_batch(
+        template_name, (context for _, _, context in messages), shared_context
+    )
+    return [
+        _payload(subject, to_email, from_email, text, html)
+        for (subject, to_email, _), (html, text) in zip(messages, rendered)
+    ]
+
+
+def message_from_payload(payload, connection=None):
+    """Build an ``EmailMultiAlternatives`` from a ``render_email`` payload."""
+    email = EmailMultiAlternatives(
+        subject=payload['subject'],
+        body=payload['body'],
+        from_email=payload['from_email'],
+        to=payload['to'],
+        connection=connection,
+    )
+    if payload.get('html'):
+        email.attach_alternative(payload['html'], "text/html")
+    return email
+
+
+def send_batch(payloads, connection=None):
+    """
+    Send many emails over a single backend connection.
+    
+    Each message is sent on its own so one bad recipient does not abort the
+    rest; if the server drops the connection it is reopened once per message.
+    
+    Args:
+        payloads (list): Payloads from ``render_email``
+        connection (optional): An open or closed email backend; defaults to ``get_connection()``
+    
+    Returns:
+        list: The payloads that could not be sent
+    """
+    if not payloads:
+        return []
+    
+    connection = connection or get_connection()
+    failed = []
+    
+    with connection:
+        for payload in payloads:
+            message = message_from_payload(payload, connection=connection)
+            try:
+                try:
+                    connection.send_messages([message])
+                except smtplib.SMTPServerDisconnected:
+                    connection.close()
+                    connection.open()
+                    connection.send_messages([message])
+            except Exception as e:
+                logger.warning("Error sending email to %s: %s", ', '.join(payload['to']), e)
+                failed.append(payload)
+    
+    return failed
+
+
+def queue_emails(payloads, batch_size=None):
+    """
+    Queue payloads for background delivery in batches.
+    
+    Args:
+        payloads (iterable): Payloads from ``render_email``
+        batch_size (int, optional): Messages per task. Defaults to settings.EMAIL_BATCH_SIZE.
+    
+    Returns:
+        int: Number of batches queued
+    """
+    from ..tasks import send_email_batch
+    
+    batch_size = batch_size or getattr(settings, 'EMAIL_BATCH_SIZE', 100)
+    batches = 0
+    batch = []
+    for payload in payloads:
+        batch.append(payload)
+        if len(batch) >= batch_size:
+            send_email_batch.delay(batch)
+            batches += 1
+            batch = []
+    if batch:
+        send_email_batch.delay(batch)
+        batches += 1
+    return batches
+
+
 def send_email(subject, to_email, template_name, context=None, from_email=None, **kwargs):
     """
     Send an email using a template.
@@ -27,11 +183,8 @@ def send_email(subject, to_email, template_name, context=None, from_email=None,
     if from_email is None:
         from_email = settings.DEFAULT_FROM_EMAIL
     
-    # Render HTML content
-    html_content = render_to_string(f'emails/{template_name}.html', context)
-    
-    # Create text version from HTML
-    text_content = strip_tags(html_content)
+    # Render HTML content and its text version
+    html_content, text_content = email_templates.render(template_name, context)
     
     # Create the email
     email = EmailMultiAlternatives(
@@ -67,8 +220,7 @@ def send_welcome_email(user):
     """
     context = {
         'user': user,
-        'site_name': getattr(settings, 'SITE_NAME', 'ONIET'),
-        'contact_email': getattr(settings, 'CONTACT_EMAIL', 'contacto@oniet.com'),
+        **site_context(),
     }
     
     subject = f"¡Bienvenido a {context['site_name']}!"
@@ -95,8 +247,7 @@ def send_password_reset_email(user, reset_url):
     context = {
         'user': user,
         'reset_url': reset_url,
-        'site_name': getattr(settings, 'SITE_NAME', 'ONIET'),
-        'contact_email': getattr(settings, 'CONTACT_EMAIL', 'contacto@oniet.com'),
+        **site_context(),
     }
     
     subject = f"Restablecer tu contraseña en {context['site_name']}"
@@ -122,8 +273,7 @@ def send_order_confirmation_email(order):
     context = {
         'order': order,
         'user': order.usuario,
-        'site_name': getattr(settings, 'SITE_NAME', 'ONIET'),
-        'contact_email': getattr(settings, 'CONTACT_EMAIL', 'contacto@oniet.com'),
+        **site_context(),
     }
     
     subject = f"Confirmación de tu pedido #{order.codigo}"
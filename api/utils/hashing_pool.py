@@ -0,0 +1,211 @@
+"""
+Bounded worker pool for password hashing.
+
+PBKDF2 is deliberately slow. Running it inline lets a burst of logins or
+registrations occupy every request thread, starving cheap requests such as
+catalog reads. ``Usuario.set_password`` and ``Usuario.check_password`` hand
+the hasher to this pool instead:
+
+* at most ``PASSWORD_HASHING_POOL['MAX_WORKERS']`` hashes run at once;
+* at most ``MAX_QUEUE`` more may wait for a worker;
+* anything beyond that fails fast with ``HashingPoolSaturated`` instead of
+  queueing behind the burst. The API's exception handler turns it into an
+  HTTP 503 (see ``api.utils.api_response.exception_handler``).
+
+A job keeps its slot until it finishes, even after its caller gave up
+waiting, so abandoned hashes still count against the limit.
+
+Wait and run times and rejections are also recorded in ``api.utils.metrics``
+(``password_hash_*``), so they reach ``/metrics`` summed over every worker;
+``stats`` only describes the process that answers.
+
+A thread pool is enough because ``hashlib.pbkdf2_hmac`` releases the GIL
+while it runs; it only helps when the server itself runs several threads
+per process (gunicorn ``gthread`` workers, see ``start.sh``).
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+
+from . import metrics
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MAX_WORKERS': 2,
+    'MAX_QUEUE': 8,
+    'TIMEOUT': 10,
+}
+
+
+def _get_setting(name):
+    return getattr(settings, 'PASSWORD_HASHING_POOL', {}).get(name, DEFAULTS[name])
+
+
+class HashingPoolSaturated(Exception):
+    """No slot was free, or the hash did not finish within the timeout."""
+
+    def __init__(self, message='El servidor está procesando demasiados inicios de sesión. '
+                               'Intente nuevamente en unos segundos.'):
+        super().__init__(message)
+
+
+class _Timing:
+    """Count, total and max of a duration, in seconds."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 3) if self.count else None,
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+class PasswordHashingPool:
+    """
+    Thread pool with a hard limit on running plus queued jobs.
+
+    Args:
+        max_workers (int): Hashes computed concurrently
+        max_queue (int): Jobs allowed to wait for a free worker
+        timeout (float): Seconds a caller waits for its result
+    """
+
+    def __init__(self, max_workers, max_queue, timeout):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hasher')
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._wait = _Timing()
+        self._run = _Timing()
+
+    def _call(self, submitted_at, fn, args, kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self._wait.add(started - submitted_at)
+                self._run.add(finished - started)
+            metrics.password_hash_wait.observe(started - submitted_at)
+            metrics.password_hash_duration.observe(finished - started)
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Run ``fn`` on the pool and wait for its result.
+
+        Raises:
+            HashingPoolSaturated: If no slot is free or the result does not
+                arrive within the timeout
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            metrics.password_hash_rejections.inc(reason='saturated')
+            raise HashingPoolSaturated()
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(self._call, time.perf_counter(), fn, args, kwargs)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is freed when the job ends, not when the caller stops
+        # waiting: a job that already started cannot be cancelled.
+        future.add_done_callback(self._release)
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self._timeouts += 1
+            metrics.password_hash_rejections.inc(reason='timeout')
+            raise HashingPoolSaturated()
+
+    def _release(self, future=None):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'in_flight': self._in_flight,
+                'rejected': self._rejected,
+                'timeouts': self._timeouts,
+                'wait': self._wait.as_dict(),
+                'run': self._run.as_dict(),
+            }
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Return this process's pool, creating it on first use.
+
+    The pool is keyed by PID so a pool created before gunicorn forks
+    (``--preload``) is never shared with the workers.
+    """
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = PasswordHashingPool(
+                    max_workers=_get_setting('MAX_WORKERS'),
+                    max_queue=_get_setting('MAX_QUEUE'),
+                    timeout=_get_setting('TIMEOUT'),
+                )
+                _pool_pid = pid
+    return _pool
+
+
+def run(fn, *args, **kwargs):
+    """
+    Run a password hashing function through the pool.
+
+    Runs inline when ``PASSWORD_HASHING_POOL['ENABLED']`` is False or when
+    already called from a pool thread.
+    """
+    if not _get_setting('ENABLED') or threading.current_thread().name.startswith('password-hasher'):
+        return fn(*args, **kwargs)
+    return get_pool().run(fn, *args, **kwargs)
+
+
+def stats():
+    """
+    Return the pool's wait time, run time and rejection counters.
+
+    Returns:
+        dict: Empty if the pool has not been used in this process
+    """
+    if _pool is None or _pool_pid != os.getpid():
+        return {}
+    return _pool.stats()
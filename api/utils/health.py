@@ -0,0 +1,186 @@
+"""
+Readiness probes for the load balancer.
+
+``check`` runs one probe per dependency: each database alias, the cache,
+the default file storage and the Celery broker. The probes run in parallel
+and each is given ``HEALTH_CHECKS['TIMEOUT']`` seconds. A probe that takes
+longer is reported as ``timeout`` even though its thread may still be
+running. Such a probe is not started again until that run finishes, so a
+hung dependency holds at most one executor thread. The clients bound their
+own waits too: the database probe sets a statement timeout on PostgreSQL,
+the broker probe a connect timeout, and settings give PostgreSQL and Redis
+connect and socket timeouts. Each probe reports its latency and one of these statuses: ``ok``,
+``slow`` (over ``SLOW_MS``), ``error``, ``timeout`` or ``skipped``.
+
+The instance is ready while every probe listed in ``CRITICAL`` is ``ok`` or
+``slow`` and the cache warmup (``api.utils.warmup``) is not running. A
+failing non-critical probe or warmup task only marks it ``degraded``. Results
+are cached in-process for ``TTL`` seconds, and concurrent callers share one
+run, so frequent polling adds no load to the dependencies.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+
+from . import warmup
+
+DEFAULTS = {
+    'TIMEOUT': 2.0,
+    'SLOW_MS': 500,
+    'TTL': 5.0,
+    'CRITICAL': ('database', 'cache'),
+}
+
+
+def _get_setting(name):
+    return getattr(settings, 'HEALTH_CHECKS', {}).get(name, DEFAULTS[name])
+
+
+def _probe_database(alias):
+    def probe():
+        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+            if connections[alias].vendor == 'postgresql':
+                # Local to this transaction, so a pooled connection comes back unchanged.
+                cursor.execute("SELECT set_config('statement_timeout', %s, true)",
+                               [str(int(_get_setting('TIMEOUT') * 1000))])
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        # Probe threads are not request threads; don't leave connections behind.
+        connections[alias].close()
+    return probe
+
+
+def _probe_cache():
+    key = f'health:probe:{uuid.uuid4().hex}'
+    cache.set(key, 1, 10)
+    if cache.get(key) != 1:
+        raise RuntimeError('cache read did not return the value written')
+    cache.delete(key)
+
+
+def _probe_storage():
+    default_storage.exists('health-probe')
+
+
+def _probe_broker():
+    from kombu import Connection
+
+    with Connection(settings.CELERY_BROKER_URL, connect_timeout=_get_setting('TIMEOUT')) as connection:
+        connection.ensure_connection(max_retries=1)
+
+
+def _warmup_result():
+    report = warmup.state()
+    status = report['status']
+    failed = [name for name, task in report['tasks'].items() if task['status'] == 'error']
+    return {
+        'status': 'skipped' if status is None else ('pending' if status == 'running' else status),
+        'latency_ms': round(report['seconds'] * 1000, 1) if report['seconds'] is not None else None,
+        'error': f"tasks failed: {', '.join(failed)}" if failed else None,
+    }
+
+
+def _probes():
+    probes = {}
+    for alias in connections:
+        name = 'database' if alias == 'default' else f'database:{alias}'
+        probes[name] = _probe_database(alias)
+    probes['cache'] = _probe_cache
+    probes['storage'] = _probe_storage
+    probes['broker'] = _probe_broker if getattr(settings, 'CELERY_BROKER_URL', None) else None
+    return probes
+
+
+def _timed(probe):
+    started = time.perf_counter()
+    try:
+        probe()
+    except Exception as exc:
+        return 'error', time.perf_counter() - started, f'{type(exc).__name__}: {exc}'
+    return 'ok', time.perf_counter() - started, None
+
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='health-probe')
+
+# Probe name to its latest future; only touched by run_probes under check()'s lock.
+_in_flight = {}
+
+
+def run_probes():
+    """
+    Run every probe once, in parallel, within the timeout.
+
+    Returns:
+        dict: Probe name to ``{'status', 'latency_ms', 'error'}``
+    """
+    timeout = _get_setting('TIMEOUT')
+    slow = _get_setting('SLOW_MS') / 1000
+
+    futures = {}
+    stuck = set()
+    results = {}
+    for name, probe in _probes().items():
+        if probe is None:
+            results[name] = {'status': 'skipped', 'latency_ms': None, 'error': None}
+        elif name in _in_flight and not _in_flight[name].done():
+            # Wait for the earlier run again instead of queueing another behind it.
+            futures[name] = _in_flight[name]
+            stuck.add(name)
+        else:
+            futures[name] = _in_flight[name] = _executor.submit(_timed, probe)
+
+    wait(futures.values(), timeout=timeout)
+    for name, future in futures.items():
+        if not future.done():
+            error = 'previous probe still running' if name in stuck else None
+            results[name] = {'status': 'timeout', 'latency_ms': round(timeout * 1000, 1), 'error': error}
+            continue
+        status, seconds, error = future.result()
+        if status == 'ok' and seconds > slow:
+            status = 'slow'
+        results[name] = {'status': status, 'latency_ms': round(seconds * 1000, 1), 'error': error}
+    return results
+
+
+_lock = threading.Lock()
+_cached = None
+_cached_at = 0.0
+
+
+def check(force=False):
+    """
+    Return the readiness report, from the cache if younger than ``TTL``.
+
+    Returns:
+        dict: ``ready`` (bool), ``status`` (``ok``, ``degraded`` or
+        ``unavailable``), ``checks`` and ``age_seconds``
+    """
+    global _cached, _cached_at
+
+    with _lock:
+        if force or _cached is None or time.monotonic() - _cached_at >= _get_setting('TTL'):
+            _cached = run_probes()
+            _cached_at = time.monotonic()
+        checks = dict(_cached)
+        age = time.monotonic() - _cached_at
+
+    # Warmup state is in-process and cheap, so it is never served stale.
+    checks['warmup'] = _warmup_result()
+    critical = set(_get_setting('CRITICAL'))
+    ready = checks['warmup']['status'] != 'pending' and all(
+        result['status'] in ('ok', 'slow')
+        for name, result in checks.items() if name in critical
+    )
+    healthy = all(result['status'] in ('ok', 'skipped') for result in checks.values())
+    return {
+        'ready': ready,
+        'status': 'ok' if ready and healthy else ('degraded' if ready else 'unavailable'),
+        'checks': checks,
+        'age_seconds': round(age, 2),
+    }
@@ -0,0 +1,246 @@
+"""
+Per-request performance instrumentation.
+
+``RequestInstrumentationMiddleware`` starts a ``RequestMetrics`` for each
+request and keeps it in a contextvar, so code anywhere in the request can
+add to it:
+
+* database time and query count, from an ``execute_wrapper`` installed on
+  every connection when it opens (``install``), which charges each query
+  to the request found in the contextvar. asgiref copies the context into
+  ``sync_to_async`` threads, so the queries of async views count too;
+* cache hits and misses, reported by ``LocalLRUCache`` and ``user_cache``
+  through ``record_cache``;
+* serializer time, measured around ``to_representation`` of the serializers
+  returned by ``BaseViewSet.get_serializer`` (see ``timed_serializer``).
+
+When the response is ready the middleware adds a ``Server-Timing`` header
+(``INSTRUMENTATION['SERVER_TIMING']``: True for every response, ``'staff'``
+for staff users only, False never) and logs one JSON line to the ``api.performance`` logger
+at ``INSTRUMENTATION['REQUEST_LOG_LEVEL']``. That is DEBUG by default, below
+the logger's INFO, so the line costs nothing unless the level is raised or
+the logger lowered (``PERFORMANCE_LOG_LEVEL=DEBUG``). It also compares
+the query count with the view's ``query_budget``. Going over the budget is
+logged as a warning. With ``INSTRUMENTATION['FLAG_BUDGETS']`` (on with
+DEBUG) the response also gets an ``X-Query-Budget-Exceeded`` header. With
+``STRICT_QUERY_BUDGETS`` the request fails with ``QueryBudgetExceeded``.
+"""
+import contextvars
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger('api.performance')
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SERVER_TIMING': 'staff',
+    'LOG_REQUESTS': True,
+    'REQUEST_LOG_LEVEL': 'DEBUG',
+    'FLAG_BUDGETS': False,
+    'STRICT_QUERY_BUDGETS': False,
+}
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+def _get_setting(name):
+    return getattr(settings, 'INSTRUMENTATION', {}).get(name, DEFAULTS[name])
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view ran more queries than its ``query_budget`` allows."""
+
+
+class RequestMetrics:
+    """Timings and counters collected while serving one request."""
+
+    __slots__ = (
+        'started', 'wall', 'db_time', 'queries', 'cache_hits', 'cache_misses',
+        'serializer_time', 'view', 'action', 'query_budget', '_serializer_depth',
+    )
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.wall = None
+        self.db_time = 0.0
+        self.queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.serializer_time = 0.0
+        self.view = None
+        self.action = None
+        self.query_budget = None
+        self._serializer_depth = 0
+
+    @property
+    def over_budget(self):
+        return self.query_budget is not None and self.queries > self.query_budget
+
+    def as_dict(self):
+        return {
+            'view': self.view,
+            'action': self.action,
+            'wall_ms': round(self.wall * 1000, 2) if self.wall is not None else None,
+            'db_ms': round(self.db_time * 1000, 2),
+            'queries': self.queries,
+            'query_budget': self.query_budget,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'serializer_ms': round(self.serializer_time * 1000, 2),
+        }
+
+    def server_timing(self):
+        """Return the ``Server-Timing`` header value."""
+        return ', '.join([
+            f'app;dur={self.wall * 1000:.2f}',
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries"',
+            f'serializer;dur={self.serializer_time * 1000:.2f}',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+        ])
+
+
+def current():
+    """Return the metrics of the request being served, or None."""
+    return _current.get()
+
+
+def record_cache(hit):
+    """Count a cache lookup for the current request."""
+    metrics = _current.get()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+def set_view(view, action=None, query_budget=None):
+    """Attach the view's name, action and query budget to the current request."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.view = view
+        metrics.action = action
+        metrics.query_budget = query_budget
+
+
+class _QueryTimer:
+    """``execute_wrapper`` adding each query's duration to the current request."""
+
+    def __call__(self, execute, sql, params, many, context):
+        metrics = _current.get()
+        if metrics is None:
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            metrics.db_time += time.perf_counter() - started
+            metrics.queries += 1
+
+
+_query_timer = _QueryTimer()
+
+
+def install(connection):
+    """Add the query timer to ``connection`` (``connection_created`` receiver)."""
+    if _query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_query_timer)
+
+
+@contextmanager
+def collect():
+    """
+    Collect metrics for the code run in the block.
+
+    Yields:
+        RequestMetrics: Filled in as the block runs; ``wall`` is set on exit
+    """
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        metrics.wall = time.perf_counter() - metrics.started
+        _current.reset(token)
+
+
+_timed_classes = {}
+
+
+def timed_serializer(serializer_class):
+    """
+    Return a subclass of ``serializer_class`` whose representation time is
+    added to the current request's ``serializer_time``.
+
+    Nested serializers of the same class are only timed at the outer level.
+    """
+    timed = _timed_classes.get(serializer_class)
+    if timed is None:
+        def to_representation(self, instance):
+            metrics = _current.get()
+            if metrics is None or metrics._serializer_depth:
+                return super(timed, self).to_representation(instance)
+
+            metrics._serializer_depth += 1
+            started = time.perf_counter()
+            try:
+                return super(timed, self).to_representation(instance)
+            finally:
+                metrics.serializer_time += time.perf_counter() - started
+                metrics._serializer_depth -= 1
+
+        timed = type(serializer_class.__name__, (serializer_class,), {
+            '__module__': serializer_class.__module__,
+            '__qualname__': serializer_class.__qualname__,
+            '__doc__': serializer_class.__doc__,
+            'to_representation': to_representation,
+        })
+        _timed_classes[serializer_class] = timed
+    return timed
+
+
+def _sends_server_timing(request):
+    setting = _get_setting('SERVER_TIMING')
+    if setting == 'staff':
+        # DRF copies the authenticated user onto the Django request.
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_authenticated and user.is_staff)
+    return bool(setting)
+
+
+def finish(request, response, metrics):
+    """
+    Report ``metrics`` for a finished request: header, log line and budget check.
+
+    Raises:
+        QueryBudgetExceeded: If the budget was exceeded and
+            ``STRICT_QUERY_BUDGETS`` is on
+    """
+    if _sends_server_timing(request):
+        response['Server-Timing'] = metrics.server_timing()
+
+    data = metrics.as_dict()
+    level = logging.getLevelName(_get_setting('REQUEST_LOG_LEVEL'))
+    if _get_setting('LOG_REQUESTS') and logger.isEnabledFor(level):
+        logger.log(level, json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **data,
+        }))
+
+    if metrics.over_budget:
+        message = (
+            f'{metrics.view}.{metrics.action} ran {metrics.queries} queries '
+            f'(budget {metrics.query_budget})'
+        )
+        logger.warning(message)
+        if _get_setting('FLAG_BUDGETS'):
+            response['X-Query-Budget-Exceeded'] = f'{metrics.queries}/{metrics.query_budget}'
+        if _get_setting('STRICT_QUERY_BUDGETS'):
+            raise QueryBudgetExceeded(message)
@@ -0,0 +1,361 @@
+"""
+In-process metrics registry exported in the Prometheus text format.
+
+Counters and fixed-bucket histograms are kept in memory per process. When
+``METRICS['DIRECTORY']`` is set, each process also writes a snapshot of its
+values to ``<directory>/<pid>-<nonce>.json``. It does so at most every
+``FLUSH_SECONDS`` while recording, and once more at exit. ``render``
+sums the snapshots of every process, so ``/metrics`` reports the whole
+gunicorn server whichever worker answers. Snapshots of exited workers are
+kept so that counters never go backwards; ``start.sh`` empties the
+directory before the server starts.
+
+Recorded metrics:
+
+* ``http_requests_total`` and ``http_request_duration_seconds`` by route
+  (URL name), method and status;
+* ``http_request_db_duration_seconds`` and ``db_queries_total`` by route;
+* ``cache_lookups_total`` by result (``hit``/``miss``);
+* ``throttle_rejections_total`` by throttle scope;
+* ``celery_task_duration_seconds`` and ``celery_tasks_total`` by task and state;
+* ``password_hash_wait_seconds`` and ``password_hash_duration_seconds`` of
+  the password hashing pool, and ``password_hash_rejections_total`` by
+  reason (``saturated``/``timeout``).
+
+The Celery metrics are recorded where tasks run. In eager mode that is the
+web process, so they appear on the web ``/metrics``. A real worker is a
+separate process, usually on another machine, so it has its own scrape
+endpoint. With ``METRICS['WORKER_PORT']`` set, ``start_worker_endpoint``
+runs when the worker starts (``worker_init``). It empties the worker's own
+``METRICS_DIR``, where the prefork children write their snapshots, and
+serves their sum at ``http://<worker>:<port>/metrics`` from a thread of the
+main worker process. The endpoint requires ``METRICS['TOKEN']`` as a bearer
+token. Without a token it only listens on localhost.
+"""
+import atexit
+import glob
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+
+logger = logging.getLogger('api.metrics')
+
+DEFAULTS = {
+    'DIRECTORY': None,
+    'FLUSH_SECONDS': 1.0,
+    'TOKEN': '',
+    'WORKER_PORT': None,
+}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _get_setting(name):
+    return getattr(settings, 'METRICS', {}).get(name, DEFAULTS[name])
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        _maybe_flush()
+
+
+class Histogram(_Metric):
+    """Histogram with fixed upper bounds; values are cumulative only on export."""
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames, buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    break
+            else:
+                index = len(self.buckets)
+            entry['counts'][index] += 1
+            entry['sum'] += value
+        _maybe_flush()
+
+
+_lock = threading.RLock()
+_registry = {}
+
+
+def counter(name, documentation, labelnames=()):
+    return _registry.setdefault(name, Counter(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+    return _registry.setdefault(name, Histogram(name, documentation, labelnames, buckets))
+
+
+http_requests = counter(
+    'http_requests_total', 'HTTP requests served.', ('route', 'method', 'status'))
+http_request_duration = histogram(
+    'http_request_duration_seconds', 'HTTP request latency.', ('route', 'method', 'status'))
+http_request_db_duration = histogram(
+    'http_request_db_duration_seconds', 'Database time per HTTP request.', ('route',))
+db_queries = counter(
+    'db_queries_total', 'Database queries run while serving HTTP requests.', ('route',))
+cache_lookups = counter(
+    'cache_lookups_total', 'Cache lookups made while serving HTTP requests.', ('result',))
+throttle_rejections = counter(
+    'throttle_rejections_total', 'Requests rejected by a throttle.', ('scope',))
+celery_tasks = counter(
+    'celery_tasks_total', 'Celery tasks finished.', ('task', 'state'))
+celery_task_duration = histogram(
+    'celery_task_duration_seconds', 'Celery task run time.', ('task', 'state'),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0))
+password_hash_wait = histogram(
+    'password_hash_wait_seconds', 'Time password hashes waited for a hashing pool worker.',
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+password_hash_duration = histogram(
+    'password_hash_duration_seconds', 'Password hashing run time on the hashing pool.',
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+password_hash_rejections = counter(
+    'password_hash_rejections_total', 'Password hashes the hashing pool turned away.', ('reason',))
+
+
+def observe_request(request, response, request_metrics):
+    """Record a finished HTTP request (called by the instrumentation middleware)."""
+    match = getattr(request, 'resolver_match', None)
+    route = (match.view_name or match.route) if match is not None else 'unmatched'
+    status = response.status_code
+
+    http_requests.inc(route=route, method=request.method, status=status)
+    http_request_duration.observe(request_metrics.wall, route=route, method=request.method, status=status)
+    http_request_db_duration.observe(request_metrics.db_time, route=route)
+    if request_metrics.queries:
+        db_queries.inc(request_metrics.queries, route=route)
+    if request_metrics.cache_hits:
+        cache_lookups.inc(request_metrics.cache_hits, result='hit')
+    if request_metrics.cache_misses:
+        cache_lookups.inc(request_metrics.cache_misses, result='miss')
+
+
+# Multi-process snapshots
+
+_snapshot_name = f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json'
+_last_flush = 0.0
+
+
+def _snapshot():
+    with _lock:
+        return {
+            name: [[list(key), value] for key, value in metric.values.items()]
+            for name, metric in _registry.items()
+        }
+
+
+def _reset_after_fork():
+    """Forget values inherited from the parent so they are not counted twice."""
+    global _snapshot_name, _last_flush
+    for metric in _registry.values():
+        metric.values = {}
+    _snapshot_name = f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json'
+    _last_flush = 0.0
+
+
+def flush():
+    """Write this process's snapshot to the metrics directory, if configured."""
+    global _last_flush
+    directory = _get_setting('DIRECTORY')
+    if not directory:
+        return
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, _snapshot_name)
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(_snapshot(), f)
+    os.replace(tmp_path, path)
+    _last_flush = time.monotonic()
+
+
+def _maybe_flush():
+    if _get_setting('DIRECTORY') and time.monotonic() - _last_flush >= _get_setting('FLUSH_SECONDS'):
+        flush()
+
+
+atexit.register(flush)
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _merge(total, snapshot):
+    for name, samples in snapshot.items():
+        metric = _registry.get(name)
+        if metric is None:
+            continue
+        values = total.setdefault(name, {})
+        for key, value in samples:
+            key = tuple(key)
+            if isinstance(metric, Histogram):
+                entry = values.setdefault(key, {'counts': [0] * len(value['counts']), 'sum': 0.0})
+                entry['counts'] = [a + b for a, b in zip(entry['counts'], value['counts'])]
+                entry['sum'] += value['sum']
+            else:
+                values[key] = values.get(key, 0) + value
+
+
+def collect():
+    """
+    Return the values of every metric, summed across processes.
+
+    Returns:
+        dict: Metric name to ``{label values tuple: value}``
+    """
+    directory = _get_setting('DIRECTORY')
+    if not directory:
+        total = {}
+        _merge(total, _snapshot())
+        return total
+
+    flush()
+    total = {}
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                _merge(total, json.load(f))
+        except (OSError, ValueError):
+            # Removed or half-written by another process; skip it this time.
+            continue
+    return total
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def render():
+    """Return every metric in the Prometheus text exposition format."""
+    values = collect()
+    lines = []
+    for name, metric in _registry.items():
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.type}')
+        for key, value in sorted(values.get(name, {}).items()):
+            if isinstance(metric, Histogram):
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float('inf'),), value['counts']):
+                    cumulative += count
+                    labels = _format_labels(metric.labelnames, key, [('le', _format_bound(bound))])
+                    lines.append(f'{name}_bucket{labels} {cumulative}')
+                labels = _format_labels(metric.labelnames, key)
+                lines.append(f'{name}_sum{labels} {value["sum"]}')
+                lines.append(f'{name}_count{labels} {cumulative}')
+            else:
+                lines.append(f'{name}{_format_labels(metric.labelnames, key)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+# Scrape endpoint for processes that do not serve HTTP (the Celery worker)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        token = _get_setting('TOKEN')
+        authorization = self.headers.get('Authorization', '')
+        if token and not hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode()):
+            self.send_response(401)
+            self.send_header('WWW-Authenticate', 'Bearer')
+            self.end_headers()
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, address=None):
+    """
+    Serve ``render()`` at ``/metrics`` on ``port`` from a daemon thread.
+
+    Args:
+        port (int): Port to listen on
+        address (str): Interface to bind; all of them if a token is
+            configured, localhost otherwise
+
+    Returns:
+        ThreadingHTTPServer: The running server
+    """
+    if address is None:
+        address = '' if _get_setting('TOKEN') else '127.0.0.1'
+    server = ThreadingHTTPServer((address, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+def start_worker_endpoint():
+    """
+    Start the Celery worker's scrape endpoint if ``WORKER_PORT`` is set.
+
+    Called in the main worker process before the pool forks. Old snapshots
+    in ``DIRECTORY`` are removed first, as ``start.sh`` does for gunicorn.
+
+    Returns:
+        ThreadingHTTPServer: The server, or None if no port is configured
+    """
+    port = _get_setting('WORKER_PORT')
+    if not port:
+        return None
+    directory = _get_setting('DIRECTORY')
+    if directory:
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            os.remove(path)
+    else:
+        logger.warning('METRICS_DIR is not set: the worker endpoint only reports its main process')
+    server = start_http_server(int(port))
+    logger.info('Worker metrics served on port %s', port)
+    return server
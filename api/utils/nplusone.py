@@ -0,0 +1,154 @@
+"""
+N+1 query detection.
+
+``detect`` fingerprints every query run in the block by its normalized SQL
+(see ``slow_queries.normalize``). Any fingerprint repeated at least
+``NPLUSONE['THRESHOLD']`` times is reported. That is the signature of a
+relation loaded once per row, e.g. ``CarritoItem.subtotal`` reading
+``paquete.precio`` for every item. The call site is captured when a
+fingerprint reaches the threshold, so the report points at the line that
+runs in the loop.
+
+The detectors active in the current context are kept in a contextvar and
+fed by one ``execute_wrapper`` installed on every connection when it opens
+(``install``), so queries run by async views through ``sync_to_async``
+are seen as well.
+
+``RequestInstrumentationMiddleware`` runs the detector on every request
+when ``NPLUSONE['ENABLED']`` is set (the default with DEBUG). Repeated
+queries are logged to ``api.performance``, and the response gets an
+``X-N-Plus-One`` header with the number of offending query shapes. With
+``NPLUSONE['RAISE']`` the request fails instead.
+
+In tests, wrap the code under test with ``assert_no_n_plus_one``::
+
+    with assert_no_n_plus_one():
+        self.client.get('/api/v1/ventas/')
+"""
+import contextvars
+import hashlib
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .slow_queries import callsite, normalize
+
+logger = logging.getLogger('api.performance')
+
+DEFAULTS = {
+    'ENABLED': False,
+    'THRESHOLD': 5,
+    'RAISE': False,
+}
+
+
+_active = contextvars.ContextVar('nplusone_detectors', default=())
+
+
+def _get_setting(name):
+    return getattr(settings, 'NPLUSONE', {}).get(name, DEFAULTS[name])
+
+
+class NPlusOneDetected(AssertionError):
+    """The same query shape ran too many times in one request or block."""
+
+    def __init__(self, offenders):
+        self.offenders = offenders
+        super().__init__('\n'.join(
+            f"{offender['count']}x {offender['normalized'][:200]} at {', '.join(offender['callsite']) or '?'}"
+            for offender in offenders
+        ))
+
+
+class Detector:
+    """Counts queries per normalized SQL."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = {}
+        self.samples = {}
+
+    def record(self, sql):
+        normalized = normalize(sql)
+        key = hashlib.sha1(normalized.encode('utf-8')).digest()
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+        if count == self.threshold:
+            self.samples[key] = (normalized, callsite())
+
+    def offenders(self):
+        """
+        Return the repeated query shapes, most repeated first.
+
+        Returns:
+            list: ``{'count', 'normalized', 'callsite'}`` dicts
+        """
+        result = [
+            {'count': self.counts[key], 'normalized': normalized, 'callsite': frames}
+            for key, (normalized, frames) in self.samples.items()
+        ]
+        return sorted(result, key=lambda offender: offender['count'], reverse=True)
+
+
+def _detect_wrapper(execute, sql, params, many, context):
+    """``execute_wrapper`` feeding the query to the active detectors."""
+    for detector in _active.get():
+        detector.record(sql)
+    return execute(sql, params, many, context)
+
+
+def install(connection):
+    """Add the detector wrapper to ``connection`` (``connection_created`` receiver)."""
+    if _detect_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_detect_wrapper)
+
+
+@contextmanager
+def detect(threshold=None):
+    """
+    Count repeated query shapes on every connection within the block.
+
+    Yields:
+        Detector: Call ``offenders()`` after the block
+    """
+    detector = Detector(threshold or _get_setting('THRESHOLD'))
+    token = _active.set(_active.get() + (detector,))
+    try:
+        yield detector
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def assert_no_n_plus_one(threshold=None):
+    """
+    Fail with ``NPlusOneDetected`` if a query shape repeats ``threshold`` times.
+    """
+    with detect(threshold) as detector:
+        yield detector
+    offenders = detector.offenders()
+    if offenders:
+        raise NPlusOneDetected(offenders)
+
+
+def report(request, response, detector):
+    """
+    Log and flag the repeated queries of a finished request.
+
+    Raises:
+        NPlusOneDetected: If there are offenders and ``NPLUSONE['RAISE']`` is on
+    """
+    offenders = detector.offenders()
+    if not offenders:
+        return
+
+    for offender in offenders:
+        logger.warning(
+            'Possible N+1 on %s %s: %sx %s at %s',
+            request.method, request.path, offender['count'], offender['normalized'][:200],
+            ', '.join(offender['callsite']) or '?',
+        )
+    response['X-N-Plus-One'] = str(len(offenders))
+    if _get_setting('RAISE'):
+        raise NPlusOneDetected(offenders)
@@ -1,6 +1,11 @@
 """
 Custom pagination classes for the API.
 """
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 
@@ -40,3 +45,42 @@ class SmallResultsSetPagination(StandardResultsSetPagination):
     """
     page_size = 5
     max_page_size = 20
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that uses the PostgreSQL planner estimate instead of COUNT(*).
+    
+    The estimate comes from ``EXPLAIN`` on the paginated query, so it also
+    works for filtered changelists. When the estimate is below
+    ``exact_count_threshold`` the exact count is used instead, so small
+    tables still show precise totals. Other database backends always run the
+    exact count.
+    """
+    exact_count_threshold = 10000
+    
+    @cached_property
+    def count(self):
+        estimate = self._estimated_count()
+        if estimate is None or estimate < self.exact_count_threshold:
+            return super().count
+        return estimate
+    
+    def _estimated_count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return None
+        
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
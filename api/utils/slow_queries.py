@@ -0,0 +1,276 @@
+"""
+Slow query log.
+
+A wrapper added to every database connection when it opens (see
+``api.signals``) times each query. Queries slower than
+``SLOW_QUERY_LOG['THRESHOLD_MS']`` are captured with:
+
+* the SQL and its normalized form, in which literals and placeholder
+  lists are collapsed so that variants of one query group together;
+* the shape of the parameters (their types, never their values);
+* the call site, meaning the innermost project frames (view, serializer,
+  task...) that issued the query;
+* the view and action of the request, when there is one.
+
+Captured queries go into an in-process ring buffer (``BUFFER_SIZE``) and
+are written as JSON lines to the ``api.slow_queries`` logger. For
+``SELECT`` statements an ``EXPLAIN`` plan is taken on a background thread,
+at most once per normalized query every ``EXPLAIN_INTERVAL`` seconds, and
+the entry is logged once the plan is attached. ``top`` groups the buffer
+by normalized SQL for the staff endpoint.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+from . import instrumentation
+
+logger = logging.getLogger('api.slow_queries')
+
+DEFAULTS = {
+    'ENABLED': True,
+    'THRESHOLD_MS': 200,
+    'BUFFER_SIZE': 500,
+    'EXPLAIN': True,
+    'EXPLAIN_INTERVAL': 300,
+    'MAX_PENDING_EXPLAINS': 10,
+}
+
+EXPLAIN_PREFIX = {
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+
+_EXPLAIN_THREAD = 'slow-query-explain'
+_PROJECT_DIR = str(settings.BASE_DIR)
+_SKIP_FILES = (__file__, instrumentation.__file__, os.path.join(os.path.dirname(__file__), 'nplusone.py'))
+# Middleware frames are on every request's stack and say nothing about the caller.
+_SKIP_DIRS = (os.path.join(_PROJECT_DIR, 'api', 'middleware'),)
+
+
+def _get_setting(name):
+    return getattr(settings, 'SLOW_QUERY_LOG', {}).get(name, DEFAULTS[name])
+
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """
+    Collapse literals and placeholder lists so query variants compare equal.
+
+    ``... WHERE id IN (%s, %s, %s) LIMIT 21`` becomes
+    ``... WHERE id IN (...) LIMIT ?``.
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def _params_shape(params, many):
+    if params is None:
+        return None
+    if many:
+        params = list(params)
+        return {'rows': len(params), 'row': _params_shape(params[0], False) if params else None}
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+def callsite(limit=3):
+    """
+    Innermost project frames, skipping instrumentation and middleware.
+
+    When no project code is involved (e.g. a related field loaded by a DRF
+    serializer), the innermost library frame outside ``django/db`` is used.
+    """
+    frames = []
+    fallback = None
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if filename in _SKIP_FILES or filename.startswith(_SKIP_DIRS):
+            continue
+        if 'site-packages' in filename or not filename.startswith(_PROJECT_DIR):
+            if fallback is None and f'django{os.sep}db{os.sep}' not in filename:
+                fallback = f"{filename.rsplit('site-packages' + os.sep, 1)[-1]}:{frame.lineno} in {frame.name}"
+            continue
+        frames.append(f'{os.path.relpath(filename, _PROJECT_DIR)}:{frame.lineno} in {frame.name}')
+        if len(frames) == limit:
+            break
+    return frames or ([fallback] if fallback else [])
+
+
+_lock = threading.Lock()
+_buffer = deque(maxlen=_get_setting('BUFFER_SIZE'))
+_plans = {}
+_pending_explains = 0
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=_EXPLAIN_THREAD)
+
+
+def _log(entry):
+    logger.warning(json.dumps(entry, default=str))
+
+
+def _explain(alias, vendor, sql, params, entry):
+    global _pending_explains
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(EXPLAIN_PREFIX[vendor] + sql, params)
+            plan = '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+        with _lock:
+            _plans[entry['fingerprint']] = (plan, time.monotonic())
+            entry['plan'] = plan
+    except Exception as exc:
+        entry['plan'] = f'EXPLAIN failed: {type(exc).__name__}: {exc}'
+    finally:
+        connections[alias].close()
+        with _lock:
+            _pending_explains -= 1
+        _log(entry)
+
+
+def _wants_explain(vendor, sql, many, fingerprint):
+    if not _get_setting('EXPLAIN') or many or vendor not in EXPLAIN_PREFIX:
+        return False
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return False
+    cached = _plans.get(fingerprint)
+    return cached is None or time.monotonic() - cached[1] >= _get_setting('EXPLAIN_INTERVAL')
+
+
+def record(connection, sql, params, many, seconds):
+    """Capture a slow query into the ring buffer and log it."""
+    global _pending_explains
+    normalized = normalize(sql)
+    fingerprint = hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12]
+    metrics = instrumentation.current()
+
+    entry = {
+        'at': time.time(),
+        'duration_ms': round(seconds * 1000, 2),
+        'alias': connection.alias,
+        'fingerprint': fingerprint,
+        'normalized': normalized,
+        'sql': sql,
+        'params_shape': _params_shape(params, many),
+        'callsite': callsite(),
+        'view': metrics.view if metrics is not None else None,
+        'action': metrics.action if metrics is not None else None,
+        'plan': None,
+    }
+
+    explain = False
+    with _lock:
+        _buffer.append(entry)
+        if _wants_explain(connection.vendor, sql, many, fingerprint):
+            if _pending_explains < _get_setting('MAX_PENDING_EXPLAINS'):
+                _pending_explains += 1
+                # Claim the fingerprint now so concurrent captures don't queue duplicates.
+                _plans[fingerprint] = (None, time.monotonic())
+                explain = True
+        else:
+            plan = _plans.get(fingerprint)
+            entry['plan'] = plan[0] if plan else None
+
+    if explain:
+        _executor.submit(_explain, connection.alias, connection.vendor, sql, params, entry)
+    else:
+        _log(entry)
+
+
+class SlowQueryWrapper:
+    """``execute_wrapper`` installed on every connection by ``install``."""
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            seconds = time.perf_counter() - started
+            if (seconds * 1000 >= _get_setting('THRESHOLD_MS')
+                    and not threading.current_thread().name.startswith(_EXPLAIN_THREAD)):
+                record(context['connection'], sql, params, many, seconds)
+
+
+_wrapper = SlowQueryWrapper()
+
+
+def install(connection):
+    """Add the slow query wrapper to ``connection`` (``connection_created`` receiver)."""
+    if _get_setting('ENABLED') and _wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _wrapper)
+
+
+def entries():
+    """Return the captured queries, newest first."""
+    with _lock:
+        return list(reversed(_buffer))
+
+
+def clear():
+    with _lock:
+        _buffer.clear()
+
+
+def top(limit=20, order_by='total_ms'):
+    """
+    Group the captured queries by normalized SQL.
+
+    Args:
+        limit (int): Number of groups returned
+        order_by (str): ``total_ms``, ``max_ms`` or ``count``
+
+    Returns:
+        list: Groups with count, total/max/avg duration, call sites, the
+        latest SQL sample and plan, worst first
+    """
+    groups = {}
+    for entry in entries():
+        group = groups.get(entry['fingerprint'])
+        if group is None:
+            group = groups[entry['fingerprint']] = {
+                'fingerprint': entry['fingerprint'],
+                'normalized': entry['normalized'],
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'views': set(),
+                'callsites': set(),
+                'sample_sql': entry['sql'],
+                'params_shape': entry['params_shape'],
+                'plan': entry['plan'],
+                'last_at': entry['at'],
+            }
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        if entry['view']:
+            group['views'].add(f"{entry['view']}.{entry['action']}")
+        if entry['callsite']:
+            group['callsites'].add(entry['callsite'][0])
+        if group['plan'] is None:
+            group['plan'] = entry['plan']
+
+    result = sorted(groups.values(), key=lambda group: group[order_by], reverse=True)[:limit]
+    for group in result:
+        group['total_ms'] = round(group['total_ms'], 2)
+        group['avg_ms'] = round(group['total_ms'] / group['count'], 2)
+        group['views'] = sorted(group['views'])
+        group['callsites'] = sorted(group['callsites'])
+    return result
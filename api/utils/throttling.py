@@ -1,63 +1,273 @@
 """
 Custom throttling classes for the API.
+
+Rate throttles count requests with a sliding window built from two fixed
+windows: the current window's counter plus the previous window's counter
+weighted by how much of it still overlaps the sliding window. Both are
+plain integers updated with atomic ``incr``/``decr``, so a key costs two
+cache entries no matter how many requests it makes, and concurrent requests
+never overwrite each other's counts.
+
+The burst scopes answer from an in-process token bucket instead and only
+reconcile with the shared cache every ``THROTTLE_LOCAL_BUCKETS['SYNC_SECONDS']``
+seconds; see ``LocalTokenBucketThrottle`` for the accuracy trade-off.
 """
-from rest_framework.throttling import AnonRateThrottle, UserRateThrottle, ScopedRateThrottle
+import threading
+
+from django.conf import settings
+from rest_framework.throttling import (
+    AnonRateThrottle, ScopedRateThrottle, SimpleRateThrottle, UserRateThrottle,
+)
+
+from . import metrics
+from .cache_utils import LocalLRUCache
+
+LOCAL_BUCKET_DEFAULTS = {
+    'SYNC_SECONDS': 1.0,
+    'SYNC_FRACTION': 0.1,
+    'MAX_KEYS': 10_000,
+}
+
+
+def _get_local_bucket_setting(name):
+    return getattr(settings, 'THROTTLE_LOCAL_BUCKETS', {}).get(name, LOCAL_BUCKET_DEFAULTS[name])
+
+
+def _incr(cache, key, timeout, delta=1):
+    """Atomically increment ``key``, creating it with ``timeout`` if missing."""
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, timeout)
+        return cache.incr(key, delta)
+
+
+def _decr(cache, key):
+    try:
+        cache.decr(key)
+    except ValueError:
+        # The counter already expired; nothing to give back.
+        pass
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """
+    ``SimpleRateThrottle`` backed by atomic sliding-window counters.
 
+    The request is counted first (``incr``) and rolled back (``decr``) if it
+    pushes the estimate over the limit, so under any concurrency exactly as
+    many requests are admitted as the limit leaves room for.
 
-class AnonBurstRateThrottle(AnonRateThrottle):
+    Combine with a DRF throttle that provides ``get_cache_key``, listing the
+    DRF class first so its ``allow_request`` (if any) runs before this one.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        self.elapsed = self.now - window * self.duration
+        current_key = f'{self.key}:{window}'
+
+        # Counters must outlive their window to serve as "previous".
+        self.count = _incr(self.cache, current_key, self.duration * 2)
+        self.previous = self.cache.get(f'{self.key}:{window - 1}', 0)
+
+        if self._estimate(self.count) > self.num_requests:
+            _decr(self.cache, current_key)
+            self.count -= 1
+            return self.throttle_failure()
+        return self.throttle_success()
+
+    def _estimate(self, count, elapsed=None):
+        elapsed = self.elapsed if elapsed is None else elapsed
+        return self.previous * (1 - elapsed / self.duration) + count
+
+    def throttle_success(self):
+        return True
+
+    def throttle_failure(self):
+        metrics.throttle_rejections.inc(scope=self.scope)
+        return False
+
+    def wait(self):
+        """
+        Seconds until the estimate leaves room for one more request.
+        """
+        room = self.num_requests - 1 - self.count
+        if room < 0 or not self.previous:
+            # Only the next window resets the current counter.
+            return self.duration - self.elapsed
+
+        # previous * (1 - (elapsed + t) / duration) + count <= num_requests - 1
+        wait = self.duration * (1 - room / self.previous) - self.elapsed
+        return max(0.0, min(wait, self.duration - self.elapsed))
+
+
+class _Bucket:
+    __slots__ = ('tokens', 'updated', 'pending', 'synced_at')
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated = now
+        self.pending = 0
+        self.synced_at = None
+
+
+_local_buckets = LocalLRUCache(maxsize=_get_local_bucket_setting('MAX_KEYS'), instrumented=False)
+_local_buckets_lock = threading.Lock()
+
+
+def clear_local_buckets():
+    """Forget every in-process token bucket."""
+    _local_buckets.clear()
+
+
+class LocalTokenBucketThrottle(SlidingWindowRateThrottle):
+    """
+    Two-tier throttle: an in-process token bucket per key, reconciled with
+    the shared sliding-window counters at a fixed interval.
+
+    Each bucket holds up to ``num_requests`` tokens and refills at
+    ``num_requests / duration`` per second, so most decisions need no cache
+    round trip. The worker syncs on the first request for a key, then every
+    ``SYNC_SECONDS`` seconds or as soon as it has admitted ``SYNC_FRACTION``
+    of the limit locally, whichever comes first. A sync adds the locally
+    admitted requests to the shared counter and lowers the bucket to the
+    global headroom that counter reports.
+
+    Error bound: a worker admits at most ``SYNC_FRACTION * num_requests``
+    requests before it publishes them, and other workers see them on their
+    next sync. With ``W`` workers, a key can exceed its limit by at most
+    about ``W * SYNC_FRACTION * num_requests`` requests, plus the tokens
+    refilled during one ``SYNC_SECONDS`` interval. With the defaults and two
+    gunicorn workers, that is about 20% over the limit. Usage not yet synced
+    is lost if a bucket is evicted from the LRU (``MAX_KEYS``) or the
+    process exits.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = self.timer()
+        refill_rate = self.num_requests / self.duration
+
+        with _local_buckets_lock:
+            bucket = _local_buckets.get(self.key)
+            if bucket is None:
+                bucket = _Bucket(self.num_requests, now)
+                _local_buckets.set(self.key, bucket)
+
+            bucket.tokens = min(self.num_requests, bucket.tokens + (now - bucket.updated) * refill_rate)
+            bucket.updated = now
+
+            sync_due = (
+                bucket.synced_at is None
+                or now - bucket.synced_at >= _get_local_bucket_setting('SYNC_SECONDS')
+                or bucket.pending >= self.num_requests * _get_local_bucket_setting('SYNC_FRACTION')
+            )
+            if sync_due:
+                pending, bucket.pending = bucket.pending, 0
+                bucket.synced_at = now
+
+        if sync_due:
+            self._sync(bucket, pending, now)
+
+        with _local_buckets_lock:
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                bucket.pending += 1
+                return True
+            self.tokens = bucket.tokens
+
+        return self.throttle_failure()
+
+    def _sync(self, bucket, pending, now):
+        """Publish ``pending`` admissions and clamp the bucket to the global headroom."""
+        window = int(now // self.duration)
+        current_key = f'{self.key}:{window}'
+        if pending:
+            count = _incr(self.cache, current_key, self.duration * 2, delta=pending)
+        else:
+            count = self.cache.get(current_key, 0)
+        previous = self.cache.get(f'{self.key}:{window - 1}', 0)
+
+        elapsed = now - window * self.duration
+        used = previous * (1 - elapsed / self.duration) + count
+
+        with _local_buckets_lock:
+            bucket.tokens = min(bucket.tokens, max(0.0, self.num_requests - used))
+
+    def wait(self):
+        """Seconds until the local bucket refills one token."""
+        return (1 - self.tokens) * self.duration / self.num_requests
+
+
+class AnonBurstRateThrottle(AnonRateThrottle, LocalTokenBucketThrottle):
     """
     Limits the rate of API calls that may be made by anonymous users.
-    
+
     Should be used to prevent short bursts of requests from a single IP address.
     """
     scope = 'anon_burst'
 
 
-class AnonSustainedRateThrottle(AnonRateThrottle):
+class AnonSustainedRateThrottle(AnonRateThrottle, SlidingWindowRateThrottle):
     """
     Limits the rate of API calls that may be made by anonymous users.
-    
+
     Should be used to prevent sustained high-frequency requests from a single IP address.
     """
     scope = 'anon_sustained'
 
 
-class UserBurstRateThrottle(UserRateThrottle):
+class UserBurstRateThrottle(UserRateThrottle, LocalTokenBucketThrottle):
     """
     Limits the rate of API calls that may be made by a single user.
-    
+
     Should be used to prevent short bursts of requests from a single user.
     """
     scope = 'user_burst'
 
 
-class UserSustainedRateThrottle(UserRateThrottle):
+class UserSustainedRateThrottle(UserRateThrottle, SlidingWindowRateThrottle):
     """
     Limits the rate of API calls that may be made by a single user.
-    
+
     Should be used to prevent sustained high-frequency requests from a single user.
     """
     scope = 'user_sustained'
 
 
-class StaffBypassThrottle(ScopedRateThrottle):
+class StaffBypassThrottle(ScopedRateThrottle, SlidingWindowRateThrottle):
     """
     A throttle that allows staff users to bypass rate limiting.
-    
+
     For non-staff users, applies the default rate limiting.
     """
     def allow_request(self, request, view):
         # Allow staff users to bypass throttling
         if request.user and request.user.is_staff:
             return True
-            
+
         return super().allow_request(request, view)
 
 
-class MethodScopedRateThrottle(ScopedRateThrottle):
+class MethodScopedRateThrottle(ScopedRateThrottle, SlidingWindowRateThrottle):
     """
     A throttle that applies different rate limits based on the HTTP method.
-    
+
     The scope will be determined by the view's `throttle_scope` attribute
     with the HTTP method appended (e.g., 'view:get', 'view:post').
     """
@@ -65,15 +275,15 @@ class MethodScopedRateThrottle(ScopedRateThrottle):
         scope = super().get_scope(request, view)
         if scope is None:
             return None
-            
+
         # Append the HTTP method to the scope
         return f"{scope}:{request.method.lower()}"
 
 
-class UserOrIPRateThrottle(UserRateThrottle):
+class UserOrIPRateThrottle(UserRateThrottle, SlidingWindowRateThrottle):
     """
     A throttle that limits the rate of API calls by both user and IP address.
-    
+
     The rate limit is applied to both authenticated users (by user ID)
     and anonymous users (by IP address).
     """
@@ -84,7 +294,7 @@ class UserOrIPRateThrottle(UserRateThrottle):
         else:
             # Use the IP address for anonymous users
             ident = self.get_ident(request)
-            
+
         return self.cache_format % {
             'scope': self.scope,
             'ident': ident
@@ -94,54 +304,68 @@ class UserOrIPRateThrottle(UserRateThrottle):
 class ConcurrentRequestThrottle(UserRateThrottle):
     """
     A throttle that limits the number of concurrent requests per user.
-    
+
     This is useful for preventing users from making too many simultaneous
     requests that could overwhelm the server.
+
+    The rate's request count is the number of simultaneous requests allowed.
+    Each request takes one of that many slot keys with an atomic
+    ``cache.add`` and deletes it once the response has been produced
+    (``api.middleware.throttling.ConcurrencyReleaseMiddleware``, which must
+    be installed). Every slot has its own timeout, the rate's period, so a
+    slot leaked by a crashed worker frees itself without touching the
+    others.
     """
     scope = 'concurrent'
-    
+
     def allow_request(self, request, view):
         # Allow staff users to bypass throttling
         if request.user and request.user.is_staff:
             return True
-            
+
         # Check if the user has exceeded the concurrent request limit
         if self.rate is None:
             return True
-            
+
         self.key = self.get_cache_key(request, view)
         if self.key is None:
             return True
-            
-        # Get the current number of concurrent requests
-        current_requests = self.cache.get(self.key, 0)
-        
-        # Check if the user has reached the limit
-        if current_requests >= self.num_requests:
-            return self.throttle_failure()
-            
-        # Increment the concurrent request count
-        self.cache.set(self.key, current_requests + 1, self.duration)
-        return True
-    
+
+        slots = [f'{self.key}:{i}' for i in range(self.num_requests)]
+        taken = self.cache.get_many(slots)
+        for slot in slots:
+            # add() fails if another request took the slot since get_many().
+            if slot not in taken and self.cache.add(slot, 1, self.duration):
+                release_slot(request, self.cache, slot)
+                return True
+
+        metrics.throttle_rejections.inc(scope=self.scope)
+        return self.throttle_failure()
+
     def wait(self):
         """
         How long to wait before allowing another request.
-        
+
         Since this is for concurrent requests, we can't provide a specific
         wait time. Instead, we'll return None to indicate that the client
         should retry after a short delay.
         """
         return None
-    
-    def throttle_success(self):
-        """
-        Called when a request is successful.
-        """
-        if hasattr(self, 'key') and self.key is not None:
-            # Decrement the concurrent request count
-            current_requests = self.cache.get(self.key, 1)
-            if current_requests > 0:
-                self.cache.set(self.key, current_requests - 1, self.duration)
-                
-        return True
+
+
+def release_slot(request, cache, key):
+    """
+    Schedule the slot ``key`` to be freed when ``request`` finishes.
+
+    Accepts a DRF or Django request; the release list lives on the Django
+    request so the middleware can see it.
+    """
+    django_request = getattr(request, '_request', request)
+    releases = django_request.__dict__.setdefault('_throttle_releases', [])
+    releases.append((cache, key))
+
+
+def release_all(request):
+    """Give back every concurrency slot taken by ``request``."""
+    for cache, key in request.__dict__.pop('_throttle_releases', ()):
+        cache.delete(key)
@@ -0,0 +1,345 @@
+"""
+Cache-backed revocation of JWTs by ``jti``.
+
+Revoking a token stores ``auth:revoked:<jti>`` in the shared cache with a
+timeout equal to the token's remaining lifetime, so the store never needs
+pruning. Lookups first consult an in-process Bloom filter: a miss is
+answered without touching the cache, and only the (rare) hits are confirmed
+against it.
+
+Each revocation is also appended to a shared log (a sequence counter plus
+one cache entry per revocation). Every process replays the new log entries
+into its Bloom filter at most every ``TOKEN_REVOCATION['SYNC_SECONDS']``
+seconds, so a token revoked by another worker may still be accepted here
+for up to that long. Revocations made by this process are visible
+immediately.
+
+The log is read in pages of ``SYNC_PAGE_SIZE`` entries. A sequence number
+with no entry yet (a writer between ``incr`` and ``set``) is remembered as
+a gap and read again on the following syncs. It is only given up after
+``GAP_TIMEOUT`` seconds, with a warning, since by then the entry was
+evicted. ``seen_seq`` is the highest sequence number below which nothing is
+missing.
+
+``revoke_user`` revokes every token issued to a user so far (used when
+the user is deactivated). It goes through the same store under a
+per-user marker whose value is the revocation time, compared with the
+token's ``iat``.
+
+The filter is generational: a new one is started every refresh token
+lifetime and the previous one is kept for one more period, so a ``jti``
+is only forgotten once every token carrying it has expired.
+
+All of this relies on every process sharing one cache. With
+``TOKEN_REVOCATION['REQUIRE_SHARED_CACHE']`` set, ``check_shared_cache``
+(called when the app loads) refuses to start on a process-local backend.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+logger = logging.getLogger('api.token_revocation')
+
+DEFAULTS = {
+    'BLOOM_CAPACITY': 100_000,
+    'BLOOM_ERROR_RATE': 0.001,
+    'SYNC_SECONDS': 5,
+    'SYNC_PAGE_SIZE': 1000,
+    'GAP_TIMEOUT': 60,
+    'KEY_PREFIX': 'auth:revoked',
+    'REQUIRE_SHARED_CACHE': False,
+}
+
+# Backends whose entries are not visible to other processes.
+LOCAL_CACHE_BACKENDS = frozenset({
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+})
+
+
+def _get_setting(name):
+    return getattr(settings, 'TOKEN_REVOCATION', {}).get(name, DEFAULTS[name])
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    Sized for ``capacity`` items at a false positive rate of ``error_rate``.
+    Positions use double hashing over a single BLAKE2b digest.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def fill_ratio(self):
+        return int.from_bytes(self.bits, 'little').bit_count() / self.size
+
+
+class _RevocationFilter:
+    """Current and previous Bloom filter generations plus log replay state."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        self.period = jwt_settings.REFRESH_TOKEN_LIFETIME.total_seconds()
+        self.current = self._new_filter()
+        self.previous = None
+        self.rotated_at = time.monotonic()
+        self.synced_at = 0.0
+        self.seen_seq = None
+        self.read_seq = None
+        # Sequence number -> monotonic time it was first found missing
+        self.gaps = {}
+        self.stats = {
+            'checks': 0, 'filter_hits': 0, 'confirmed': 0, 'revoked': 0, 'synced': 0, 'gaps_dropped': 0,
+        }
+
+    def _new_filter(self):
+        return BloomFilter(_get_setting('BLOOM_CAPACITY'), _get_setting('BLOOM_ERROR_RATE'))
+
+    def _rotate_if_due(self):
+        if time.monotonic() - self.rotated_at >= self.period:
+            self.previous, self.current = self.current, self._new_filter()
+            self.rotated_at = time.monotonic()
+
+    def add(self, jti):
+        with self.lock:
+            self._rotate_if_due()
+            self.current.add(jti)
+
+    def __contains__(self, jti):
+        return jti in self.current or (self.previous is not None and jti in self.previous)
+
+
+_filter = _RevocationFilter()
+
+
+def _key(*parts):
+    return ':'.join((_get_setting('KEY_PREFIX'),) + tuple(str(p) for p in parts))
+
+
+def _sync():
+    """Replay revocations logged by other processes since the last sync."""
+    now = time.monotonic()
+    if now - _filter.synced_at < _get_setting('SYNC_SECONDS'):
+        return
+    # One thread syncs at a time; the others go on with the current filter.
+    if not _filter.sync_lock.acquire(blocking=False):
+        return
+    try:
+        _filter.synced_at = now
+        seq = cache.get(_key('seq'))
+        if seq is not None:
+            _replay(seq, now)
+    finally:
+        _filter.sync_lock.release()
+
+
+def _replay(seq, now):
+    if _filter.read_seq is None:
+        # First sync in this process: replay the most recent revocations.
+        # Older log entries have expired along with their tokens.
+        _filter.read_seq = _filter.seen_seq = max(0, seq - _get_setting('BLOOM_CAPACITY'))
+    elif seq < _filter.read_seq:
+        # The counter was reset (cache flush or eviction): replay from scratch.
+        _filter.read_seq = _filter.seen_seq = 0
+        _filter.gaps.clear()
+
+    pending = sorted(_filter.gaps) + list(range(_filter.read_seq + 1, seq + 1))
+    page_size = _get_setting('SYNC_PAGE_SIZE')
+    for offset in range(0, len(pending), page_size):
+        page = pending[offset:offset + page_size]
+        entries = cache.get_many([_key('log', i) for i in page])
+        for i in page:
+            jti = entries.get(_key('log', i))
+            if jti is None:
+                _filter.gaps.setdefault(i, now)
+            else:
+                _filter.add(jti)
+                _filter.gaps.pop(i, None)
+        _filter.stats['synced'] += len(entries)
+
+    timeout = _get_setting('GAP_TIMEOUT')
+    for i, missing_since in list(_filter.gaps.items()):
+        if now - missing_since >= timeout:
+            logger.warning('Revocation log entry %s missing for %ss; giving up on it', i, timeout)
+            del _filter.gaps[i]
+            _filter.stats['gaps_dropped'] += 1
+
+    _filter.read_seq = seq
+    _filter.seen_seq = min(_filter.gaps) - 1 if _filter.gaps else seq
+
+
+def _user_marker(user_id):
+    return f'user:{user_id}'
+
+
+def revoke_jti(jti, exp, value=1):
+    """
+    Revoke a token identifier until its expiry.
+
+    Args:
+        jti (str): The token's ``jti`` claim
+        exp (int|float): The token's ``exp`` claim (Unix timestamp)
+        value: Stored under the identifier; ``_revocation`` returns it
+
+    Returns:
+        bool: False if the token has already expired and nothing was stored
+    """
+    ttl = int(math.ceil(exp - time.time()))
+    if ttl <= 0:
+        return False
+
+    cache.set(_key(jti), value, ttl)
+    _filter.add(jti)
+    _filter.stats['revoked'] += 1
+
+    seq = _next_seq()
+    if seq is not None:
+        cache.set(_key('log', seq), jti, ttl)
+    return True
+
+
+def _next_seq():
+    """Take the next log sequence number, re-creating the counter if it is gone."""
+    for _ in range(2):
+        cache.add(_key('seq'), 0, None)
+        try:
+            return cache.incr(_key('seq'))
+        except ValueError:
+            # Evicted between add() and incr(); readers see the counter go
+            # back and replay the log from the start.
+            continue
+    logger.warning('Could not take a revocation log sequence number; other processes will not see it')
+    return None
+
+
+def revoke(token):
+    """
+    Revoke a simplejwt token (access or refresh) until it expires.
+
+    Args:
+        token: A validated ``rest_framework_simplejwt`` token
+
+    Returns:
+        bool: False if the token had no ``jti`` or was already expired
+    """
+    jti = token.get(jwt_settings.JTI_CLAIM)
+    exp = token.get('exp')
+    if not jti or not exp:
+        return False
+    return revoke_jti(jti, exp)
+
+
+def revoke_user(user_id):
+    """
+    Revoke every token issued to ``user_id`` until now.
+
+    Tokens issued afterwards are accepted again, so a reactivated user can
+    log in. The marker lives as long as a refresh token.
+
+    Args:
+        user_id: The user's primary key, as in the tokens' user id claim
+    """
+    now = time.time()
+    return revoke_jti(
+        _user_marker(user_id), now + jwt_settings.REFRESH_TOKEN_LIFETIME.total_seconds(), value=now
+    )
+
+
+def _revocation(jti):
+    """
+    Return the value stored when ``jti`` was revoked, or None.
+
+    Answered from the local Bloom filter when possible; only filter hits
+    read the shared cache.
+    """
+    if not jti:
+        return None
+
+    _sync()
+    _filter.stats['checks'] += 1
+    if jti not in _filter:
+        return None
+
+    _filter.stats['filter_hits'] += 1
+    value = cache.get(_key(jti))
+    if value is not None:
+        _filter.stats['confirmed'] += 1
+    return value
+
+
+def is_revoked(jti):
+    """Whether ``jti`` has been revoked."""
+    return _revocation(jti) is not None
+
+
+def is_token_revoked(token):
+    """
+    Whether a simplejwt token was revoked, by ``jti`` or through ``revoke_user``.
+    """
+    if is_revoked(token.get(jwt_settings.JTI_CLAIM)):
+        return True
+    user_id = token.get(jwt_settings.USER_ID_CLAIM)
+    if user_id is None:
+        return False
+    revoked_at = _revocation(_user_marker(user_id))
+    return revoked_at is not None and token.get('iat', 0) <= revoked_at
+
+
+def check_shared_cache():
+    """
+    Fail when revocations would stay inside one process.
+
+    Raises:
+        ImproperlyConfigured: If ``REQUIRE_SHARED_CACHE`` is set and the
+            default cache is process-local
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if _get_setting('REQUIRE_SHARED_CACHE') and backend in LOCAL_CACHE_BACKENDS:
+        raise ImproperlyConfigured(
+            f"Token revocation needs a cache shared by every process, but the "
+            f"default cache is {backend}. Set REDIS_URL."
+        )
+
+
+def stats():
+    """
+    Return revocation counters for this process.
+
+    Returns:
+        dict: Lookup counters, false positives and Bloom filter occupancy
+    """
+    data = dict(_filter.stats)
+    data['false_positives'] = data['filter_hits'] - data['confirmed']
+    data['bloom_items'] = _filter.current.count
+    data['bloom_fill_ratio'] = round(_filter.current.fill_ratio(), 4)
+    data['bloom_size_bytes'] = len(_filter.current.bits)
+    data['seen_seq'] = _filter.seen_seq
+    data['log_gaps'] = len(_filter.gaps)
+    return data
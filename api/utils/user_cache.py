@@ -0,0 +1,173 @@
+"""
+Cached user resolution for token authentication.
+
+Users are looked up in an in-process LRU first, then in the shared cache and
+only then in the database. Only the ``FIELDS`` read by authentication and
+the permission classes are cached, never the password hash; the returned
+user defers every other field and loads it from the database on access. Entries are invalidated when a ``Usuario`` is
+saved or deleted (see ``api.signals``) and when a password changes.
+
+Invalidation only reaches the local LRU of the process that performed the
+write, so other workers may keep serving a stale user for at most
+``USER_CACHE['LOCAL_TIMEOUT']`` seconds.
+
+``is_email_registered`` keeps a short-lived negative cache of emails known
+to be free, so repeated availability probes skip the database.
+"""
+import hashlib
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import DEFERRED
+
+from . import instrumentation
+from .cache_utils import LocalLRUCache
+
+DEFAULTS = {
+    'LOCAL_MAXSIZE': 2048,
+    'LOCAL_TIMEOUT': 30,
+    'SHARED_TIMEOUT': 5 * 60,
+    'KEY_PREFIX': 'auth:user',
+    'EMAIL_NEGATIVE_TIMEOUT': 30,
+}
+
+# Fields kept in the caches; they cover ``CustomJWTAuthentication``, the
+# token claims and the permission classes.
+FIELDS = ('id', 'email', 'nombre', 'apellido', 'tipo_usuario', 'is_staff', 'is_superuser', 'is_active')
+
+
+def _get_setting(name):
+    return getattr(settings, 'USER_CACHE', {}).get(name, DEFAULTS[name])
+
+
+_local = LocalLRUCache(
+    maxsize=_get_setting('LOCAL_MAXSIZE'),
+    timeout=_get_setting('LOCAL_TIMEOUT'),
+)
+
+_stats_lock = threading.Lock()
+_stats = {
+    'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0,
+    'email_negative_hits': 0,
+}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _cache_key(user_id):
+    return f"{_get_setting('KEY_PREFIX')}:{user_id}"
+
+
+def _to_user(data):
+    """Build a user from cached ``FIELDS``; the other fields stay deferred."""
+    User = get_user_model()
+    values = [data.get(field.attname, DEFERRED) for field in User._meta.concrete_fields]
+    return User.from_db(DEFAULT_DB_ALIAS, None, values)
+
+
+def get_user(user_id, lookup_field='id'):
+    """
+    Resolve a user by id through the local LRU, the shared cache and the database.
+
+    Args:
+        user_id: The user's primary key (as found in the token)
+        lookup_field (str): Model field matched against ``user_id``
+
+    Returns:
+        User: A new instance with ``FIELDS`` loaded and the rest deferred
+
+    Raises:
+        User.DoesNotExist: If no user matches ``user_id``
+    """
+    key = _cache_key(user_id)
+
+    data = _local.get(key)
+    if data is not None:
+        _count('local_hits')
+        return _to_user(data)
+
+    data = cache.get(key)
+    instrumentation.record_cache(data is not None)
+    if data is not None:
+        _count('shared_hits')
+    else:
+        _count('misses')
+        User = get_user_model()
+        data = User.objects.filter(**{lookup_field: user_id}).values(*FIELDS).get()
+        cache.set(key, data, _get_setting('SHARED_TIMEOUT'))
+
+    _local.set(key, data)
+    # Callers may mutate request.user, so every call builds a new instance.
+    return _to_user(data)
+
+
+def invalidate(user_id):
+    """Drop a user from the local LRU and the shared cache."""
+    key = _cache_key(user_id)
+    _local.delete(key)
+    cache.delete(key)
+    _count('invalidations')
+
+
+def _email_key(email):
+    digest = hashlib.sha256(email.encode('utf-8')).hexdigest()
+    return f"{_get_setting('KEY_PREFIX')}:email-free:{digest}"
+
+
+def is_email_registered(email):
+    """
+    Whether a user exists with ``email`` (compared case-insensitively).
+
+    Negative answers are cached for ``USER_CACHE['EMAIL_NEGATIVE_TIMEOUT']``
+    seconds; positive answers always come from the database.
+
+    Args:
+        email (str): The email to check
+
+    Returns:
+        bool: True if the email is already taken
+    """
+    User = get_user_model()
+    email = User.objects.normalize_email(email)
+    key = _email_key(email)
+
+    if cache.get(key):
+        _count('email_negative_hits')
+        return False
+
+    exists = User.objects.filter(email=email).exists()
+    if not exists:
+        cache.set(key, True, _get_setting('EMAIL_NEGATIVE_TIMEOUT'))
+    return exists
+
+
+def invalidate_email(email):
+    """Forget that ``email`` was free, e.g. once a user registers it."""
+    cache.delete(_email_key(get_user_model().objects.normalize_email(email)))
+
+
+def clear_local():
+    """Empty the in-process LRU."""
+    _local.clear()
+
+
+def stats():
+    """
+    Return hit and miss counters for this process.
+
+    Returns:
+        dict: Counters plus the local hit ratio and current LRU size
+    """
+    with _stats_lock:
+        data = dict(_stats)
+
+    lookups = data['local_hits'] + data['shared_hits'] + data['misses']
+    data['hit_ratio'] = round((data['local_hits'] + data['shared_hits']) / lookups, 4) if lookups else None
+    data['local_size'] = len(_local)
+    return data
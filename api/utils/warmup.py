@@ -0,0 +1,139 @@
+"""
+Cache warmup before an instance takes traffic.
+
+``run`` fills the in-process state that the first requests would otherwise
+pay for:
+
+* ``urls``: builds the URL resolver (imports every view and serializer);
+* ``database``: opens a connection per alias and runs ``SELECT 1``;
+* ``token_revocation``: replays the shared revocation log into this
+  process's Bloom filter;
+* ``analytics``: builds the columnar sales snapshot of ``/reportes/pivot/``
+  (off by default; it reads every sale line).
+
+``config.wsgi`` and ``config.asgi`` call it when ``WARMUP['ON_START']`` is
+set. Under ``gunicorn --preload`` that happens once in the master before it
+binds the port, and the workers inherit the warm state when they fork.
+Connections are closed afterwards so that no worker shares one.
+
+``state`` is reported by the readiness probe. While warmup is running the
+instance is not ready. A failed task is logged and leaves the instance
+ready but ``degraded``.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('api.warmup')
+
+DEFAULTS = {
+    'ON_START': False,
+    'TASKS': ('urls', 'database', 'token_revocation'),
+}
+
+
+def _get_setting(name):
+    return getattr(settings, 'WARMUP', {}).get(name, DEFAULTS[name])
+
+
+def _warm_urls():
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns  # noqa: B018, imports the URLconf and every view
+    get_resolver().reverse_dict  # noqa: B018
+
+
+def _warm_database():
+    for alias in connections:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+
+
+def _warm_token_revocation():
+    from . import token_revocation
+
+    token_revocation._sync()
+
+
+def _warm_analytics():
+    from ..services import analytics
+
+    analytics.get_snapshot()
+
+
+TASKS = {
+    'urls': _warm_urls,
+    'database': _warm_database,
+    'token_revocation': _warm_token_revocation,
+    'analytics': _warm_analytics,
+}
+
+_lock = threading.Lock()
+_state = {'status': None, 'tasks': {}, 'seconds': None}
+
+
+def state():
+    """
+    Return the warmup status.
+
+    Returns:
+        dict: ``status`` (None if warmup never ran, ``running``, ``ok`` or
+        ``error``), per-task results and total seconds
+    """
+    with _lock:
+        return {'status': _state['status'], 'tasks': dict(_state['tasks']), 'seconds': _state['seconds']}
+
+
+def run(tasks=None):
+    """
+    Run the warmup tasks in order; a failing task does not stop the others.
+
+    Args:
+        tasks (iterable): Task names; ``WARMUP['TASKS']`` if None
+
+    Returns:
+        dict: The final ``state()``
+    """
+    tasks = tuple(tasks if tasks is not None else _get_setting('TASKS'))
+    with _lock:
+        _state.update(status='running', tasks={}, seconds=None)
+
+    started = time.perf_counter()
+    failed = False
+    try:
+        for name in tasks:
+            task_started = time.perf_counter()
+            try:
+                TASKS[name]()
+                result = {'status': 'ok', 'error': None}
+            except Exception as exc:
+                logger.exception('Warmup task %s failed', name)
+                failed = True
+                result = {'status': 'error', 'error': f'{type(exc).__name__}: {exc}'}
+            result['ms'] = round((time.perf_counter() - task_started) * 1000, 1)
+            with _lock:
+                _state['tasks'][name] = result
+    finally:
+        # Forked workers must not share the connections opened here, nor a
+        # connection pool holding them.
+        connections.close_all()
+        for connection in connections.all(initialized_only=True):
+            # Only PostgreSQL with OPTIONS['pool'] (DB_POOL) keeps pools here.
+            if connection.alias in getattr(connection, '_connection_pools', ()):
+                connection.close_pool()
+        seconds = round(time.perf_counter() - started, 3)
+        with _lock:
+            _state.update(status='error' if failed else 'ok', seconds=seconds)
+
+    logger.info('Warmup finished in %.3f s: %s', seconds, state()['tasks'])
+    return state()
+
+
+def run_on_start():
+    """Run the warmup if ``WARMUP['ON_START']`` is set (called at server startup)."""
+    if _get_setting('ON_START'):
+        run()
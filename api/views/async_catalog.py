@@ -0,0 +1,239 @@
+"""
+Async versions of the hot catalog read endpoints.
+
+Served instead of the DRF viewsets when ``ASYNC_CATALOG_VIEWS`` is enabled
+(the ASGI profile in ``start.sh``). Only GET/HEAD requests run here; any
+other method is handed to the regular viewset through ``sync_to_async``, so
+writes keep their DRF behavior.
+
+Querysets are still built by the viewsets (filters, search, ordering and
+visibility rules stay in one place). Building a queryset runs no queries;
+the rows are then fetched with the async ORM. Everything the serializers
+read is loaded up front (``select_related``, ``with_disponibilidad`` and
+prefetches), so serialization runs on the event loop without queries.
+A serializer that did query would raise ``SynchronousOnlyOperation``
+instead of silently blocking the loop.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Prefetch, Q
+from django.http import HttpResponse
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import APIView
+
+from ..authentication import USER_CLAIM_FIELDS, ClaimsUser, CustomJWTAuthentication
+from ..models import Carrito, CarritoItem, CategoriaPaquete, Paquete
+from ..serializers.carrito import CarritoSerializer
+from ..serializers.paquete import CategoriaPaqueteSerializer, PaqueteSerializer
+from .base import StandardResultsSetPagination
+from .carritos import CarritoViewSet
+from .paquetes import CategoriaPaqueteViewSet, PaqueteViewSet
+
+_authentication = CustomJWTAuthentication()
+# Only used for its DEFAULT_THROTTLE_CLASSES; check_throttles keeps no state.
+_throttling_view = APIView()
+_renderer = JSONRenderer()
+
+
+def _json(data, status=200):
+    return HttpResponse(_renderer.render(data), status=status, content_type='application/json')
+
+
+def _error(exc):
+    response = _json({'detail': exc.detail}, status=exc.status_code)
+    if isinstance(exc, exceptions.NotAuthenticated):
+        response['WWW-Authenticate'] = _authentication.authenticate_header(None)
+    if getattr(exc, 'wait', None):
+        response['Retry-After'] = '%d' % exc.wait
+    return response
+
+
+async def _authenticate(request, claims_only):
+    """
+    Authenticate a Django request with the API's JWT authentication, then
+    apply the default throttles to the authenticated user.
+
+    Returns:
+        The user, a ``ClaimsUser`` when ``claims_only`` is set, or None
+        if the request carries no token
+
+    Raises:
+        InvalidToken, AuthenticationFailed: As ``CustomJWTAuthentication``
+        Throttled: If one of the default throttles rejects the user
+    """
+    header = _authentication.get_header(request)
+    raw_token = _authentication.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+
+    token = await sync_to_async(_authentication.get_validated_token)(raw_token)
+    if claims_only and getattr(settings, 'JWT_CLAIMS_ONLY_AUTH', True):
+        user = ClaimsUser(token)
+        if not all(field in token.payload for field in USER_CLAIM_FIELDS):
+            # Tokens issued before the claims were added: load the user
+            # now rather than lazily on the event loop.
+            await sync_to_async(user.get_user)()
+    else:
+        user = await sync_to_async(_authentication.get_user)(token)
+
+    await sync_to_async(_check_throttles)(request, user)
+    return user
+
+
+def _check_throttles(request, user):
+    """Apply the default DRF throttles, as the viewsets do after authenticating."""
+    drf_request = Request(request)
+    drf_request.user = user
+    _throttling_view.check_throttles(drf_request)
+
+
+def _viewset(viewset_class, request, user, action, kwargs):
+    """Set up a viewset instance to build querysets for ``request``."""
+    viewset = viewset_class(action_map={'get': action, 'head': action}, kwargs=kwargs, format_kwarg=None)
+    drf_request = viewset.initialize_request(request, **kwargs)
+    drf_request.user = user
+    viewset.request = drf_request
+    viewset.args = ()
+    return viewset
+
+
+async def _paginate(request, drf_request, queryset):
+    """Async equivalent of ``StandardResultsSetPagination``."""
+    pagination = StandardResultsSetPagination()
+    page_size = pagination.get_page_size(drf_request)
+
+    try:
+        page_number = int(request.GET.get(pagination.page_query_param, 1))
+    except ValueError:
+        raise exceptions.NotFound(pagination.invalid_page_message)
+
+    count = await queryset.acount()
+    num_pages = max(1, -(-count // page_size))
+    if page_number < 1 or page_number > num_pages:
+        raise exceptions.NotFound(pagination.invalid_page_message)
+
+    offset = (page_number - 1) * page_size
+    page = [obj async for obj in queryset[offset:offset + page_size]]
+
+    url = request.build_absolute_uri()
+    next_url = replace_query_param(url, pagination.page_query_param, page_number + 1) \
+        if page_number < num_pages else None
+    if page_number <= 1:
+        previous_url = None
+    elif page_number == 2:
+        previous_url = remove_query_param(url, pagination.page_query_param)
+    else:
+        previous_url = replace_query_param(url, pagination.page_query_param, page_number - 1)
+
+    return page, {'count': count, 'next': next_url, 'previous': previous_url}
+
+
+def _with_sync_fallback(sync_view):
+    """Run GET/HEAD asynchronously and send other methods to ``sync_view``."""
+    def decorator(handler):
+        async def view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await sync_to_async(sync_view)(request, *args, **kwargs)
+            try:
+                return await handler(request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return _error(exc)
+        view.csrf_exempt = True
+        view.__name__ = handler.__name__
+        view.__doc__ = handler.__doc__
+        return view
+    return decorator
+
+
+@_with_sync_fallback(PaqueteViewSet.as_view({'get': 'list', 'post': 'create'}))
+async def paquete_list(request):
+    """List packages, with the same filters, search and ordering as the viewset."""
+    user = await _authenticate(request, claims_only=True)
+    if user is None:
+        raise exceptions.NotAuthenticated()
+
+    viewset = _viewset(PaqueteViewSet, request, user, 'list', {})
+    page, data = await _paginate(request, viewset.request, viewset.filter_queryset(viewset.get_queryset()))
+    data['results'] = PaqueteSerializer(page, many=True, context={'request': viewset.request}).data
+    return _json(data)
+
+
+@_with_sync_fallback(PaqueteViewSet.as_view({
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy',
+}))
+async def paquete_detail(request, pk):
+    """Retrieve one package."""
+    user = await _authenticate(request, claims_only=True)
+    if user is None:
+        raise exceptions.NotAuthenticated()
+
+    viewset = _viewset(PaqueteViewSet, request, user, 'retrieve', {'pk': pk})
+    try:
+        paquete = await viewset.get_queryset().aget(pk=pk)
+    except Paquete.DoesNotExist:
+        raise exceptions.NotFound()
+
+    return _json(PaqueteSerializer(paquete, context={'request': viewset.request}).data)
+
+
+@_with_sync_fallback(PaqueteViewSet.as_view({'get': 'destacados'}))
+async def paquete_destacados(request):
+    """List featured packages."""
+    user = await _authenticate(request, claims_only=True)
+    if user is None:
+        raise exceptions.NotAuthenticated()
+
+    viewset = _viewset(PaqueteViewSet, request, user, 'destacados', {})
+    queryset = viewset.get_queryset().filter(destacado=True, is_active=True)
+    page, data = await _paginate(request, viewset.request, queryset)
+    data['results'] = PaqueteSerializer(page, many=True, context={'request': viewset.request}).data
+    return _json(data)
+
+
+@_with_sync_fallback(PaqueteViewSet.as_view({'get': 'categorias'}))
+async def paquete_categorias(request):
+    """List categories that have active packages."""
+    user = await _authenticate(request, claims_only=True)
+    if user is None:
+        raise exceptions.NotAuthenticated()
+
+    categories = CategoriaPaquete.objects.annotate(
+        paquetes_count=Count('paquetes', filter=Q(paquetes__is_active=True))
+    ).filter(paquetes_count__gt=0).order_by('nombre')
+    categories = [categoria async for categoria in categories]
+    return _json(CategoriaPaqueteSerializer(categories, many=True).data)
+
+
+@_with_sync_fallback(CategoriaPaqueteViewSet.as_view({'get': 'list', 'post': 'create'}))
+async def categoria_list(request):
+    """List package categories, with the viewset's search and ordering."""
+    user = await _authenticate(request, claims_only=True)
+    if user is None:
+        raise exceptions.NotAuthenticated()
+
+    viewset = _viewset(CategoriaPaqueteViewSet, request, user, 'list', {})
+    queryset = viewset.filter_queryset(viewset.get_queryset())
+    page, data = await _paginate(request, viewset.request, queryset)
+    data['results'] = CategoriaPaqueteSerializer(page, many=True, context={'request': viewset.request}).data
+    return _json(data)
+
+
+@_with_sync_fallback(CarritoViewSet.as_view({'get': 'mi_carrito'}))
+async def mi_carrito(request):
+    """Return the authenticated user's cart with its items."""
+    user = await _authenticate(request, claims_only=False)
+    if user is None:
+        raise exceptions.NotAuthenticated()
+
+    items = CarritoItem.objects.prefetch_related(
+        Prefetch('paquete', queryset=Paquete.objects.select_related('categoria').with_disponibilidad())
+    )
+    try:
+        cart = await Carrito.objects.prefetch_related(Prefetch('items', queryset=items)).aget(usuario=user)
+    except Carrito.DoesNotExist:
+        raise exceptions.NotFound()
+
+    return _json(CarritoSerializer(cart, context={'request': request}).data)
@@ -10,6 +10,8 @@ from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework import serializers
 
+from ..authentication import UserClaimsRefreshToken
+from ..utils import token_revocation
 from ..serializers.usuario import (
     UsuarioSerializer, 
     AuthTokenSerializer,
@@ -30,7 +32,7 @@ class RegisterView(generics.CreateAPIView):
         user = serializer.save()
         
         # Generate tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = UserClaimsRefreshToken.for_user(user)
         
         return Response({
             'refresh': str(refresh),
@@ -44,14 +46,16 @@ class LoginView(TokenObtainPairView):
     permission_classes = [permissions.AllowAny]
 
 class LogoutView(APIView):
-    """Logout a user by blacklisting their refresh token."""
+    """Logout a user by revoking their refresh token and the current access token."""
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request):
         try:
             refresh_token = request.data["refresh"]
             token = RefreshToken(refresh_token)
-            token.blacklist()
+            token_revocation.revoke(token)
+            if request.auth is not None:
+                token_revocation.revoke(request.auth)
             return Response(status=status.HTTP_205_RESET_CONTENT)
         except Exception as e:
             return Response(
@@ -65,7 +69,8 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
-        return self.request.user
+        # request.user only carries the cached authentication fields.
+        return Usuario.objects.get(pk=self.request.user.pk)
 
 class CustomTokenObtainPairSerializer(BaseCustomTokenObtainPairSerializer):
     def validate(self, attrs):
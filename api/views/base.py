@@ -7,6 +7,8 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, SAFE_METHODS
 from rest_framework.pagination import PageNumberPagination
 
+from ..utils import db_routing, instrumentation
+
 class StandardResultsSetPagination(PageNumberPagination):
     """Standard pagination class for API views."""
     page_size = 10
@@ -16,9 +18,39 @@ class StandardResultsSetPagination(PageNumberPagination):
 class BaseViewSet(viewsets.ModelViewSet):
     """
     Base ViewSet that includes default pagination and permission classes.
+    
+    ``query_budget`` is the most queries an action may run: an int for
+    every action or a dict keyed by action name. Requests over budget are
+    reported by ``api.utils.instrumentation``.
     """
     pagination_class = StandardResultsSetPagination
     permission_classes = [IsAuthenticated]
+    query_budget = None
+    
+    def get_query_budget(self):
+        """Return the query budget for the current action, or None."""
+        if isinstance(self.query_budget, dict):
+            return self.query_budget.get(self.action)
+        return self.query_budget
+    
+    def initial(self, request, *args, **kwargs):
+        """
+        Record the action for instrumentation and route the request's reads
+        to a replica for read-only actions.
+        """
+        instrumentation.set_view(type(self).__name__, self.action, self.get_query_budget())
+        super().initial(request, *args, **kwargs)
+        if (request.method in SAFE_METHODS
+                and self.action in db_routing.REPLICA_READ_ACTIONS
+                and db_routing.can_use_replicas(request.user)):
+            self._replica_token = db_routing.enable_replicas()
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            db_routing.reset_replicas(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
     
     def get_permissions(self):
         """
@@ -38,6 +70,14 @@ class BaseViewSet(viewsets.ModelViewSet):
             
         return [permission() for permission in permission_classes]
     
+    def get_serializer(self, *args, **kwargs):
+        """
+        Return a serializer whose representation time is instrumented.
+        """
+        serializer_class = instrumentation.timed_serializer(self.get_serializer_class())
+        kwargs.setdefault('context', self.get_serializer_context())
+        return serializer_class(*args, **kwargs)
+    
     def get_serializer_context(self):
         """
         Extra context provided to the serializer class.
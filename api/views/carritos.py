@@ -5,6 +5,7 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 
 from ..models import Carrito, CarritoItem, Paquete
@@ -15,6 +16,8 @@ class CarritoViewSet(BaseViewSet):
     """ViewSet for managing shopping carts."""
     serializer_class = CarritoSerializer
     permission_classes = [IsAuthenticated]
+    # cart + items + paquetes + the context's cart lookup, plus a user lookup
+    query_budget = {'mi_carrito': 5}
     
     def get_queryset(self):
         """Return the current user's cart."""
@@ -32,7 +35,14 @@ class CarritoViewSet(BaseViewSet):
     @action(detail=False, methods=['get'])
     def mi_carrito(self, request):
         """Get the current user's cart."""
-        cart = get_object_or_404(Carrito, usuario=request.user)
+        # Items and their packages in two queries, not several per item
+        items = CarritoItem.objects.prefetch_related(
+            Prefetch('paquete', queryset=Paquete.objects.select_related('categoria').with_disponibilidad())
+        )
+        cart = get_object_or_404(
+            Carrito.objects.prefetch_related(Prefetch('items', queryset=items)),
+            usuario=request.user
+        )
         serializer = self.get_serializer(cart)
         return Response(serializer.data)
     
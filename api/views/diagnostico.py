@@ -0,0 +1,54 @@
+"""
+Diagnostic views for staff users.
+"""
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..utils import db_pool, email_templates, hashing_pool, slow_queries, token_revocation, user_cache
+
+
+class CacheStatsView(APIView):
+    """Return the hit and miss counters of the in-process caches."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'usuarios': user_cache.stats(),
+            'revocaciones': token_revocation.stats(),
+            'hashing': hashing_pool.stats(),
+            'emails': email_templates.stats(),
+            'base_de_datos': db_pool.stats(),
+        })
+
+
+class SlowQueriesView(APIView):
+    """
+    List the slowest captured queries grouped by normalized SQL.
+
+    Query parameters: ``orden`` (``total_ms``, ``max_ms`` or ``count``) and
+    ``limite``.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        order_by = request.query_params.get('orden', 'total_ms')
+        if order_by not in ('total_ms', 'max_ms', 'count'):
+            return Response(
+                {'error': 'El parámetro orden debe ser total_ms, max_ms o count.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = max(1, min(int(request.query_params.get('limite', 20)), 100))
+        except ValueError:
+            return Response(
+                {'error': 'El parámetro limite debe ser un número entero.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({
+            'umbral_ms': slow_queries._get_setting('THRESHOLD_MS'),
+            'capturadas': len(slow_queries.entries()),
+            'consultas': slow_queries.top(limit=limit, order_by=order_by),
+        })
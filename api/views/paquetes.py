@@ -17,17 +17,23 @@ from .base import BaseViewSet
 
 class CategoriaPaqueteViewSet(BaseViewSet):
     """ViewSet for managing package categories."""
+    claims_only_auth = True
     queryset = CategoriaPaquete.objects.all()
     serializer_class = CategoriaPaqueteSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['nombre', 'descripcion']
     ordering_fields = ['nombre', 'created_at']
     ordering = ['nombre']
+    # count + page, plus a user lookup when the token has no claims
+    query_budget = {'list': 3, 'retrieve': 2}
 
 class PaqueteViewSet(BaseViewSet):
     """ViewSet for managing tour packages."""
+    claims_only_auth = True
     queryset = Paquete.objects.select_related('categoria').all()
     serializer_class = PaqueteSerializer
+    # count + page, plus a user lookup when the token has no claims
+    query_budget = {'list': 3, 'retrieve': 2, 'destacados': 3, 'categorias': 2}
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = {
         'categoria': ['exact'],
@@ -53,7 +59,8 @@ class PaqueteViewSet(BaseViewSet):
         if categoria_nombre:
             queryset = queryset.filter(categoria__nombre__iexact=categoria_nombre)
         
-        return queryset
+        # Sold count for disponibilidad/disponible without a query per package
+        return queryset.with_disponibilidad()
     
     @action(detail=True, methods=['post'], parser_classes=[MultiPartParser, FormParser])
     def upload_image(self, request, pk=None):
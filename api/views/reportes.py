@@ -0,0 +1,48 @@
+"""
+Reporting views for the admin dashboard.
+"""
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..services import analytics
+
+
+class PivotView(APIView):
+    """
+    Group sale lines by one or two dimensions from the in-memory snapshot.
+
+    Query parameters: ``filas`` and ``columnas`` (categoria, dificultad,
+    metodo_pago, estado, mes), ``medida`` (importe, cantidad, lineas),
+    comma-separated ``categoria``, ``dificultad``, ``metodo_pago`` and
+    ``estado`` filters, and ``desde``/``hasta`` months (YYYY-MM).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        params = request.query_params
+
+        try:
+            filtros = {
+                nombre: [v.strip() for v in params[nombre].split(',') if v.strip()]
+                for nombre in ('categoria', 'dificultad', 'metodo_pago', 'estado')
+                if params.get(nombre)
+            }
+            if params.get('desde'):
+                filtros['desde'] = analytics.parse_mes(params['desde'])
+            if params.get('hasta'):
+                filtros['hasta'] = analytics.parse_mes(params['hasta'])
+
+            snapshot = analytics.get_snapshot()
+            data = snapshot.pivot(
+                filas=params.get('filas', 'categoria'),
+                columnas=params.get('columnas') or None,
+                medida=params.get('medida', 'importe'),
+                filtros=filtros,
+            )
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        data['snapshot'] = snapshot.stats()
+        return Response(data)
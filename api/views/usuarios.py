@@ -7,11 +7,13 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
 
+from ..authentication import clear_token_cache
 from ..models import Usuario
 from ..serializers.usuario import (
     UsuarioSerializer,
     UsuarioProfileSerializer
 )
+from ..utils import user_cache
 from .base import BaseViewSet
 
 class UsuarioViewSet(BaseViewSet):
@@ -43,13 +45,17 @@ class UsuarioViewSet(BaseViewSet):
         """
         Retrieve the authenticated user's profile.
         """
-        serializer = self.get_serializer(request.user)
+        # request.user only carries the cached authentication fields.
+        serializer = self.get_serializer(self.queryset.get(pk=request.user.pk))
         return Response(serializer.data)
     
     @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
     def check_email(self, request):
         """
         Check if an email is already registered.
+        
+        Emails are stored lowercased, so this is an exact index lookup;
+        emails found to be free are cached briefly by ``user_cache``.
         """
         email = request.data.get('email')
         if not email:
@@ -58,7 +64,7 @@ class UsuarioViewSet(BaseViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        exists = Usuario.objects.filter(email__iexact=email).exists()
+        exists = user_cache.is_email_registered(email)
         return Response({'exists': exists}, status=status.HTTP_200_OK)
     
     @action(detail=False, methods=['post'])
@@ -90,6 +96,8 @@ class UsuarioViewSet(BaseViewSet):
         
         user.set_password(new_password)
         user.save()
+        user_cache.invalidate(user.pk)
+        clear_token_cache()
         
         # Invalidate all tokens
         RefreshToken.for_user(user)
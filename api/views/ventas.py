@@ -4,24 +4,36 @@ Sales related views.
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.db.models import Prefetch
 
-from ..models import Venta, Carrito
+from ..models import Venta, VentaDetalle, Carrito, Paquete
 from ..serializers.venta import VentaSerializer, ConfirmarPagoSerializer
+from ..services import ventas_export
 from .base import BaseViewSet
 
 class VentaViewSet(BaseViewSet):
     """ViewSet for managing sales."""
     serializer_class = VentaSerializer
     permission_classes = [IsAuthenticated]
+    # count + page + items + paquetes, plus a user lookup
+    query_budget = {'list': 5, 'mis_compras': 5, 'retrieve': 4}
     
     def get_queryset(self):
         """Return sales for the current user or all sales for staff."""
+        # Items, their packages and availability are loaded in two queries
+        # instead of several per sale (total, cantidad_items, nested paquete)
+        queryset = Venta.objects.prefetch_related(
+            Prefetch('items', queryset=VentaDetalle.objects.prefetch_related(
+                Prefetch('paquete', queryset=Paquete.objects.select_related('categoria').with_disponibilidad())
+            ))
+        )
         if self.request.user.is_staff:
-            return Venta.objects.all()
-        return Venta.objects.filter(usuario=self.request.user)
+            return queryset
+        return queryset.filter(usuario=self.request.user)
     
     def get_serializer_context(self):
         """Add the cart to the serializer context."""
@@ -121,3 +133,37 @@ class VentaViewSet(BaseViewSet):
         
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def exportar(self, request):
+        """
+        Stream all sales with their lines as CSV or NDJSON.
+        
+        Query parameters: ``formato`` (csv|ndjson), ``desde`` and ``hasta``
+        (YYYY-MM-DD), ``estado`` (comma-separated) and ``gzip`` (1/true).
+        """
+        formato = request.query_params.get('formato', 'csv').lower()
+        comprimir = request.query_params.get('gzip', '').lower() in ('1', 'true', 'si')
+        
+        if formato not in ventas_export.FORMATOS:
+            return Response(
+                {'formato': [f"Formato no soportado. Opciones: {', '.join(ventas_export.FORMATOS)}."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            filtros = ventas_export.parse_filtros(
+                desde=request.query_params.get('desde'),
+                hasta=request.query_params.get('hasta'),
+                estado=request.query_params.get('estado'),
+            )
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        response = StreamingHttpResponse(
+            ventas_export.iter_export(formato=formato, comprimir=comprimir, **filtros),
+            content_type=ventas_export.export_content_type(formato, comprimir)
+        )
+        filename = ventas_export.export_filename(formato, comprimir)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# Fill in-process caches before serving; with gunicorn --preload this runs
+# once in the master and the workers fork warm (see api.utils.warmup).
+from api.utils import warmup  # noqa: E402, needs the app registry
+
+warmup.run_on_start()
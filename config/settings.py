@@ -54,8 +54,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.instrumentation.RequestInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'api.middleware.static.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,6 +64,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.throttling.ConcurrencyReleaseMiddleware',
+    'api.middleware.db_routing.ReplicaStickinessMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -89,11 +92,33 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
 # PostgreSQL configuration for Railway (production)
+# Connection reuse for the production database (see api/utils/db_pool.py):
+# DB_POOL=True uses Django's psycopg 3 connection pool; otherwise each
+# thread keeps one persistent connection for DB_CONN_MAX_AGE seconds and
+# checks it is still usable before reusing it.
+DB_POOL = os.getenv('DB_POOL', 'False') == 'True'
+
 if os.getenv('DATABASE_URL'):
     import dj_database_url
-    DATABASES = {
-        'default': dj_database_url.parse(os.getenv('DATABASE_URL'))
-    }
+    if DB_POOL:
+        # The pool owns connection lifetimes; Django must close them after each request
+        DATABASES = {
+            'default': dj_database_url.parse(os.getenv('DATABASE_URL'), conn_max_age=0)
+        }
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '300')),
+        }
+    else:
+        DATABASES = {
+            'default': dj_database_url.parse(
+                os.getenv('DATABASE_URL'),
+                conn_max_age=int(os.getenv('DB_CONN_MAX_AGE', '600')),
+                conn_health_checks=True,
+            )
+        }
 else:
     # SQLite database for development
     DATABASES = {
@@ -103,6 +128,31 @@ else:
         }
     }
 
+# Read replicas: comma-separated database URLs, added as replica_1, replica_2...
+# Read-only actions are routed to them by api.utils.db_routing.ReadReplicaRouter
+for _index, _url in enumerate(filter(None, os.getenv('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    import dj_database_url
+    DATABASES[f'replica_{_index}'] = dj_database_url.parse(
+        _url.strip(),
+        conn_max_age=int(os.getenv('DB_CONN_MAX_AGE', '600')),
+        conn_health_checks=True,
+    )
+    # Tests run against the primary's test database
+    DATABASES[f'replica_{_index}']['TEST'] = {'MIRROR': 'default'}
+
+# Bound PostgreSQL connection attempts, so that an unreachable server fails
+# requests and readiness probes quickly instead of waiting on TCP timeouts
+for _database in DATABASES.values():
+    if _database['ENGINE'] == 'django.db.backends.postgresql':
+        _database.setdefault('OPTIONS', {}).setdefault('connect_timeout', int(os.getenv('DB_CONNECT_TIMEOUT', '5')))
+
+DATABASE_ROUTERS = ['api.utils.db_routing.ReadReplicaRouter']
+
+DATABASE_REPLICA_ROUTING = {
+    # Seconds a user's reads stay on the primary after one of their writes
+    'STICKY_SECONDS': int(os.getenv('DB_REPLICA_STICKY_SECONDS', '5')),
+}
+
 # Uncomment to use PostgreSQL in production
 # DATABASES = {
 #     'default': {
@@ -171,14 +221,40 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework settings
 REST_FRAMEWORK = {
+    'EXCEPTION_HANDLER': 'api.utils.api_response.exception_handler',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CustomJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 10
+    'PAGE_SIZE': 10,
+    # Throttles from api.utils.throttling applied to every DRF view. Turn them
+    # off (THROTTLING_ENABLED=False) on a server under benchmark_api or
+    # loadtest_catalog.
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.utils.throttling.AnonBurstRateThrottle',
+        'api.utils.throttling.AnonSustainedRateThrottle',
+        'api.utils.throttling.UserBurstRateThrottle',
+        'api.utils.throttling.UserSustainedRateThrottle',
+        'api.utils.throttling.ConcurrentRequestThrottle',
+    ] if os.getenv('THROTTLING_ENABLED', 'True') == 'True' else [],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon_burst': os.getenv('THROTTLE_ANON_BURST', '60/min'),
+        'anon_sustained': os.getenv('THROTTLE_ANON_SUSTAINED', '1000/day'),
+        'user_burst': os.getenv('THROTTLE_USER_BURST', '120/min'),
+        'user_sustained': os.getenv('THROTTLE_USER_SUSTAINED', '10000/day'),
+        'user': os.getenv('THROTTLE_USER', '1000/hour'),
+        'concurrent': os.getenv('THROTTLE_CONCURRENT', '10/min'),
+    },
+}
+
+# In-process token buckets for the anon_burst and user_burst throttles
+THROTTLE_LOCAL_BUCKETS = {
+    'SYNC_SECONDS': float(os.getenv('THROTTLE_LOCAL_SYNC_SECONDS', 1.0)),
+    'SYNC_FRACTION': float(os.getenv('THROTTLE_LOCAL_SYNC_FRACTION', 0.1)),
+    'MAX_KEYS': int(os.getenv('THROTTLE_LOCAL_MAX_KEYS', 10_000)),
 }
 
 # JWT Settings
@@ -186,7 +262,179 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': True,
-    'BLACKLIST_AFTER_ROTATION': True,
+    # Rotated refresh tokens are revoked through api.utils.token_revocation
+    'BLACKLIST_AFTER_ROTATION': False,
+    'TOKEN_REFRESH_SERIALIZER': 'api.serializers.usuario.UserClaimsTokenRefreshSerializer',
+}
+
+# Route catalog reads to the async views in api.views.async_catalog (ASGI profile)
+ASYNC_CATALOG_VIEWS = os.getenv('ASYNC_CATALOG_VIEWS', 'False') == 'True'
+
+# Serve safe-method requests on views with claims_only_auth from token claims
+JWT_CLAIMS_ONLY_AUTH = os.getenv('JWT_CLAIMS_ONLY_AUTH', 'True') == 'True'
+
+# Shared cache for token revocation, the user cache, throttle counters and
+# replica stickiness. Every process must see the same cache, so production
+# sets REDIS_URL; without it each process gets its own LocMemCache.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'oniet'),
+            # Fail fast instead of hanging request and probe threads on a dead server
+            'OPTIONS': {
+                'socket_connect_timeout': float(os.getenv('CACHE_SOCKET_TIMEOUT', '2')),
+                'socket_timeout': float(os.getenv('CACHE_SOCKET_TIMEOUT', '2')),
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# User resolution cache used by CustomJWTAuthentication
+USER_CACHE = {
+    'LOCAL_MAXSIZE': int(os.getenv('USER_CACHE_LOCAL_MAXSIZE', 2048)),
+    'LOCAL_TIMEOUT': int(os.getenv('USER_CACHE_LOCAL_TIMEOUT', 30)),
+    'SHARED_TIMEOUT': int(os.getenv('USER_CACHE_SHARED_TIMEOUT', 5 * 60)),
+    'EMAIL_NEGATIVE_TIMEOUT': int(os.getenv('USER_CACHE_EMAIL_NEGATIVE_TIMEOUT', 30)),
+}
+
+# Validated access tokens kept in memory until they expire
+TOKEN_CACHE = {
+    'MAXSIZE': int(os.getenv('TOKEN_CACHE_MAXSIZE', 4096)),
+}
+
+# Bounded pool for password hashing (see api.utils.hashing_pool)
+PASSWORD_HASHING_POOL = {
+    'ENABLED': os.getenv('PASSWORD_HASHING_POOL_ENABLED', 'True') == 'True',
+    'MAX_WORKERS': int(os.getenv('PASSWORD_HASHING_POOL_WORKERS', 2)),
+    'MAX_QUEUE': int(os.getenv('PASSWORD_HASHING_POOL_QUEUE', 8)),
+    'TIMEOUT': float(os.getenv('PASSWORD_HASHING_POOL_TIMEOUT', 10)),
+}
+
+# Cache-backed token revocation (see api.utils.token_revocation)
+TOKEN_REVOCATION = {
+    'BLOOM_CAPACITY': int(os.getenv('TOKEN_REVOCATION_BLOOM_CAPACITY', 100_000)),
+    'BLOOM_ERROR_RATE': float(os.getenv('TOKEN_REVOCATION_BLOOM_ERROR_RATE', 0.001)),
+    'SYNC_SECONDS': int(os.getenv('TOKEN_REVOCATION_SYNC_SECONDS', 5)),
+    # Log entries read per cache round trip, and how long a missing entry is retried
+    'SYNC_PAGE_SIZE': int(os.getenv('TOKEN_REVOCATION_SYNC_PAGE_SIZE', 1000)),
+    'GAP_TIMEOUT': int(os.getenv('TOKEN_REVOCATION_GAP_TIMEOUT', 60)),
+    # Refuse to start on a process-local cache; on by default in production
+    'REQUIRE_SHARED_CACHE': os.getenv(
+        'TOKEN_REVOCATION_REQUIRE_SHARED_CACHE', str(bool(os.getenv('DATABASE_URL')))
+    ) == 'True',
+}
+
+# Columnar sales snapshot used by /reportes/pivot/
+ANALYTICS_REFRESH_SECONDS = int(os.getenv('ANALYTICS_REFRESH_SECONDS', 30))
+ANALYTICS_FULL_REBUILD_SECONDS = int(os.getenv('ANALYTICS_FULL_REBUILD_SECONDS', 60 * 60))
+
+# Per-request metrics, Server-Timing header and query budgets
+# (see api.utils.instrumentation). The header exposes database timings and
+# query counts: SERVER_TIMING=True sends it on every response, 'staff' only
+# to staff users (the default outside DEBUG) and False never.
+_server_timing = os.getenv('SERVER_TIMING', 'True' if DEBUG else 'staff')
+INSTRUMENTATION = {
+    'ENABLED': os.getenv('INSTRUMENTATION_ENABLED', 'True') == 'True',
+    'SERVER_TIMING': _server_timing if _server_timing == 'staff' else _server_timing == 'True',
+    'LOG_REQUESTS': os.getenv('PERFORMANCE_LOG', 'True') == 'True',
+    # One line per request; dropped by the logger's INFO level unless raised.
+    'REQUEST_LOG_LEVEL': os.getenv('PERFORMANCE_LOG_REQUEST_LEVEL', 'DEBUG').upper(),
+    'FLAG_BUDGETS': DEBUG,
+    'STRICT_QUERY_BUDGETS': os.getenv('STRICT_QUERY_BUDGETS', 'False') == 'True',
+}
+
+# Readiness probes served at /health/ready/ (see api.utils.health)
+HEALTH_CHECKS = {
+    'TIMEOUT': float(os.getenv('HEALTH_CHECK_TIMEOUT', '2')),
+    'SLOW_MS': int(os.getenv('HEALTH_CHECK_SLOW_MS', '500')),
+    'TTL': float(os.getenv('HEALTH_CHECK_TTL', '5')),
+    'CRITICAL': ('database', 'cache'),
+}
+
+# Repeated query shapes per request (see api.utils.nplusone)
+NPLUSONE = {
+    'ENABLED': os.getenv('NPLUSONE_ENABLED', str(DEBUG)) == 'True',
+    'THRESHOLD': int(os.getenv('NPLUSONE_THRESHOLD', '5')),
+    'RAISE': os.getenv('NPLUSONE_RAISE', 'False') == 'True',
+}
+
+# Prometheus registry served at /metrics (see api.utils.metrics). Set
+# METRICS_DIR to aggregate gunicorn workers (start.sh and render.yaml do).
+# /metrics answers requests carrying METRICS_TOKEN as a bearer token, for
+# the scraper, or a staff user's access token.
+METRICS = {
+    'DIRECTORY': os.getenv('METRICS_DIR') or None,
+    'FLUSH_SECONDS': float(os.getenv('METRICS_FLUSH_SECONDS', '1')),
+    'TOKEN': os.getenv('METRICS_TOKEN', ''),
+    # Celery workers serve their own /metrics on this port (task metrics
+    # are recorded in the worker, not in the web process)
+    'WORKER_PORT': int(os.getenv('METRICS_WORKER_PORT', '0')) or None,
+}
+
+# Queries slower than THRESHOLD_MS are captured with call site and EXPLAIN
+# plan (see api.utils.slow_queries and /api/v1/diagnostico/consultas-lentas/)
+SLOW_QUERY_LOG = {
+    'ENABLED': os.getenv('SLOW_QUERY_LOG', 'True') == 'True',
+    'THRESHOLD_MS': int(os.getenv('SLOW_QUERY_THRESHOLD_MS', '200')),
+    'BUFFER_SIZE': int(os.getenv('SLOW_QUERY_BUFFER_SIZE', '500')),
+    'EXPLAIN': os.getenv('SLOW_QUERY_EXPLAIN', 'True') == 'True',
+}
+SLOW_QUERY_LOG_FILE = os.getenv('SLOW_QUERY_LOG_FILE', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+        'slow_queries': {
+            'class': 'logging.FileHandler',
+            'filename': SLOW_QUERY_LOG_FILE,
+        } if SLOW_QUERY_LOG_FILE else {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.performance': {
+            'handlers': ['console'],
+            'level': os.getenv('PERFORMANCE_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'api.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'api.warmup': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Startup steps skipped when unchanged (see api.utils.boot and manage.py boot)
+BOOT = {
+    'STATE_DIR': os.getenv('BOOT_STATE_DIR', os.path.join(BASE_DIR, '.boot')),
+    'LOCK_TIMEOUT': float(os.getenv('BOOT_LOCK_TIMEOUT', '600')),
+}
+
+# In-process caches filled before the server takes traffic; readiness waits
+# for them (see api.utils.warmup)
+WARMUP = {
+    'ON_START': os.getenv('WARMUP_ON_START', 'False') == 'True',
+    'TASKS': tuple(
+        task.strip() for task in os.getenv('WARMUP_TASKS', 'urls,database,token_revocation').split(',') if task.strip()
+    ),
 }
 
 # CORS Settings
@@ -198,7 +446,10 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # Email settings
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# For local runs use django.core.mail.backends.console.EmailBackend or
+# django.core.mail.backends.filebased.EmailBackend (writes to EMAIL_FILE_PATH)
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_FILE_PATH = os.getenv('EMAIL_FILE_PATH', os.path.join(BASE_DIR, 'tmp', 'emails'))
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.sendgrid.net')
 EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'
@@ -206,6 +457,25 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', 'apikey')
 EMAIL_HOST_PASSWORD = os.getenv('SENDGRID_API_KEY', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@oniet.com')
 
+# Batched delivery (see api.utils.email_utils.queue_emails)
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 100))
+EMAIL_MAX_RETRIES = int(os.getenv('EMAIL_MAX_RETRIES', 3))
+EMAIL_RETRY_BACKOFF = int(os.getenv('EMAIL_RETRY_BACKOFF', 60))
+
+# Email campaigns (see api.tasks.run_campaign)
+CAMPAIGN_CHUNK_SIZE = int(os.getenv('CAMPAIGN_CHUNK_SIZE', 2000))
+CAMPAIGN_BATCHES_PER_RUN = int(os.getenv('CAMPAIGN_BATCHES_PER_RUN', 50))
+
+# Celery (api/celery.py). The broker defaults to the shared Redis cache.
+# Without a broker, tasks run synchronously in the calling process instead
+# of being published to a broker nobody listens to.
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', REDIS_URL)
+CELERY_TASK_ALWAYS_EAGER = not CELERY_BROKER_URL
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TIMEZONE = TIME_ZONE
+
 # Custom user model
 AUTH_USER_MODEL = 'api.Usuario'
 
@@ -247,7 +517,7 @@ CORS_ALLOW_HEADERS = [
 ]
 
 # Configuración para manejar credenciales
-CORS_EXPOSE_HEADERS = ['Content-Type', 'X-CSRFToken']
+CORS_EXPOSE_HEADERS = ['Content-Type', 'X-CSRFToken', 'Server-Timing', 'X-Query-Budget-Exceeded', 'X-N-Plus-One']
 
 # Configuración de sesión para manejar CSRF
 CSRF_COOKIE_SAMESITE = 'Lax'
@@ -3,18 +3,24 @@ URL configuration for config project.
 
 Including the API URLs and serving media files in development.
 """
+import hmac
+
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from django.contrib.auth.hashers import make_password
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import InvalidToken
+from api.authentication import CustomJWTAuthentication, UserClaimsRefreshToken
+from api.utils import health, metrics
+from api.utils.hashing_pool import HashingPoolSaturated
 
 User = get_user_model()
 
@@ -22,6 +28,35 @@ def healthcheck(request):
     """Simple healthcheck endpoint for Railway deployment."""
     return JsonResponse({"status": "ok", "message": "ONIET API is running"})
 
+def liveness(request):
+    """The process is up and serving requests; checks no dependencies."""
+    return JsonResponse({"status": "ok"})
+
+def readiness(request):
+    """Whether this instance should receive traffic (see api.utils.health)."""
+    report = health.check()
+    return JsonResponse(report, status=200 if report['ready'] else 503)
+
+def _metrics_allowed(request):
+    """The ``METRICS['TOKEN']`` bearer token or a staff user's access token."""
+    token = settings.METRICS.get('TOKEN')
+    authorization = request.headers.get('Authorization', '')
+    if token and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode()):
+        return True
+    try:
+        authenticated = CustomJWTAuthentication().authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return False
+    return authenticated is not None and authenticated[0].is_staff
+
+def metrics_view(request):
+    """Prometheus metrics for every worker (see api.utils.metrics)."""
+    if not _metrics_allowed(request):
+        response = HttpResponse(status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def direct_login(request):
@@ -35,7 +70,7 @@ def direct_login(request):
         
         if user and user.check_password(password):
             # Generar tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = UserClaimsRefreshToken.for_user(user)
             access_token = str(refresh.access_token)
             
             return Response({
@@ -55,6 +90,8 @@ def direct_login(request):
                 'error': 'Credenciales inválidas'
             }, status=status.HTTP_401_UNAUTHORIZED)
             
+    except HashingPoolSaturated:
+        raise
     except Exception as e:
         return Response({
             'error': f'Error en login: {str(e)}'
@@ -183,6 +220,13 @@ urlpatterns = [
     # Healthcheck endpoint
     path('', healthcheck, name='healthcheck'),
     
+    # Liveness and readiness probes
+    path('health/live/', liveness, name='health_live'),
+    path('health/ready/', readiness, name='health_ready'),
+    
+    # Prometheus metrics
+    path('metrics', metrics_view, name='metrics'),
+    
     # Direct login endpoint
     path('direct-login/', direct_login, name='direct_login'),
     
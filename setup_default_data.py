@@ -2,111 +2,63 @@
 """
 Populate default categories and sample tour packages.
 Run: python setup_default_data.py
+
+Rows are written with bulk_create, one query per table. For large
+synthetic datasets use: python manage.py generate_data
 """
 import os
 import django
 import random
 from decimal import Decimal
-from datetime import date, timedelta
 
 # Configure Django settings
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
 from api.models import CategoriaPaquete, Paquete  # noqa: E402, after django.setup()
-
-# ------------------ Default Data ------------------ #
-CATEGORIES = [
-    ('aventura', 'Experiencias de aventura'),
-    ('playa', 'Vacaciones de playa'),
-    ('cultura', 'Viajes culturales'),
-    ('gastronomia', 'Rutas gastronómicas'),
-    ('naturaleza', 'Escapadas a la naturaleza'),
-    ('city_tour', 'Tours de ciudad'),
-    ('crucero', 'Cruceros y travesías'),
-    ('nieve', 'Destinos de nieve'),
-    ('safari', 'Safaris y fauna'),
-    ('relax', 'Bienestar y relax'),
-]
-
-ARG_DESTINOS = [
-    ('Bariloche', 'Aventura en la Patagonia'),
-    ('Mendoza', 'Rutas del vino'),
-    ('Iguazú', 'Cataratas imponentes'),
-    ('Salta', 'Paisajes del norte'),
-    ('Buenos Aires', 'City tour capitalino'),
-    ('Ushuaia', 'Fin del mundo'),
-    ('El Calafate', 'Glaciares majestuosos'),
-    ('Córdoba', 'Sierras y tradición'),
-]
-
-INTL_DESTINOS = [
-    ('Río de Janeiro', 'Playas y carnaval'),
-    ('Cartagena', 'Ciudad amurallada'),
-    ('Machu Picchu', 'Misterios incas'),
-    ('Cancún', 'Caribe mexicano'),
-    ('Nueva York', 'La Gran Manzana'),
-    ('París', 'Ciudad del amor'),
-    ('Roma', 'Historia eterna'),
-    ('Tokio', 'Tradición y tecnología'),
-    ('Madrid', 'Capital vibrante'),
-    ('Sídney', 'Iconos australianos'),
-]
+from api.services.datagen import CATEGORIAS, DESTINOS  # noqa: E402
 
 # --------------------------------------------------- #
 
 
 def create_categories():
-    for nombre, descripcion in CATEGORIES:
-        cat, created = CategoriaPaquete.objects.get_or_create(
-            nombre=nombre.capitalize(),
-            defaults={'descripcion': descripcion}
-        )
-        if created:
-            print(f"✅ Categoría creada: {cat.nombre}")
+    existentes = set(CategoriaPaquete.objects.values_list('nombre', flat=True))
+    nuevas = CategoriaPaquete.objects.bulk_create([
+        CategoriaPaquete(nombre=nombre, descripcion=descripcion)
+        for nombre, descripcion in CATEGORIAS if nombre not in existentes
+    ])
+    for cat in nuevas:
+        print(f"✅ Categoría creada: {cat.nombre}")
 
 
 def random_price():
     return Decimal(random.randint(50000, 250000))
 
 
-def random_dates():
-    start = date.today() + timedelta(days=random.randint(15, 120))
-    end = start + timedelta(days=random.randint(3, 10))
-    return start, end
-
-
 def create_sample_packages(quantity: int = 10):
-    all_destinos = ARG_DESTINOS + INTL_DESTINOS
     categorias = list(CategoriaPaquete.objects.all())
     if not categorias:
         print("⚠️ No hay categorías para asignar a los paquetes. Ejecute primero create_categories().")
         return
 
+    paquetes = []
     for i in range(quantity):
-        destino = random.choice(all_destinos)
-        nombre, descripcion = destino
-        precio = random_price()
-        duracion = random.randint(3, 14)
-        cupo_max = random.randint(10, 40)
-        fecha_inicio, fecha_fin = random_dates()
-        categoria = random.choice(categorias)
-
-        paquete, created = Paquete.objects.get_or_create(
+        nombre, descripcion = random.choice(DESTINOS)
+        paquetes.append(Paquete(
             nombre=f"{nombre} Experience {i+1}",
-            defaults={
-                'descripcion': descripcion,
-                'precio': precio,
-                'duracion_dias': duracion,
-                'cupo_maximo': cupo_max,
-                'fecha_inicio': fecha_inicio,
-                'fecha_fin': fecha_fin,
-                'destino': nombre,
-                'categoria': categoria,
-            }
-        )
-        if created:
-            print(f"✅ Paquete creado: {paquete.nombre} - {categoria.nombre}")
+            descripcion=descripcion,
+            precio=random_price(),
+            duracion_dias=random.randint(3, 14),
+            cupo_maximo=random.randint(10, 40),
+            categoria=random.choice(categorias),
+        ))
+
+    existentes = set(
+        Paquete.objects.filter(nombre__in=[p.nombre for p in paquetes]).values_list('nombre', flat=True)
+    )
+    nuevos = Paquete.objects.bulk_create([p for p in paquetes if p.nombre not in existentes])
+    for paquete in nuevos:
+        print(f"✅ Paquete creado: {paquete.nombre} - {paquete.categoria.nombre}")
 
 
 if __name__ == '__main__':
@@ -116,4 +68,4 @@ if __name__ == '__main__':
     print("📦 Creando paquetes de ejemplo...")
     create_sample_packages(10)
 
-    print("🎉 Datos iniciales cargados correctamente.") 
\ No newline at end of file
+    print("🎉 Datos iniciales cargados correctamente.")
@@ -8,22 +8,41 @@ echo "🚀 Starting ONIET Django application..."
 # Check if we're in production
 if [ -n "$DATABASE_URL" ]; then
     echo "📊 Production environment detected"
-    echo "🔧 Running database migrations..."
-    python3 manage.py migrate --noinput
-    
-    echo "📦 Collecting static files..."
-    python3 manage.py collectstatic --noinput
+    echo "🔧 Running startup steps (migrate, collectstatic, check --deploy; skipped when unchanged)..."
+    # Only one instance migrates; the others wait on the lock (see api/utils/boot.py)
+    python3 manage.py boot
     
-    echo "🔍 Running deployment checks..."
-    python3 manage.py check --deploy
+    # Caches are warmed in the gunicorn master (--preload) before the port is
+    # bound; /health/ready/ reports not ready while warmup runs
+    export WARMUP_ON_START=${WARMUP_ON_START:-True}
     
-    echo "⏳ Waiting 3 seconds before starting server..."
-    sleep 3
+    # Per-worker metric snapshots summed by /metrics; start empty
+    export METRICS_DIR=${METRICS_DIR:-/tmp/oniet-metrics}
+    rm -rf "$METRICS_DIR" && mkdir -p "$METRICS_DIR"
     
+    if [ "${SERVER_PROFILE:-wsgi}" = "asgi" ]; then
+        echo "🌐 Starting Gunicorn server (ASGI, uvicorn workers)..."
+        # Catalog reads are served by the async views in api/views/async_catalog.py
+        export ASYNC_CATALOG_VIEWS=True
+        exec gunicorn config.asgi:application \
+            --bind 0.0.0.0:$PORT \
+            --workers ${GUNICORN_WORKERS:-2} \
+            --worker-class uvicorn.workers.UvicornWorker \
+            --timeout 120 \
+            --preload \
+            --access-logfile - \
+            --error-logfile - \
+            --log-level info
+    fi
+
     echo "🌐 Starting Gunicorn server..."
+    # gthread workers keep serving other requests while password hashes run
+    # on the bounded pool in api/utils/hashing_pool.py
     exec gunicorn config.wsgi:application \
         --bind 0.0.0.0:$PORT \
-        --workers 2 \
+        --workers ${GUNICORN_WORKERS:-2} \
+        --worker-class gthread \
+        --threads ${GUNICORN_THREADS:-8} \
         --timeout 120 \
         --preload \
         --access-logfile - \